@@ -1,13 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, desc, select, and_, or_
 from typing import List, Optional
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 
-from backend.database.connection import get_db
+from backend.database.connection import get_async_db
 from backend.database.models import User, ChatHistory, AdminAction, UserAnalytics
 from backend.auth.dependencies import require_admin
+from backend.auth.principal_cache import principal_cache
+from backend.database.search import user_search_clause, estimate_count
+from backend.database.write_behind import write_behind
+from backend.database import archive, bulk_delete
+from starlette.concurrency import run_in_threadpool
+from backend.utils import rollups
+from backend.utils.pagination import decode_cursor, next_cursor
+from backend.utils.export import export_response
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
@@ -31,9 +39,11 @@ class UserResponse(BaseModel):
 
 class UserListResponse(BaseModel):
     users: List[UserResponse]
-    total: int
+    total: Optional[int]
+    total_is_estimate: bool = False
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
 
 
 class StatsOverview(BaseModel):
@@ -43,6 +53,16 @@ class StatsOverview(BaseModel):
     total_chats: int
     total_chats_today: int
     blocked_users: int
+    updated_at: Optional[datetime] = None
+
+
+class DailyStats(BaseModel):
+    date: datetime
+    total_users: int
+    active_users: int
+    new_users: int
+    total_chats: int
+    files_uploaded: int
 
 
 class BlockUserRequest(BaseModel):
@@ -65,41 +85,106 @@ class AdminActionResponse(BaseModel):
 
 @router.get("/stats/overview", response_model=StatsOverview)
 async def get_stats_overview(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin: User = Depends(require_admin)
 ):
-    """Get overview statistics for admin dashboard"""
-    
-    # Total users
-    total_users = db.query(User).count()
-    
-    # Active users (logged in last 7/30 days)
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    
-    active_7d = db.query(User).filter(User.last_login >= seven_days_ago).count()
-    active_30d = db.query(User).filter(User.last_login >= thirty_days_ago).count()
-    
-    # Total chats
-    total_chats = db.query(ChatHistory).count()
-    
-    # Chats today
-    today = datetime.utcnow().date()
-    chats_today = db.query(ChatHistory).filter(
-        func.date(ChatHistory.timestamp) == today
-    ).count()
-    
-    # Blocked users
-    blocked_users = db.query(User).filter(User.is_blocked == True).count()
-    
+    """
+    Get overview statistics for admin dashboard.
+    Served from the rollup tables (see backend.utils.rollups), so figures
+    can lag by up to ANALYTICS_ROLLUP_INTERVAL seconds.
+    """
+    counters = await db.run_sync(rollups.read_counters)
+    if not counters.get(rollups.LAST_ROLLUP):
+        # First load before the rollup job has run
+        await db.run_sync(rollups.refresh)
+        counters = await db.run_sync(rollups.read_counters)
+
+    today = (await db.scalars(
+        select(UserAnalytics).where(UserAnalytics.date == rollups.day_start(datetime.utcnow()))
+    )).first()
+
     return StatsOverview(
-        total_users=total_users,
-        active_users_7d=active_7d,
-        active_users_30d=active_30d,
-        total_chats=total_chats,
-        total_chats_today=chats_today,
-        blocked_users=blocked_users
+        total_users=counters[rollups.TOTAL_USERS],
+        active_users_7d=counters[rollups.ACTIVE_USERS_7D],
+        active_users_30d=counters[rollups.ACTIVE_USERS_30D],
+        total_chats=counters[rollups.TOTAL_CHATS],
+        total_chats_today=(today.total_chats or 0) if today else 0,
+        blocked_users=counters[rollups.BLOCKED_USERS],
+        updated_at=datetime.utcfromtimestamp(counters[rollups.LAST_ROLLUP])
+    )
+
+
+@router.get("/stats/timeseries", response_model=List[DailyStats])
+async def get_stats_timeseries(
+    days: int = Query(30, ge=1, le=365),
+    db: AsyncSession = Depends(get_async_db),
+    admin: User = Depends(require_admin)
+):
+    """Daily users/chats/uploads for the last `days` days, oldest first"""
+    first_day = rollups.day_start(datetime.utcnow()) - timedelta(days=days - 1)
+    rows = {
+        row.date: row
+        for row in (await db.scalars(
+            select(UserAnalytics).where(UserAnalytics.date >= first_day)
+        )).all()
+    }
+
+    series = []
+    total_users = 0
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        row = rows.get(day)
+        # total_users is a snapshot; carry it over days the job didn't run
+        if row and row.total_users:
+            total_users = row.total_users
+        series.append(DailyStats(
+            date=day,
+            total_users=total_users,
+            active_users=(row.active_users or 0) if row else 0,
+            new_users=(row.new_users or 0) if row else 0,
+            total_chats=(row.total_chats or 0) if row else 0,
+            files_uploaded=(row.files_uploaded or 0) if row else 0
+        ))
+    return series
+
+
+@router.post("/stats/rebuild")
+async def rebuild_stats(
+    db: AsyncSession = Depends(get_async_db),
+    admin: User = Depends(require_admin)
+):
+    """Recount the analytics rollups from the source tables"""
+    await db.run_sync(rollups.rebuild)
+
+    admin_action = AdminAction(
+        admin_id=admin.id,
+        action_type="REBUILD_ANALYTICS"
     )
+    db.add(admin_action)
+    await db.commit()
+
+    return {"message": "Analytics rebuilt successfully"}
+
+
+@router.post("/archive/run")
+async def run_archive(
+    older_than_days: Optional[int] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    admin: User = Depends(require_admin)
+):
+    """Archive chat history older than older_than_days (default ARCHIVE_AFTER_DAYS) now"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days) if older_than_days is not None else None
+    result = await run_in_threadpool(archive.run_archive, None, cutoff)
+
+    admin_action = AdminAction(
+        admin_id=admin.id,
+        action_type="RUN_ARCHIVE",
+        details=f"{result['messages']} messages of {result['users']} users"
+    )
+    db.add(admin_action)
+    await db.commit()
+
+    return {"message": "Archive run completed", **result}
 
 
 @router.get("/users", response_model=UserListResponse)
@@ -108,59 +193,86 @@ async def list_users(
     page_size: int = Query(20, ge=1, le=100),
     search: Optional[str] = None,
     status: Optional[str] = Query(None, regex="^(active|blocked|all)$"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    count: str = Query("exact", regex="^(exact|estimated|none)$"),
+    db: AsyncSession = Depends(get_async_db),
     admin: User = Depends(require_admin)
 ):
-    """List all users with pagination and filtering"""
+    """
+    List all users with pagination and filtering.
+    Pass next_cursor back as `cursor` to page without OFFSET; `page` is kept
+    for older clients. `count=estimated` avoids an exact COUNT on large
+    result sets, `count=none` skips it.
+    """
     
-    query = db.query(User)
+    query = select(User)
     
-    # Search filter
-    if search:
-        query = query.filter(
-            (User.email.contains(search)) | (User.username.contains(search))
-        )
+    # Search filter (trigram-indexed, see backend.database.search)
+    if search and search.strip():
+        query = query.where(await db.run_sync(user_search_clause, search))
     
     # Status filter
     if status == "active":
-        query = query.filter(User.is_blocked == False, User.is_active == True)
+        query = query.where(User.is_blocked == False, User.is_active == True)
     elif status == "blocked":
-        query = query.filter(User.is_blocked == True)
+        query = query.where(User.is_blocked == True)
     
     # Get total count
-    total = query.count()
+    total, total_is_estimate = None, False
+    if count == "exact":
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+    elif count == "estimated":
+        total, total_is_estimate = await db.run_sync(estimate_count, query)
     
     # Pagination
-    offset = (page - 1) * page_size
-    users = query.order_by(desc(User.created_at)).offset(offset).limit(page_size).all()
+    if cursor:
+        created_at, user_id = decode_cursor(cursor, 2)
+        query = query.where(or_(
+            User.created_at < created_at,
+            and_(User.created_at == created_at, User.id < user_id)
+        ))
+    else:
+        query = query.offset((page - 1) * page_size)
+    
+    users = (await db.scalars(
+        query.order_by(desc(User.created_at), desc(User.id)).limit(page_size + 1)
+    )).all()
+    users, cursor = next_cursor(users, page_size, lambda user: (user.created_at, user.id))
     
     return UserListResponse(
         users=users,
         total=total,
+        total_is_estimate=total_is_estimate,
         page=page,
-        page_size=page_size
+        page_size=page_size,
+        next_cursor=cursor
     )
 
 
 @router.get("/users/{user_id}")
 async def get_user_details(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin: User = Depends(require_admin)
 ):
     """Get detailed information about a specific user"""
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Get user's chat history count
-    chat_count = db.query(ChatHistory).filter(ChatHistory.user_id == user_id).count()
+    chat_count = await db.scalar(
+        select(func.count(ChatHistory.id)).where(ChatHistory.user_id == user_id)
+    )
     
     # Get recent chats
-    recent_chats = db.query(ChatHistory).filter(
-        ChatHistory.user_id == user_id
-    ).order_by(desc(ChatHistory.timestamp)).limit(5).all()
+    recent_chats = (await db.scalars(
+        select(ChatHistory)
+        .where(ChatHistory.user_id == user_id)
+        .order_by(desc(ChatHistory.timestamp))
+        .limit(5)
+    )).all()
     
     return {
         "user": UserResponse.from_orm(user),
@@ -182,12 +294,12 @@ async def get_user_details(
 async def block_user(
     user_id: int,
     request: BlockUserRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin: User = Depends(require_admin)
 ):
     """Block a user account"""
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -211,7 +323,8 @@ async def block_user(
         details=f"Reason: {request.reason}" if request.reason else None
     )
     db.add(admin_action)
-    db.commit()
+    await db.commit()
+    await principal_cache.invalidate(user.email)
     
     return {"message": "User blocked successfully", "user": UserResponse.from_orm(user)}
 
@@ -219,12 +332,12 @@ async def block_user(
 @router.post("/users/{user_id}/unblock")
 async def unblock_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin: User = Depends(require_admin)
 ):
     """Unblock a user account"""
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -244,7 +357,8 @@ async def unblock_user(
         target_user_id=user_id
     )
     db.add(admin_action)
-    db.commit()
+    await db.commit()
+    await principal_cache.invalidate(user.email)
     
     return {"message": "User unblocked successfully", "user": UserResponse.from_orm(user)}
 
@@ -252,12 +366,13 @@ async def unblock_user(
 @router.delete("/users/{user_id}")
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    purge: bool = Query(False, description="Permanently delete the user and all their chats"),
+    db: AsyncSession = Depends(get_async_db),
     admin: User = Depends(require_admin)
 ):
-    """Delete a user account (soft delete - set is_active to False)"""
+    """Delete a user account (soft delete - set is_active to False - unless purge is set)"""
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -267,6 +382,19 @@ async def delete_user(
     if user.id == admin.id:
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
     
+    if purge:
+        # Queued chat rows would otherwise be inserted after the purge
+        await write_behind.ensure_flushed(user_id)
+        deleted = await db.run_sync(bulk_delete.purge_user, user_id)
+        db.add(AdminAction(
+            admin_id=admin.id,
+            action_type="PURGE_USER",
+            details=f"{user.email}: {deleted['messages']} messages, {deleted['conversations']} conversations"
+        ))
+        await db.commit()
+        await principal_cache.invalidate(user.email)
+        return {"message": "User purged successfully", **deleted}
+    
     # Soft delete
     user.is_active = False
     
@@ -277,20 +405,48 @@ async def delete_user(
         target_user_id=user_id
     )
     db.add(admin_action)
-    db.commit()
+    await db.commit()
+    await principal_cache.invalidate(user.email)
     
     return {"message": "User deleted successfully"}
 
 
+@router.get("/users/{user_id}/export")
+async def export_user_data(
+    user_id: int,
+    format: str = Query("ndjson", regex="^(ndjson|parquet)$"),
+    db: AsyncSession = Depends(get_async_db),
+    admin: User = Depends(require_admin)
+):
+    """Stream a user's conversations and messages for a data request"""
+    if not await db.get(User, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+
+    await write_behind.ensure_flushed(user_id)
+
+    admin_action = AdminAction(
+        admin_id=admin.id,
+        action_type="EXPORT_USER_DATA",
+        target_user_id=user_id,
+        details=format
+    )
+    db.add(admin_action)
+    await db.commit()
+    # Release the request's connection; the export reads through its own sessions
+    await db.close()
+
+    return export_response(user_id, format)
+
+
 @router.post("/users/{user_id}/toggle-admin")
 async def toggle_admin(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin: User = Depends(require_admin)
 ):
     """Toggle admin status for a user"""
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -308,7 +464,8 @@ async def toggle_admin(
         target_user_id=user_id
     )
     db.add(admin_action)
-    db.commit()
+    await db.commit()
+    await principal_cache.invalidate(user.email)
     
     return {"message": f"User admin status updated", "is_admin": user.is_admin}
 
@@ -316,10 +473,12 @@ async def toggle_admin(
 @router.get("/logs", response_model=List[AdminActionResponse])
 async def get_admin_logs(
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin: User = Depends(require_admin)
 ):
     """Get admin action logs"""
     
-    logs = db.query(AdminAction).order_by(desc(AdminAction.created_at)).limit(limit).all()
+    logs = (await db.scalars(
+        select(AdminAction).order_by(desc(AdminAction.created_at)).limit(limit)
+    )).all()
     return logs
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select, func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from datetime import datetime
-from backend.database.connection import get_db
+from backend.database.connection import get_async_db
 from backend.database.models import User, ChatHistory
 from backend.auth.dependencies import get_current_user
-from pydantic import BaseModel
+from backend.database.search import search_chat_history
+from backend.database.write_behind import write_behind
+from backend.database import bulk_delete
+from backend.utils import rollups
+from backend.utils.pagination import decode_cursor, next_cursor, NEXT_CURSOR_HEADER
+from pydantic import BaseModel, Field
 
 router = APIRouter(prefix="/chat-history", tags=["Chat History"])
 
@@ -14,43 +20,93 @@ class ChatHistoryResponse(BaseModel):
     id: int
     question: str
     answer: str
-    created_at: datetime
+    # Exposed as created_at; the column is ChatHistory.timestamp
+    created_at: datetime = Field(validation_alias="timestamp")
 
     class Config:
         from_attributes = True
 
 
+class ChatSearchResult(BaseModel):
+    id: int
+    conversation_id: Optional[str]
+    timestamp: Optional[datetime]
+    rank: Optional[float]
+    # HTML-escaped text with matches wrapped in <mark>
+    question: str
+    answer: str
+
+
+class ChatSearchResponse(BaseModel):
+    query: str
+    results: List[ChatSearchResult]
+    count: int
+
+
 @router.get("/", response_model=List[ChatHistoryResponse])
 async def get_chat_history(
-        limit: int = 50,
+        response: Response,
+        limit: int = Query(50, ge=1, le=200),
+        cursor: Optional[str] = None,
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    """Get user's chat history"""
-
-    chats = db.query(ChatHistory) \
-        .filter(ChatHistory.user_id == current_user.id) \
-        .order_by(ChatHistory.created_at.desc()) \
-        .limit(limit) \
-        .all()
+    """
+    Get user's chat history, newest first.
+    Keyset-paginated; the next page's cursor is in the X-Next-Cursor header.
+    """
+
+    await write_behind.ensure_flushed(current_user.id)
+
+    query = select(ChatHistory).where(ChatHistory.user_id == current_user.id)
+    if cursor:
+        timestamp, chat_id = decode_cursor(cursor, 2)
+        query = query.where(or_(
+            ChatHistory.timestamp < timestamp,
+            and_(ChatHistory.timestamp == timestamp, ChatHistory.id < chat_id)
+        ))
+
+    chats = (await db.scalars(
+        query.order_by(ChatHistory.timestamp.desc(), ChatHistory.id.desc()).limit(limit + 1)
+    )).all()
+    chats, cursor = next_cursor(chats, limit, lambda chat: (chat.timestamp, chat.id))
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
 
     return chats
 
 
+@router.get("/search", response_model=ChatSearchResponse)
+async def search_chat(
+        q: str = Query(..., min_length=1, max_length=200),
+        limit: int = Query(20, ge=1, le=100),
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Full-text search over the user's questions and answers, best match first"""
+
+    await write_behind.ensure_flushed(current_user.id)
+
+    results = await db.run_sync(search_chat_history, current_user.id, q, limit)
+    return ChatSearchResponse(query=q, results=results, count=len(results))
+
+
 @router.get("/{chat_id}", response_model=ChatHistoryResponse)
 async def get_single_chat(
         chat_id: int,
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific chat by ID"""
 
-    chat = db.query(ChatHistory) \
-        .filter(
-        ChatHistory.id == chat_id,
-        ChatHistory.user_id == current_user.id
-    ) \
-        .first()
+    await write_behind.ensure_flushed(current_user.id)
+
+    chat = (await db.scalars(
+        select(ChatHistory).where(
+            ChatHistory.id == chat_id,
+            ChatHistory.user_id == current_user.id
+        )
+    )).first()
 
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
@@ -62,22 +118,25 @@ async def get_single_chat(
 async def delete_chat(
         chat_id: int,
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a specific chat"""
 
-    chat = db.query(ChatHistory) \
-        .filter(
-        ChatHistory.id == chat_id,
-        ChatHistory.user_id == current_user.id
-    ) \
-        .first()
+    await write_behind.ensure_flushed(current_user.id)
+
+    chat = (await db.scalars(
+        select(ChatHistory).where(
+            ChatHistory.id == chat_id,
+            ChatHistory.user_id == current_user.id
+        )
+    )).first()
 
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
 
-    db.delete(chat)
-    db.commit()
+    await db.run_sync(rollups.unfold_chats, [chat.id])
+    await db.delete(chat)
+    await db.commit()
 
     return {"message": "Chat deleted successfully"}
 
@@ -85,15 +144,13 @@ async def delete_chat(
 @router.delete("/")
 async def clear_all_history(
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Clear all chat history for current user"""
 
-    deleted_count = db.query(ChatHistory) \
-        .filter(ChatHistory.user_id == current_user.id) \
-        .delete()
+    await write_behind.ensure_flushed(current_user.id)
 
-    db.commit()
+    deleted_count = await db.run_sync(bulk_delete.clear_history, current_user.id)
 
     return {
         "message": f"Deleted {deleted_count} chat messages",
@@ -104,27 +161,23 @@ async def clear_all_history(
 @router.get("/stats/summary")
 async def get_chat_stats(
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Get chat statistics for current user"""
 
-    total_chats = db.query(ChatHistory) \
-        .filter(ChatHistory.user_id == current_user.id) \
-        .count()
-
-    first_chat = db.query(ChatHistory) \
-        .filter(ChatHistory.user_id == current_user.id) \
-        .order_by(ChatHistory.created_at.asc()) \
-        .first()
+    await write_behind.ensure_flushed(current_user.id)
 
-    last_chat = db.query(ChatHistory) \
-        .filter(ChatHistory.user_id == current_user.id) \
-        .order_by(ChatHistory.created_at.desc()) \
-        .first()
+    total_chats, first_chat_date, last_chat_date = (await db.execute(
+        select(
+            func.count(ChatHistory.id),
+            func.min(ChatHistory.timestamp),
+            func.max(ChatHistory.timestamp)
+        ).where(ChatHistory.user_id == current_user.id)
+    )).one()
 
     return {
         "total_chats": total_chats,
-        "first_chat_date": first_chat.created_at.isoformat() if first_chat else None,
-        "last_chat_date": last_chat.created_at.isoformat() if last_chat else None,
+        "first_chat_date": first_chat_date.isoformat() if first_chat_date else None,
+        "last_chat_date": last_chat_date.isoformat() if last_chat_date else None,
         "user": current_user.username
     }
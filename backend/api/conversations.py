@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from backend.database.connection import get_db
-from backend.database.models import User, Conversation, ChatHistory
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select, func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database.connection import get_async_db
+from backend.database.models import User, Conversation, ChatHistory, ArchiveSegment
+from backend.database.write_behind import write_behind
+from backend.database import archive, bulk_delete
 from backend.auth.dependencies import get_current_user
+from backend.utils.pagination import decode_cursor, next_cursor, NEXT_CURSOR_HEADER
+from backend.utils.export import export_response
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
@@ -10,6 +15,9 @@ import uuid
 
 router = APIRouter(prefix="/api/conversations", tags=["Conversations"])
 
+# Characters of the last question returned as the sidebar preview
+LAST_MESSAGE_PREVIEW_CHARS = 200
+
 
 # ============= REQUEST/RESPONSE MODELS =============
 
@@ -39,7 +47,7 @@ class ConversationResponse(BaseModel):
 async def create_conversation(
     data: ConversationCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new conversation"""
     conversation = Conversation(
@@ -49,8 +57,8 @@ async def create_conversation(
     )
     
     db.add(conversation)
-    db.commit()
-    db.refresh(conversation)
+    await db.commit()
+    await db.refresh(conversation)
     
     return {
         "id": conversation.id,
@@ -62,62 +70,161 @@ async def create_conversation(
 
 @router.get("/", response_model=list)
 async def list_conversations(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List all user's conversations"""
-    conversations = db.query(Conversation).filter(
-        Conversation.user_id == current_user.id
-    ).order_by(Conversation.updated_at.desc()).all()
-    
-    result = []
-    for conv in conversations:
-        # Get message count and last message
-        message_count = len(conv.messages)
-        last_message = conv.messages[-1].question if conv.messages else None
-        
-        result.append({
-            "id": conv.id,
-            "title": conv.title,
-            "created_at": conv.created_at.isoformat(),
-            "updated_at": conv.updated_at.isoformat(),
-            "message_count": message_count,
-            "last_message": last_message
-        })
-    
-    return result
+    """
+    List user's conversations, most recently updated first.
+    One query: message count and last-question preview come from
+    correlated subqueries, so message bodies are never loaded.
+    Keyset-paginated; the next page's cursor is in the X-Next-Cursor header.
+    """
+    await write_behind.ensure_flushed(current_user.id)
+
+    message_count = (
+        select(func.count(ChatHistory.id))
+        .where(ChatHistory.conversation_id == Conversation.id)
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+    archived_count = (
+        select(func.coalesce(func.sum(ArchiveSegment.row_count), 0))
+        .where(ArchiveSegment.user_id == current_user.id, ArchiveSegment.conversation_id == Conversation.id)
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+    last_message = (
+        select(func.substr(ChatHistory.question, 1, LAST_MESSAGE_PREVIEW_CHARS))
+        .where(ChatHistory.conversation_id == Conversation.id)
+        .order_by(ChatHistory.timestamp.desc(), ChatHistory.id.desc())
+        .limit(1)
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+
+    query = select(
+        Conversation.id,
+        Conversation.title,
+        Conversation.created_at,
+        Conversation.updated_at,
+        (message_count + archived_count).label("message_count"),
+        last_message.label("last_message")
+    ).where(Conversation.user_id == current_user.id)
+
+    if cursor:
+        updated_at, conversation_id = decode_cursor(cursor, 2)
+        query = query.where(or_(
+            Conversation.updated_at < updated_at,
+            and_(Conversation.updated_at == updated_at, Conversation.id < conversation_id)
+        ))
+
+    rows = (await db.execute(
+        query.order_by(Conversation.updated_at.desc(), Conversation.id.desc()).limit(limit + 1)
+    )).all()
+    rows, cursor = next_cursor(rows, limit, lambda row: (row.updated_at, row.id))
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+
+    return [
+        {
+            "id": row.id,
+            "title": row.title,
+            "created_at": row.created_at.isoformat(),
+            "updated_at": row.updated_at.isoformat(),
+            "message_count": row.message_count,
+            "last_message": row.last_message
+        }
+        for row in rows
+    ]
+
+
+@router.get("/export")
+async def export_conversations(
+    format: str = Query("ndjson", regex="^(ndjson|parquet)$"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Download all of the user's conversations and messages (archived ones
+    included) as NDJSON or Parquet, streamed in chunks.
+    """
+    await write_behind.ensure_flushed(current_user.id)
+    # The request's session lives until the stream ends; hand its connection
+    # back now, the export reads through its own sessions
+    await db.close()
+    return export_response(current_user.id, format)
 
 
 @router.get("/{conversation_id}")
 async def get_conversation(
     conversation_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get specific conversation with all messages"""
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
-    
+    """
+    Get specific conversation with its latest messages (oldest first).
+    Pass next_cursor back as `cursor` to load earlier messages.
+    """
+    await write_behind.ensure_flushed(current_user.id)
+
+    conversation = (await db.scalars(
+        select(Conversation).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )).first()
+
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    
+
+    query = select(ChatHistory).where(ChatHistory.conversation_id == conversation.id)
+    before = None
+    if cursor:
+        before = timestamp, chat_id = decode_cursor(cursor, 2)
+        query = query.where(or_(
+            ChatHistory.timestamp < timestamp,
+            and_(ChatHistory.timestamp == timestamp, ChatHistory.id < chat_id)
+        ))
+
+    chats = [
+        {"id": chat.id, "question": chat.question, "answer": chat.answer, "timestamp": chat.timestamp}
+        for chat in (await db.scalars(
+            query.order_by(ChatHistory.timestamp.desc(), ChatHistory.id.desc()).limit(limit + 1)
+        )).all()
+    ]
+    if len(chats) <= limit:
+        # Past the hot rows: continue with archived messages, same keyset
+        if chats:
+            before = chats[-1]["timestamp"], chats[-1]["id"]
+        chats += await db.run_sync(
+            archive.archived_messages, current_user.id, conversation.id, before, limit + 1 - len(chats)
+        )
+    chats, next_page = next_cursor(chats, limit, lambda chat: (chat["timestamp"], chat["id"]))
+    if next_page:
+        response.headers[NEXT_CURSOR_HEADER] = next_page
+
     messages = []
-    for chat in conversation.messages:
+    for chat in reversed(chats):
         messages.append({
-            "id": chat.id,
-            "question": chat.question,
-            "answer": chat.answer,
-            "timestamp": chat.timestamp.isoformat()
+            "id": chat["id"],
+            "question": chat["question"],
+            "answer": chat["answer"],
+            "timestamp": chat["timestamp"].isoformat()
         })
-    
+
     return {
         "id": conversation.id,
         "title": conversation.title,
         "created_at": conversation.created_at.isoformat(),
         "updated_at": conversation.updated_at.isoformat(),
-        "messages": messages
+        "messages": messages,
+        "next_cursor": next_page
     }
 
 
@@ -126,19 +233,23 @@ async def update_conversation(
     conversation_id: str,
     data: ConversationUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Rename a conversation"""
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    await write_behind.ensure_flushed(current_user.id)
+
+    conversation = (await db.scalars(
+        select(Conversation).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )).first()
     
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
     conversation.title = data.title
-    db.commit()
+    await db.commit()
     
     return {
         "id": conversation.id,
@@ -151,18 +262,22 @@ async def update_conversation(
 async def delete_conversation(
     conversation_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a conversation and all its messages"""
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    await write_behind.ensure_flushed(current_user.id)
+
+    conversation = (await db.scalars(
+        select(Conversation).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )).first()
     
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    db.delete(conversation)
-    db.commit()
+    # Set-based, chunked delete; the ORM cascade would load every message
+    deleted_count = await db.run_sync(bulk_delete.delete_conversation, current_user.id, conversation.id)
     
-    return {"message": "Conversation deleted successfully"}
+    return {"message": "Conversation deleted successfully", "messages_deleted": deleted_count}
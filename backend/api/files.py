@@ -1,14 +1,12 @@
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from sqlalchemy.orm import Session
-from backend.database.connection import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from backend.database.connection import get_async_db
 from backend.database.models import User
 from backend.auth.dependencies import get_current_user
-# Lazy import vectorstore to avoid startup errors
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader
-from langchain_core.documents import Document
 import os
 import tempfile
+import uuid
 
 router = APIRouter(prefix="/api", tags=["File Upload"])
 
@@ -17,7 +15,7 @@ router = APIRouter(prefix="/api", tags=["File Upload"])
 async def upload_file(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Upload and process a document file
@@ -46,6 +44,11 @@ async def upload_file(
         )
     
     try:
+        # Lazy import loaders and splitter (heavy, only needed for uploads)
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader
+        from langchain_core.documents import Document
+
         # Save file temporarily
         with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
             temp_file.write(content)
@@ -57,13 +60,13 @@ async def upload_file(
         if file_ext == '.pdf':
             # Load PDF
             loader = PyPDFLoader(temp_file_path)
-            documents = loader.load()
+            documents = await run_in_threadpool(loader.load)
         
         elif file_ext == '.docx':
             # Load DOCX
             try:
                 loader = Docx2txtLoader(temp_file_path)
-                documents = loader.load()
+                documents = await run_in_threadpool(loader.load)
             except Exception as e:
                 print(f"Error loading DOCX: {e}")
                 # Fallback or error
@@ -85,13 +88,15 @@ async def upload_file(
         chunks = text_splitter.split_documents(documents)
         
         # Add metadata
+        document_id = str(uuid.uuid4())
         for chunk in chunks:
             chunk.metadata['user_id'] = str(current_user.id)  # Convert to string for Pinecone
             chunk.metadata['filename'] = file.filename
             chunk.metadata['uploaded_by'] = current_user.username
+            chunk.metadata['document_id'] = document_id
         
         # Lazy import vectorstore (avoid startup errors)
-        from backend.vectorstore.pinecone_utils import vectorstore
+        from backend.vectorstore.pinecone_utils import add_documents
         
         # OPTION: Delete user's old documents first (uncomment if you want this)
         # This makes each user have only their LATEST upload
@@ -106,8 +111,15 @@ async def upload_file(
         # except Exception as e:
         #     print(f"⚠️ Could not clear old docs: {e}")
         
-        # Add to Pinecone
-        vectorstore.add_documents(chunks)
+        # Add to Pinecone (batches are upserted concurrently while embedding);
+        # embedding and upserts block, so keep them off the event loop
+        await run_in_threadpool(add_documents, chunks)
+        
+        try:
+            from backend.utils.rollups import record_file_upload
+            await db.run_sync(record_file_upload)
+        except Exception as e:
+            print(f"⚠️ Could not record upload in analytics: {e}")
         
         # Clean up temp file
         os.unlink(temp_file_path)
@@ -116,6 +128,7 @@ async def upload_file(
             "success": True,
             "message": f"Successfully processed {file.filename}",
             "filename": file.filename,
+            "document_id": document_id,
             "chunks_created": len(chunks),
             "file_size_kb": round(file_size / 1024, 2)
         }
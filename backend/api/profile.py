@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from backend.database.connection import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database.connection import get_async_db
 from backend.database.models import User
 from backend.auth.dependencies import get_current_user
+from backend.auth.principal_cache import principal_cache
 from backend.auth.utils import get_password_hash, verify_password
 from pydantic import BaseModel
 from typing import Optional
@@ -60,7 +61,7 @@ async def get_profile(
 async def update_profile(
     data: ProfileUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update user profile"""
     if data.full_name is not None:
@@ -69,8 +70,9 @@ async def update_profile(
     if data.bio is not None:
         current_user.bio = data.bio
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
+    await principal_cache.invalidate(current_user.email)
     
     return {
         "message": "Profile updated successfully",
@@ -85,7 +87,7 @@ async def update_profile(
 async def upload_avatar(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Upload profile avatar"""
     # Validate file type
@@ -108,7 +110,8 @@ async def upload_avatar(
     
     # Update user avatar_url
     current_user.avatar_url = f"/{avatar_dir}/{avatar_filename}"
-    db.commit()
+    await db.commit()
+    await principal_cache.invalidate(current_user.email)
     
     return {
         "message": "Avatar uploaded successfully",
@@ -120,9 +123,12 @@ async def upload_avatar(
 async def change_password(
     data: PasswordChange,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Change user password"""
+    # The cached principal doesn't carry the hash
+    await db.refresh(current_user, ["hashed_password"])
+
     # Verify current password
     if not current_user.hashed_password:
         raise HTTPException(status_code=400, detail="Cannot change password for OAuth users")
@@ -132,6 +138,6 @@ async def change_password(
     
     # Update password
     current_user.hashed_password = get_password_hash(data.new_password)
-    db.commit()
+    await db.commit()
     
     return {"message": "Password changed successfully"}
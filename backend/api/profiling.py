@@ -0,0 +1,129 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+from backend.database.connection import get_async_db
+from backend.database.models import User, AdminAction
+from backend.auth.dependencies import require_admin
+from backend.utils.profiling import profiler, ProfileSession, PROFILING_MAX_DURATION
+
+router = APIRouter(prefix="/api/admin/profiling", tags=["Admin Profiling"])
+
+DOWNLOAD_KINDS = {
+    "cpu": "text/plain",
+    "memory": "text/plain",
+    "memory_top": "text/plain",
+}
+
+
+# ============= PYDANTIC SCHEMAS =============
+
+class StartProfilingRequest(BaseModel):
+    user_id: Optional[int] = None
+    route: Optional[str] = None
+    duration_seconds: int = Field(60, ge=1, le=PROFILING_MAX_DURATION)
+    sample_interval_ms: float = Field(10.0, ge=1.0, le=1000.0)
+    memory: bool = False
+
+
+class ProfileSessionResponse(BaseModel):
+    id: str
+    state: str
+    user_id: Optional[int]
+    route: Optional[str]
+    memory: bool
+    sample_interval_ms: float
+    started_at: str
+    expires_at: str
+    stopped_at: Optional[str]
+    requests_matched: int
+    samples: int
+    files: List[str]
+
+
+# ============= ENDPOINTS =============
+
+@router.post("/sessions", response_model=ProfileSessionResponse)
+async def start_profiling(
+    request: StartProfilingRequest,
+    db: AsyncSession = Depends(get_async_db),
+    admin: User = Depends(require_admin)
+):
+    """Start sampling requests of a user and/or route prefix for a time window"""
+
+    user_email = None
+    if request.user_id is not None:
+        user = await db.get(User, request.user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        user_email = user.email
+
+    session = ProfileSession(
+        created_by=admin.id,
+        user_email=user_email,
+        user_id=request.user_id,
+        route=request.route,
+        duration_seconds=request.duration_seconds,
+        sample_interval_ms=request.sample_interval_ms,
+        memory=request.memory
+    )
+    try:
+        profiler.start(session)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    # Log admin action
+    admin_action = AdminAction(
+        admin_id=admin.id,
+        action_type="START_PROFILING",
+        target_user_id=request.user_id,
+        details=f"Session {session.id}, route={request.route}, {request.duration_seconds}s"
+    )
+    db.add(admin_action)
+    await db.commit()
+
+    return session.to_dict()
+
+
+@router.get("/sessions", response_model=List[ProfileSessionResponse])
+async def list_profiling_sessions(
+    admin: User = Depends(require_admin)
+):
+    """List profiling sessions (newest first)"""
+    return [session.to_dict() for session in profiler.list()]
+
+
+@router.post("/sessions/{session_id}/stop", response_model=ProfileSessionResponse)
+async def stop_profiling(
+    session_id: str,
+    admin: User = Depends(require_admin)
+):
+    """Stop a session early and write its results"""
+    try:
+        session = profiler.stop(session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Profiling session not found")
+    return session.to_dict()
+
+
+@router.get("/sessions/{session_id}/download")
+async def download_profile(
+    session_id: str,
+    kind: str = Query("cpu", pattern="^(cpu|memory|memory_top)$"),
+    admin: User = Depends(require_admin)
+):
+    """
+    Download results: cpu / memory are collapsed stacks for flamegraph.pl,
+    speedscope or inferno; memory_top is a plain-text allocation summary
+    """
+    path = profiler.file_path(session_id, kind)
+    if path is None:
+        raise HTTPException(status_code=404, detail="No results of this kind (session still running?)")
+
+    return FileResponse(
+        path,
+        media_type=DOWNLOAD_KINDS[kind],
+        filename=f"profile-{session_id}.{kind}.{'txt' if kind == 'memory_top' else 'collapsed'}"
+    )
@@ -1,16 +1,18 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from backend.database.connection import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database.connection import get_async_db
 from backend.database.models import User
 from backend.auth.utils import decode_token
+from backend.auth.principal_cache import principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_current_user(
+async def get_current_user(
         token: str = Depends(oauth2_scheme),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Get current authenticated user from JWT token"""
 
@@ -29,10 +31,16 @@ def get_current_user(
     if email is None:
         raise credentials_exception
 
-    # Get user from database
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        raise credentials_exception
+    # Get user from the principal cache, falling back to the database
+    user = await principal_cache.get(email)
+    if user is not None:
+        # Attach the snapshot so handlers can modify and commit current_user
+        db.add(user)
+    else:
+        user = (await db.scalars(select(User).where(User.email == email))).first()
+        if user is None:
+            raise credentials_exception
+        await principal_cache.set(email, user)
 
     if not user.is_active:
         raise HTTPException(
@@ -50,7 +58,7 @@ def get_current_user(
     return user
 
 
-def get_current_active_user(
+async def get_current_active_user(
         current_user: User = Depends(get_current_user)
 ) -> User:
     """Get current active user"""
@@ -59,7 +67,7 @@ def get_current_active_user(
     return current_user
 
 
-def require_admin(
+async def require_admin(
         current_user: User = Depends(get_current_user)
 ) -> User:
     """Require admin role for endpoint access"""
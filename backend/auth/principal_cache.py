@@ -0,0 +1,189 @@
+"""
+Short-TTL cache of authenticated principals for get_current_user.
+
+Every authenticated request used to load the user row by email. The cache
+keeps a snapshot of the row's columns per token subject for
+PRINCIPAL_CACHE_TTL seconds; get_current_user attaches the snapshot to the
+request's session without a SELECT, so handlers can still modify and commit
+current_user as before.
+
+Admin endpoints that block, unblock, delete or change the admin flag of a
+user, and the profile endpoints, call `await principal_cache.invalidate(email)`
+so the change applies to the very next request.
+
+Backends (PRINCIPAL_CACHE_BACKEND):
+- memory: per process. invalidate() only clears the LRU of the worker that
+  handled the admin request; every other worker keeps serving its snapshot
+  (e.g. a just-blocked user stays authenticated there) until the entry
+  expires. With more than one worker its TTL is therefore capped at
+  PRINCIPAL_CACHE_MULTI_WORKER_TTL.
+- redis: shared by all workers, so an invalidation is seen everywhere at once
+  (REDIS_URL; requires `pip install redis`)
+- auto (default): redis when the app runs more than one worker
+  (WEB_CONCURRENCY, which uvicorn and gunicorn read for their worker count;
+  set it instead of passing --workers) and the redis package is installed,
+  memory otherwise
+"""
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+
+from decouple import config
+from sqlalchemy import DateTime, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from backend.database.models import User
+from backend.utils.metrics import PRINCIPAL_CACHE_LOOKUPS
+
+try:
+    import redis.asyncio as redis_asyncio
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+PRINCIPAL_CACHE_TTL = config("PRINCIPAL_CACHE_TTL", default=30.0, cast=float)  # 0 disables
+PRINCIPAL_CACHE_MAX_ENTRIES = config("PRINCIPAL_CACHE_MAX_ENTRIES", default=10000, cast=int)
+PRINCIPAL_CACHE_BACKEND = config("PRINCIPAL_CACHE_BACKEND", default="auto")
+# Upper bound on how long a worker may serve a user another worker invalidated
+PRINCIPAL_CACHE_MULTI_WORKER_TTL = config("PRINCIPAL_CACHE_MULTI_WORKER_TTL", default=5.0, cast=float)
+REDIS_URL = config("REDIS_URL", default="redis://localhost:6379/0")
+WEB_CONCURRENCY = config("WEB_CONCURRENCY", default=1, cast=int)
+
+REDIS_KEY_PREFIX = "principal:"
+
+# Credentials never leave the database; handlers that need the hash refresh it
+UNCACHED_COLUMNS = {"hashed_password"}
+_COLUMNS = [attr.key for attr in inspect(User).column_attrs if attr.key not in UNCACHED_COLUMNS]
+_DATETIME_COLUMNS = {
+    attr.key for attr in inspect(User).column_attrs
+    if isinstance(attr.columns[0].type, DateTime)
+}
+
+
+def snapshot(user: User) -> Dict:
+    """Column values of a loaded user"""
+    return {name: getattr(user, name) for name in _COLUMNS}
+
+
+def to_user(values: Dict) -> User:
+    """Detached User built from a snapshot; session.add() attaches it without a SELECT"""
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+
+class MemoryPrincipalCache:
+    """Bounded LRU of user snapshots with per-entry expiry"""
+
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL, max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, subject: str) -> Optional[Dict]:
+        entry = self._entries.get(subject)
+        if entry is None:
+            return None
+        expires_at, values = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(subject, None)
+            return None
+        self._entries.move_to_end(subject)
+        return values
+
+    async def set(self, subject: str, values: Dict):
+        self._entries[subject] = (time.monotonic() + self.ttl, values)
+        self._entries.move_to_end(subject)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def invalidate(self, subject: str):
+        self._entries.pop(subject, None)
+
+    async def clear(self):
+        self._entries.clear()
+
+
+class RedisPrincipalCache:
+    """User snapshots in Redis as JSON, expired by Redis itself"""
+
+    def __init__(self, url: str = REDIS_URL, ttl: float = PRINCIPAL_CACHE_TTL):
+        self.ttl = ttl
+        self._client = redis_asyncio.from_url(url)
+
+    def _key(self, subject: str) -> str:
+        return REDIS_KEY_PREFIX + subject
+
+    async def get(self, subject: str) -> Optional[Dict]:
+        raw = await self._client.get(self._key(subject))
+        if raw is None:
+            return None
+        values = json.loads(raw)
+        for name in _DATETIME_COLUMNS:
+            if values.get(name):
+                values[name] = datetime.fromisoformat(values[name])
+        return values
+
+    async def set(self, subject: str, values: Dict):
+        payload = json.dumps(
+            {name: value.isoformat() if isinstance(value, datetime) else value for name, value in values.items()}
+        )
+        await self._client.set(self._key(subject), payload, px=int(self.ttl * 1000))
+
+    async def invalidate(self, subject: str):
+        await self._client.delete(self._key(subject))
+
+    async def clear(self):
+        async for key in self._client.scan_iter(match=REDIS_KEY_PREFIX + "*"):
+            await self._client.delete(key)
+
+
+class PrincipalCache:
+    """Front for the configured backend; a zero TTL turns every call into a miss"""
+
+    def __init__(
+            self,
+            backend: str = PRINCIPAL_CACHE_BACKEND,
+            ttl: float = PRINCIPAL_CACHE_TTL,
+            workers: int = WEB_CONCURRENCY
+    ):
+        if backend == "auto":
+            backend = "redis" if workers > 1 and REDIS_AVAILABLE else "memory"
+
+        if backend == "redis":
+            if not REDIS_AVAILABLE:
+                raise ImportError("PRINCIPAL_CACHE_BACKEND=redis requires the redis package")
+            self.backend = RedisPrincipalCache(ttl=ttl)
+        else:
+            if workers > 1 and ttl > PRINCIPAL_CACHE_MULTI_WORKER_TTL:
+                print(
+                    f"⚠️ Principal cache is per process with {workers} workers; "
+                    f"TTL capped at {PRINCIPAL_CACHE_MULTI_WORKER_TTL}s (install redis to share it)"
+                )
+                ttl = PRINCIPAL_CACHE_MULTI_WORKER_TTL
+            self.backend = MemoryPrincipalCache(ttl=ttl)
+        self.enabled = ttl > 0
+
+    async def get(self, subject: str) -> Optional[User]:
+        """Detached User for a token subject, or None on a miss"""
+        if not self.enabled:
+            return None
+        values = await self.backend.get(subject)
+        PRINCIPAL_CACHE_LOOKUPS.labels(result="hit" if values else "miss").inc()
+        return to_user(values) if values else None
+
+    async def set(self, subject: str, user: User):
+        if self.enabled:
+            await self.backend.set(subject, snapshot(user))
+
+    async def invalidate(self, subject: str):
+        await self.backend.invalidate(subject)
+
+    async def clear(self):
+        await self.backend.clear()
+
+
+# Global instance
+principal_cache = PrincipalCache()
@@ -1,14 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-from backend.database.connection import get_db
+from backend.database.connection import get_db, get_async_db
 from backend.database.models import User
+from backend.database.write_behind import record_login
 from backend.auth.schemas import (
     UserRegister, UserLogin, Token, UserResponse,
     UserProfileUpdate, UserProfileResponse
 )
 from backend.auth.utils import verify_password, get_password_hash, create_access_token
 from backend.auth.dependencies import get_current_user
+from backend.auth.principal_cache import principal_cache
 from backend.utils.email_service import email_service
 from authlib.integrations.starlette_client import OAuth
 from starlette.config import Config
@@ -98,9 +101,8 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
             detail="User account is deactivated"
         )
 
-    # Update last login
-    user.last_login = datetime.utcnow()
-    db.commit()
+    # Update last login (batched when write-behind is enabled)
+    record_login(db, user)
 
     # Create token
     access_token = create_access_token(data={"sub": user.email})
@@ -124,10 +126,10 @@ def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 
 @router.put("/profile", response_model=UserProfileResponse)
-def update_profile(
+async def update_profile(
         profile_data: UserProfileUpdate,
         current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """Update user profile (name, bio, avatar, phone)"""
 
@@ -146,8 +148,9 @@ def update_profile(
 
     current_user.updated_at = datetime.utcnow()
 
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
+    await principal_cache.invalidate(current_user.email)
 
     return current_user
 
@@ -0,0 +1,60 @@
+"""Shared helpers for the benchmark scripts"""
+import json
+import math
+import platform
+import resource
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0-100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(seconds: List[float]) -> Dict:
+    """p50/p95/p99/mean in milliseconds"""
+    if not seconds:
+        return {"count": 0}
+    return {
+        "count": len(seconds),
+        "mean_ms": round(1000 * sum(seconds) / len(seconds), 3),
+        "p50_ms": round(1000 * percentile(seconds, 50), 3),
+        "p95_ms": round(1000 * percentile(seconds, 95), 3),
+        "p99_ms": round(1000 * percentile(seconds, 99), 3),
+        "max_ms": round(1000 * max(seconds), 3),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    if sys.platform == "darwin":
+        return round(peak / (1024 * 1024), 1)
+    return round(peak / 1024, 1)
+
+
+def write_report(name: str, results: Dict, output: str = None):
+    """Print results and optionally write them as JSON for tracking over time"""
+    report = {
+        "benchmark": name,
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+    print(json.dumps(report, indent=2, default=str))
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"✅ Report written to {output}")
+
+    return report
@@ -0,0 +1,77 @@
+"""Load local documents as chunks for the benchmark scripts"""
+import glob
+import os
+import random
+from typing import Dict, List
+
+import numpy as np
+
+from backend.utils.document_processor import DocumentProcessor
+
+DEFAULT_CORPUS = os.path.join("data", "docs")
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt", ".md")
+
+
+def find_documents(paths: List[str]) -> List[str]:
+    """Expand files and directories into a sorted list of supported documents"""
+    files = []
+    for path in paths or [DEFAULT_CORPUS]:
+        if os.path.isdir(path):
+            for ext in SUPPORTED_EXTENSIONS:
+                files.extend(glob.glob(os.path.join(path, "**", f"*{ext}"), recursive=True))
+        elif path.lower().endswith(SUPPORTED_EXTENSIONS):
+            files.append(path)
+    return sorted(set(files))
+
+
+def load_chunks(paths: List[str], chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Dict]:
+    """Extract and split documents; returns chunk dicts like DocumentProcessor"""
+    processor = DocumentProcessor()
+    if processor.text_splitter is not None:
+        processor.text_splitter = type(processor.text_splitter)(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+        )
+
+    chunks = []
+    for document_id, path in enumerate(find_documents(paths)):
+        for chunk in processor.process_document(path, {"document_id": str(document_id)}):
+            chunk["id"] = f"{document_id}_chunk_{chunk['chunk_index']}"
+            chunks.append(chunk)
+    return chunks
+
+
+def make_queries(chunks: List[Dict], count: int, seed: int = 0) -> List[str]:
+    """Use a sentence-sized slice of random chunks as the query text"""
+    rng = random.Random(seed)
+    sample = rng.sample(chunks, min(count, len(chunks)))
+    queries = []
+    for chunk in sample:
+        words = chunk["text"].split()
+        start = rng.randint(0, max(0, len(words) - 20))
+        queries.append(" ".join(words[start:start + 20]))
+    return queries
+
+
+def get_embedder(kind: str = "hash", dim: int = 1024):
+    """'hash' for the offline stand-in, 'model' for the configured embedder"""
+    if kind == "hash":
+        from backend.benchmarks.fake_embeddings import HashEmbeddings
+        return HashEmbeddings(dim=dim)
+    if kind == "model":
+        from backend.vectorstore.backends import create_base_embeddings
+        return create_base_embeddings()
+    raise ValueError(f"Unknown embedder: {kind}")
+
+
+def replicate(vectors: np.ndarray, copies: int, scale: float = 0.02, seed: int = 0) -> np.ndarray:
+    """Add jittered copies of a small corpus to simulate a larger tenant"""
+    if copies <= 1:
+        return vectors
+    rng = np.random.default_rng(seed)
+    noisy = [
+        vectors + rng.normal(scale=scale, size=vectors.shape).astype(np.float32)
+        for _ in range(copies - 1)
+    ]
+    return np.concatenate([vectors] + noisy)
@@ -0,0 +1,88 @@
+"""
+Embedding backend benchmark: PyTorch vs ONNX Runtime (fp32 / int8).
+
+Reports document throughput, single-query latency and cosine agreement of
+each ONNX variant with the current HuggingFaceEmbeddings output.
+
+    python -m backend.benchmarks.embedding_bench data/docs --threads 4
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.benchmarks.common import latency_summary, peak_rss_mb, write_report
+from backend.benchmarks.corpus import load_chunks, make_queries
+from backend.vectorstore.backends import EMBEDDING_MODEL, create_base_embeddings
+
+
+def measure(embedder, texts, queries):
+    started = time.perf_counter()
+    vectors = np.asarray(embedder.embed_documents(texts), dtype=np.float32)
+    doc_seconds = time.perf_counter() - started
+
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        embedder.embed_query(query)
+        latencies.append(time.perf_counter() - started)
+
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors, {
+        "documents_per_second": round(len(texts) / doc_seconds, 2),
+        "query_latency": latency_summary(latencies),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="*", help="documents or directories (default: data/docs)")
+    parser.add_argument("--texts", type=int, default=256, help="max chunks to embed")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=0, help="ONNX intra-op threads (0 = all cores)")
+    parser.add_argument("--output", help="write JSON report to this path")
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.paths)
+    if not chunks:
+        parser.error("no documents found")
+    texts = [chunk["text"] for chunk in chunks][:args.texts]
+    queries = make_queries(chunks, args.queries)
+
+    from backend.vectorstore.onnx_embeddings import OnnxEmbeddings
+
+    variants = [
+        ("torch", lambda: create_base_embeddings("torch")),
+        ("onnx_fp32", lambda: OnnxEmbeddings(EMBEDDING_MODEL, quantize=False, intra_op_threads=args.threads)),
+        ("onnx_int8", lambda: OnnxEmbeddings(EMBEDDING_MODEL, quantize=True, intra_op_threads=args.threads)),
+    ]
+
+    results = {"model": EMBEDDING_MODEL, "texts": len(texts), "variants": []}
+    reference = None
+    for name, factory in variants:
+        embedder = factory()
+        # Warm-up so lazy initialisation isn't counted
+        embedder.embed_documents(texts[:4])
+        vectors, stats = measure(embedder, texts, queries)
+        stats["variant"] = name
+
+        if reference is None:
+            reference = vectors
+        else:
+            cosine = (vectors * reference).sum(axis=1)
+            stats["cosine_vs_torch"] = {
+                "mean": round(float(cosine.mean()), 5),
+                "min": round(float(cosine.min()), 5),
+            }
+            stats["speedup_vs_torch"] = round(
+                stats["documents_per_second"] / results["variants"][0]["documents_per_second"], 2
+            )
+        results["variants"].append(stats)
+        del embedder
+
+    write_report("embedding", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Deterministic hashing embedder.
+
+Stands in for bge-large when benchmarks must run offline or without the
+model cost. Texts sharing words get similar vectors, which is enough to
+exercise indexing and retrieval code paths.
+"""
+import math
+import re
+import zlib
+from typing import List
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+class HashEmbeddings:
+    """LangChain-compatible embeddings based on hashed unigrams and bigrams"""
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        tokens = _TOKEN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
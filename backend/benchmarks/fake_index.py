@@ -0,0 +1,123 @@
+"""
+Local stand-in for a Pinecone index.
+
+Simulates request latency and transient failures so ingestion and retrieval
+code can be exercised without network access or API quota.
+"""
+import math
+import random
+import threading
+import time
+from typing import Dict, List
+
+
+class FakeTransientError(Exception):
+    """Mimics a retryable HTTP error from the vector database"""
+
+    def __init__(self, status: int = 503):
+        super().__init__(f"simulated HTTP {status}")
+        self.status = status
+
+
+class FakeIndex:
+    """In-memory index with the subset of the Pinecone Index API we use"""
+
+    def __init__(
+            self,
+            upsert_latency: float = 0.05,
+            query_latency: float = 0.02,
+            latency_jitter: float = 0.5,
+            error_rate: float = 0.0,
+            seed: int = 0
+    ):
+        self.upsert_latency = upsert_latency
+        self.query_latency = query_latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._namespaces: Dict[str, Dict[str, Dict]] = {}
+
+        self.upsert_calls = 0
+        self.failed_calls = 0
+        self.max_concurrency = 0
+        self._active = 0
+
+    def _sleep(self, base: float):
+        with self._lock:
+            jitter = self._random.uniform(-self.latency_jitter, self.latency_jitter)
+        time.sleep(max(0.0, base * (1 + jitter)))
+
+    def upsert(self, vectors: List[Dict], namespace: str = ""):
+        with self._lock:
+            self.upsert_calls += 1
+            self._active += 1
+            self.max_concurrency = max(self.max_concurrency, self._active)
+            fail = self._random.random() < self.error_rate
+
+        try:
+            self._sleep(self.upsert_latency)
+            if fail:
+                with self._lock:
+                    self.failed_calls += 1
+                raise FakeTransientError(self._random.choice([429, 503]))
+
+            with self._lock:
+                store = self._namespaces.setdefault(namespace or "", {})
+                for vector in vectors:
+                    store[vector["id"]] = vector
+            return {"upserted_count": len(vectors)}
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def query(
+            self,
+            vector: List[float],
+            top_k: int = 10,
+            namespace: str = "",
+            filter: Dict = None,
+            include_metadata: bool = False,
+            **kwargs
+    ) -> Dict:
+        self._sleep(self.query_latency)
+
+        with self._lock:
+            candidates = list(self._namespaces.get(namespace or "", {}).values())
+
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        matches = []
+        for item in candidates:
+            if filter and not _matches_filter(item.get("metadata", {}), filter):
+                continue
+            values = item["values"]
+            item_norm = math.sqrt(sum(x * x for x in values)) or 1.0
+            score = sum(a * b for a, b in zip(vector, values)) / (norm * item_norm)
+            match = {"id": item["id"], "score": score}
+            if include_metadata:
+                match["metadata"] = item.get("metadata", {})
+            matches.append(match)
+
+        matches.sort(key=lambda m: m["score"], reverse=True)
+        return {"matches": matches[:top_k], "namespace": namespace}
+
+    def vector_count(self, namespace: str = "") -> int:
+        with self._lock:
+            return len(self._namespaces.get(namespace or "", {}))
+
+
+def _matches_filter(metadata: Dict, filter: Dict) -> bool:
+    """Evaluate the $eq/$in/$exists subset of Pinecone metadata filters"""
+    for key, condition in filter.items():
+        value = metadata.get(key)
+        if isinstance(condition, dict):
+            if "$exists" in condition and (key in metadata) != condition["$exists"]:
+                return False
+            if "$eq" in condition and value != condition["$eq"]:
+                return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
@@ -0,0 +1,61 @@
+"""
+Stand-in for the Groq client, for load tests that must not spend quota.
+
+Mimics the small slice of the SDK that llama_groq uses:
+``client.chat.completions.create(..., stream=True)`` yielding chunks with
+``chunk.choices[0].delta.content``. Time to first token and tokens/second
+are configurable; sleeps are blocking, like the real synchronous client.
+"""
+import random
+import time
+from types import SimpleNamespace
+
+_WORDS = (
+    "the model answers using retrieved context from your uploaded documents "
+    "and cites the source file when relevant to the question asked"
+).split()
+
+
+def _chunk(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class FakeGroq:
+    """Drop-in for ``groq.Groq`` with a synthetic streaming completion"""
+
+    ttft = 0.3
+    tokens_per_second = 200.0
+    tokens = 150
+    jitter = 0.1
+    seed = None
+
+    def __init__(self, api_key: str = None, **kwargs):
+        self._rng = random.Random(self.seed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    @classmethod
+    def configure(cls, ttft: float, tokens_per_second: float, tokens: int, jitter: float = 0.1, seed: int = None):
+        cls.ttft = ttft
+        cls.tokens_per_second = tokens_per_second
+        cls.tokens = tokens
+        cls.jitter = jitter
+        cls.seed = seed
+
+    def _jittered(self, seconds: float) -> float:
+        return max(0.0, seconds * (1 + self._rng.uniform(-self.jitter, self.jitter)))
+
+    def _create(self, stream: bool = False, max_tokens: int = None, **kwargs):
+        count = min(self.tokens, max_tokens or self.tokens)
+        if not stream:
+            time.sleep(self._jittered(self.ttft + count / self.tokens_per_second))
+            text = " ".join(self._rng.choice(_WORDS) for _ in range(count))
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+        return self._stream(count)
+
+    def _stream(self, count: int):
+        time.sleep(self._jittered(self.ttft))
+        interval = 1.0 / self.tokens_per_second
+        for i in range(count):
+            if i:
+                time.sleep(interval)
+            yield _chunk(self._rng.choice(_WORDS) + " ")
@@ -0,0 +1,211 @@
+"""
+Ingestion throughput benchmark: extraction, splitting, embedding, upsert.
+
+Generates synthetic PDF / DOCX / TXT corpora and times each upload stage
+separately, comparing the two extraction paths the app has:
+    pdf   PyPDF2 (DocumentProcessor)  vs  pypdf (PyPDFLoader in files.py)
+    docx  python-docx (DocumentProcessor)  vs  docx2txt (Docx2txtLoader in files.py)
+    txt   plain read
+
+Embedding uses the hash stand-in by default (--embedder model for the real
+one) and upserts go through UpsertEngine into FakeIndex with configurable
+latency. End-to-end /api/upload latency under load is covered by loadtest.
+
+    python -m backend.benchmarks.ingestion_bench --documents 20 --pages 10
+    python -m backend.benchmarks.ingestion_bench --formats pdf --pages 50 --embedder model --output ingest.json
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from backend.benchmarks.common import peak_rss_mb, write_report
+from backend.benchmarks.corpus import get_embedder
+from backend.benchmarks.fake_index import FakeIndex
+from backend.benchmarks.synthetic_docs import make_corpus
+from backend.utils.document_processor import DocumentProcessor
+from backend.vectorstore.upsert_engine import UpsertEngine
+
+
+def _pypdf_loader(path: str) -> str:
+    from langchain_community.document_loaders import PyPDFLoader
+    return "\n".join(page.page_content for page in PyPDFLoader(path).load())
+
+
+def _docx2txt_loader(path: str) -> str:
+    from langchain_community.document_loaders import Docx2txtLoader
+    return "\n".join(doc.page_content for doc in Docx2txtLoader(path).load())
+
+
+def extractors() -> Dict[str, Dict[str, Callable[[str], str]]]:
+    processor = DocumentProcessor()
+    return {
+        "pdf": {"pypdf2": processor._extract_pdf, "pypdf": _pypdf_loader},
+        "docx": {"python-docx": processor._extract_docx, "docx2txt": _docx2txt_loader},
+        "txt": {"read": processor._extract_txt},
+    }
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def rate(count: float, seconds: float) -> float:
+    return round(count / seconds, 2) if seconds > 0 else None
+
+
+def stage_extract(paths: List[str], extract: Callable[[str], str], pages: int) -> Dict:
+    # Untimed first call so lazy imports aren't counted as parsing time
+    extract(paths[0])
+    texts, seconds = timed(lambda: [extract(path) for path in paths])
+    total_bytes = sum(os.path.getsize(path) for path in paths)
+    return {
+        "texts": texts,
+        "stats": {
+            "seconds": round(seconds, 4),
+            "pages_per_second": rate(pages * len(paths), seconds),
+            "mb_per_second": rate(total_bytes / 1e6, seconds),
+            "characters": sum(len(t) for t in texts),
+            "peak_rss_mb": peak_rss_mb(),
+        },
+    }
+
+
+def stage_split(texts: List[str], chunk_size: int, chunk_overlap: int) -> Dict:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks, seconds = timed(lambda: [c for text in texts for c in splitter.split_text(text)])
+    return {
+        "chunks": chunks,
+        "stats": {
+            "seconds": round(seconds, 4),
+            "chunks": len(chunks),
+            "chunks_per_second": rate(len(chunks), seconds),
+            "peak_rss_mb": peak_rss_mb(),
+        },
+    }
+
+
+def stage_embed(chunks: List[str], embedder, batch_size: int) -> Dict:
+    def embed():
+        vectors = []
+        for start in range(0, len(chunks), batch_size):
+            vectors.extend(embedder.embed_documents(chunks[start:start + batch_size]))
+        return vectors
+
+    vectors, seconds = timed(embed)
+    return {
+        "vectors": vectors,
+        "stats": {
+            "seconds": round(seconds, 4),
+            "chunks_per_second": rate(len(chunks), seconds),
+            "peak_rss_mb": peak_rss_mb(),
+        },
+    }
+
+
+def stage_upsert(vectors, upsert_latency: float) -> Dict:
+    index = FakeIndex(upsert_latency=upsert_latency, latency_jitter=0.2)
+
+    def upsert():
+        with UpsertEngine(index, namespace="ingest-bench") as engine:
+            for i, values in enumerate(vectors):
+                engine.add({"id": f"chunk_{i}", "values": values, "metadata": {"user_id": "1"}})
+            return engine.stats
+
+    stats, seconds = timed(upsert)
+    return {
+        "seconds": round(seconds, 4),
+        "chunks_per_second": rate(len(vectors), seconds),
+        "batches": stats["batches"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--formats", default="pdf,docx,txt")
+    parser.add_argument("--documents", type=int, default=10, help="documents per format")
+    parser.add_argument("--pages", type=int, default=10, help="pages per document")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--embedder", choices=["hash", "model"], default="hash")
+    parser.add_argument("--embed-batch-size", type=int, default=32)
+    parser.add_argument("--upsert-latency", type=float, default=0.05, help="fake index upsert latency (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON report to this path")
+    args = parser.parse_args()
+
+    embedder = get_embedder(args.embedder)
+    available = extractors()
+    results = {
+        "documents_per_format": args.documents,
+        "pages_per_document": args.pages,
+        "embedder": args.embedder,
+        "formats": [],
+    }
+
+    workdir = tempfile.mkdtemp(prefix="ingest_bench_")
+    try:
+        for fmt in args.formats.split(","):
+            directory = os.path.join(workdir, fmt)
+            os.makedirs(directory)
+            paths, generate_seconds = timed(
+                lambda: make_corpus(directory, f".{fmt}", args.documents, args.pages, args.seed)
+            )
+            entry = {
+                "format": fmt,
+                "corpus_mb": round(sum(os.path.getsize(p) for p in paths) / 1e6, 3),
+                "generate_seconds": round(generate_seconds, 3),
+                "extraction": [],
+            }
+
+            chunks = None
+            for name, extract in available[fmt].items():
+                run = {"extractor": name}
+                try:
+                    extracted = stage_extract(paths, extract, args.pages)
+                except ImportError as e:
+                    run["error"] = f"not installed: {e}"
+                    entry["extraction"].append(run)
+                    continue
+                run["extract"] = extracted["stats"]
+                split = stage_split(extracted["texts"], args.chunk_size, args.chunk_overlap)
+                run["split"] = split["stats"]
+                entry["extraction"].append(run)
+                if chunks is None:
+                    chunks = split["chunks"]
+
+            # Embedding and upsert don't depend on the extractor; run them once
+            if chunks:
+                embedded = stage_embed(chunks, embedder, args.embed_batch_size)
+                entry["embed"] = embedded["stats"]
+                entry["upsert"] = stage_upsert(embedded["vectors"], args.upsert_latency)
+
+                first = next(run for run in entry["extraction"] if "extract" in run)
+                stage_seconds = [
+                    first["extract"]["seconds"],
+                    first["split"]["seconds"],
+                    entry["embed"]["seconds"],
+                    entry["upsert"]["seconds"],
+                ]
+                entry["stage_share"] = dict(zip(
+                    ("extract", "split", "embed", "upsert"),
+                    (round(s / sum(stage_seconds), 3) for s in stage_seconds)
+                ))
+            results["formats"].append(entry)
+            shutil.rmtree(directory, ignore_errors=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    write_report("ingestion", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
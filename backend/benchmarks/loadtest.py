@@ -0,0 +1,316 @@
+"""
+Offline load test of the chat and upload endpoints.
+
+Starts the real FastAPI app under uvicorn in this process, with Groq replaced
+by FakeGroq, the vector index by FakeIndex and the embedding model by
+HashEmbeddings, on a throwaway SQLite database. Concurrent authenticated
+users then drive /api/chat, /ws/chat and /api/upload for a fixed duration.
+
+    python -m backend.benchmarks.loadtest --users 20 --duration 30 --scenario mixed
+    python -m backend.benchmarks.loadtest --ttft 0.5 --tokens-per-second 80 --output load.json
+
+Reports throughput, error counts and p50/p95/p99 latency per endpoint, plus
+client-side time to first token for WebSocket streams and the server-side
+stage histograms from /metrics.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+SCENARIOS = {
+    "chat": {"chat": 1.0},
+    "ws": {"ws": 1.0},
+    "upload": {"upload": 1.0},
+    "mixed": {"chat": 0.6, "ws": 0.3, "upload": 0.1},
+}
+
+QUESTIONS = [
+    "How do I define a Django model?",
+    "What does the settings file configure?",
+    "Explain URL routing in the guide",
+    "How are templates rendered?",
+    "What is the admin site used for?",
+    "How do migrations work?",
+]
+
+
+def configure_environment(workdir: str):
+    """Point the app at throwaway storage before any backend module is imported"""
+    defaults = {
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        "CHUNK_STORE_DIR": os.path.join(workdir, "chunk_store"),
+        "SECRET_KEY": "loadtest-secret",
+        "GROQ_API_KEY": "loadtest",
+        "GOOGLE_CLIENT_ID": "loadtest",
+        "GOOGLE_CLIENT_SECRET": "loadtest",
+        "GOOGLE_REDIRECT_URI": "http://localhost/auth/google/callback",
+        "EMAIL_HOST": "localhost",
+        "EMAIL_PORT": "25",
+        "EMAIL_HOST_USER": "loadtest",
+        "EMAIL_HOST_PASSWORD": "loadtest",
+        "DEFAULT_FROM_EMAIL": "loadtest@example.com",
+        "WARMUP_ON_STARTUP": "False",
+        "EMBEDDING_PROJECTION_PATH": "",
+    }
+    for key, value in defaults.items():
+        os.environ[key] = value
+
+
+def install_fakes(args):
+    """Swap the external services for local stand-ins"""
+    from backend.benchmarks.fake_embeddings import HashEmbeddings
+    from backend.benchmarks.fake_index import FakeIndex
+    from backend.benchmarks.fake_llm import FakeGroq
+    from backend.llm import llama_groq
+    from backend.vectorstore import backends
+
+    FakeGroq.configure(args.ttft, args.tokens_per_second, args.tokens, seed=args.seed)
+    llama_groq.Groq = FakeGroq
+    backends._embeddings = HashEmbeddings()
+    backends._index = FakeIndex(
+        upsert_latency=args.upsert_latency, query_latency=args.query_latency, seed=args.seed
+    )
+
+
+def create_users(count: int) -> List[str]:
+    """Create load-test users directly in the database and return their tokens"""
+    from backend.auth.utils import create_access_token
+    from backend.database.connection import SessionLocal, init_db
+    from backend.database.models import User
+
+    init_db()
+    db = SessionLocal()
+    try:
+        tokens = []
+        for i in range(count):
+            email = f"load{i}@example.com"
+            if not db.query(User).filter(User.email == email).first():
+                db.add(User(email=email, username=f"load{i}", full_name=f"Load User {i}"))
+            tokens.append(create_access_token({"sub": email}))
+        db.commit()
+        return tokens
+    finally:
+        db.close()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int):
+    import uvicorn
+    from backend.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("uvicorn did not start")
+        time.sleep(0.05)
+    return server, thread
+
+
+def make_upload(rng: random.Random, paragraphs: int) -> bytes:
+    words = " ".join(QUESTIONS).lower().replace("?", "").split()
+    return "\n\n".join(
+        " ".join(rng.choice(words) for _ in range(120)) for _ in range(paragraphs)
+    ).encode("utf-8")
+
+
+class Recorder:
+    """Per-endpoint latencies, TTFTs and error counts"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.ttft: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.last_error: Dict[str, str] = {}
+
+    def ok(self, endpoint: str, seconds: float, ttft: float = None):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        if ttft is not None:
+            self.ttft.setdefault(endpoint, []).append(ttft)
+
+    def error(self, endpoint: str, message: str):
+        self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        self.last_error[endpoint] = message[:200]
+
+
+async def do_chat(client, token: str, rng: random.Random, recorder: Recorder):
+    started = time.perf_counter()
+    try:
+        response = await client.post(
+            "/api/chat",
+            json={"question": rng.choice(QUESTIONS)},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        body = response.json()
+        if response.status_code != 200 or "error" in body:
+            raise RuntimeError(f"{response.status_code}: {body}")
+        recorder.ok("chat", time.perf_counter() - started)
+    except Exception as e:
+        recorder.error("chat", str(e))
+
+
+async def do_ws(ws_url: str, rng: random.Random, recorder: Recorder, connection: Dict):
+    import websockets
+
+    started = time.perf_counter()
+    try:
+        if connection.get("ws") is None:
+            connection["ws"] = await websockets.connect(ws_url)
+        ws = connection["ws"]
+        await ws.send(rng.choice(QUESTIONS))
+        ttft = None
+        while True:
+            message = await ws.recv()
+            if ttft is None:
+                ttft = time.perf_counter() - started
+            if message == "[DONE]":
+                break
+            if message.startswith("Error:"):
+                raise RuntimeError(message)
+        recorder.ok("ws", time.perf_counter() - started, ttft)
+    except Exception as e:
+        connection["ws"] = None
+        recorder.error("ws", str(e))
+
+
+async def do_upload(client, token: str, rng: random.Random, recorder: Recorder, paragraphs: int):
+    started = time.perf_counter()
+    try:
+        response = await client.post(
+            "/api/upload",
+            files={"file": ("loadtest.txt", make_upload(rng, paragraphs), "text/plain")},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.status_code}: {response.text}")
+        recorder.ok("upload", time.perf_counter() - started)
+    except Exception as e:
+        recorder.error("upload", str(e))
+
+
+async def virtual_user(user_id: int, token: str, base_url: str, args, recorder: Recorder, stop_at: float):
+    import httpx
+
+    rng = random.Random(args.seed * 1000 + user_id)
+    mix = SCENARIOS[args.scenario]
+    actions, weights = list(mix), list(mix.values())
+    connection = {}
+    ws_url = base_url.replace("http://", "ws://") + "/ws/chat"
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as client:
+        while time.perf_counter() < stop_at:
+            action = rng.choices(actions, weights)[0]
+            if action == "chat":
+                await do_chat(client, token, rng, recorder)
+            elif action == "ws":
+                await do_ws(ws_url, rng, recorder, connection)
+            else:
+                await do_upload(client, token, rng, recorder, args.upload_paragraphs)
+            if args.think_time:
+                await asyncio.sleep(rng.expovariate(1 / args.think_time))
+
+    if connection.get("ws") is not None:
+        await connection["ws"].close()
+
+
+async def drive(base_url: str, tokens: List[str], args) -> Recorder:
+    recorder = Recorder()
+    stop_at = time.perf_counter() + args.duration
+    await asyncio.gather(*(
+        virtual_user(i, token, base_url, args, recorder, stop_at)
+        for i, token in enumerate(tokens)
+    ))
+    return recorder
+
+
+def server_stages() -> Dict:
+    """Mean of each server-side stage histogram recorded during the run"""
+    from backend.utils.metrics import registry
+
+    stages = {}
+    for metric in registry._metrics.values():
+        if metric.type_name != "histogram":
+            continue
+        for values, series in metric._series():
+            if series.count:
+                name = metric.name + (f"[{','.join(values)}]" if values else "")
+                stages[name] = {
+                    "count": series.count,
+                    "mean_ms": round(1000 * series._sum / series.count, 3),
+                }
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--ttft", type=float, default=0.3, help="fake LLM time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--tokens", type=int, default=150, help="tokens per fake answer")
+    parser.add_argument("--query-latency", type=float, default=0.02, help="fake vector query latency (s)")
+    parser.add_argument("--upsert-latency", type=float, default=0.05, help="fake vector upsert latency (s)")
+    parser.add_argument("--upload-paragraphs", type=int, default=20)
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between requests (s)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON report to this path")
+    args = parser.parse_args()
+
+    from backend.benchmarks.common import latency_summary, peak_rss_mb, write_report
+
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir:
+        configure_environment(workdir)
+        install_fakes(args)
+        tokens = create_users(args.users)
+
+        port = free_port()
+        server, thread = start_server(port)
+        try:
+            started = time.perf_counter()
+            recorder = asyncio.run(drive(f"http://127.0.0.1:{port}", tokens, args))
+            elapsed = time.perf_counter() - started
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+        endpoints = {}
+        for endpoint in sorted(set(recorder.latencies) | set(recorder.errors)):
+            latencies = recorder.latencies.get(endpoint, [])
+            stats = {
+                "requests": len(latencies),
+                "errors": recorder.errors.get(endpoint, 0),
+                "throughput_rps": round(len(latencies) / elapsed, 2),
+                "latency": latency_summary(latencies),
+            }
+            if endpoint in recorder.ttft:
+                stats["ttft"] = latency_summary(recorder.ttft[endpoint])
+            if endpoint in recorder.last_error:
+                stats["last_error"] = recorder.last_error[endpoint]
+            endpoints[endpoint] = stats
+
+        write_report("loadtest", {
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+            "elapsed_seconds": round(elapsed, 2),
+            "endpoints": endpoints,
+            "server_stages": server_stages(),
+            "peak_rss_mb": peak_rss_mb(),
+        }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Full-dimension vs projected embeddings: latency, memory and recall@k.
+
+Fits PCA (and truncation) projections on half of the corpus, indexes the
+whole corpus in each space with exact search, and measures how many of the
+full-dimension top-k neighbours each projected index still returns.
+
+    python -m backend.benchmarks.projection_bench data/docs --embedder model --dims 256,384
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from backend.benchmarks.common import latency_summary, write_report
+from backend.benchmarks.corpus import get_embedder, load_chunks, make_queries, replicate
+from backend.vectorstore.local_index import LocalVectorIndex
+from backend.vectorstore.projection import Projection
+
+
+def run_variant(name: str, vectors: np.ndarray, queries: np.ndarray, truth, k: int, version: str):
+    directory = tempfile.mkdtemp(prefix=f"pbench_{name}_")
+    try:
+        index = LocalVectorIndex(directory, quantization="none", projection_version=version)
+        started = time.perf_counter()
+        for start in range(0, len(vectors), 1000):
+            index.upsert([
+                {"id": str(i), "values": vectors[i].tolist()}
+                for i in range(start, min(start + 1000, len(vectors)))
+            ])
+        build_seconds = time.perf_counter() - started
+
+        latencies, hits = [], 0
+        for q, expected in zip(queries, truth):
+            started = time.perf_counter()
+            matches = index.query(q.tolist(), top_k=k)["matches"]
+            latencies.append(time.perf_counter() - started)
+            hits += len(expected & {int(m["id"]) for m in matches})
+
+        return {
+            "variant": name,
+            "dim": vectors.shape[1],
+            f"recall@{k}": round(hits / (k * len(queries)), 4),
+            "ram_bytes": index.memory_bytes(),
+            "build_seconds": round(build_seconds, 3),
+            "query_latency": latency_summary(latencies),
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="*", help="documents or directories (default: data/docs)")
+    parser.add_argument("--embedder", choices=["hash", "model"], default="hash")
+    parser.add_argument("--dims", default="256,384")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--replicate", type=int, default=1,
+                        help="add jittered copies of the corpus to simulate a larger tenant")
+    parser.add_argument("--output", help="write JSON report to this path")
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.paths)
+    if not chunks:
+        parser.error("no documents found")
+
+    embedder = get_embedder(args.embedder)
+    vectors = np.asarray(embedder.embed_documents([c["text"] for c in chunks]), dtype=np.float32)
+    vectors = replicate(vectors, args.replicate)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = np.asarray(embedder.embed_documents(make_queries(chunks, args.queries)), dtype=np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    truth = [set(np.argsort(-(vectors @ q))[:args.k].tolist()) for q in queries]
+
+    # Fit on a sample, as the offline fitting step would
+    rng = np.random.default_rng(0)
+    fit_sample = vectors[rng.permutation(len(vectors))[:max(len(vectors) // 2, 1)]]
+
+    results = {"vectors": len(vectors), "k": args.k, "variants": []}
+    results["variants"].append(run_variant("full", vectors, queries, truth, args.k, None))
+
+    for dim in [int(d) for d in args.dims.split(",")]:
+        projections = [("truncate", Projection.truncate(vectors.shape[1], dim))]
+        if len(fit_sample) >= dim:
+            projections.insert(0, ("pca", Projection.fit_pca(fit_sample, dim)))
+        else:
+            print(f"⚠️ Skipping PCA {dim}: only {len(fit_sample)} sample vectors (use --replicate)")
+
+        for method, projection in projections:
+            results["variants"].append(run_variant(
+                f"{method}{dim}",
+                projection.transform(vectors),
+                projection.transform(queries),
+                truth,
+                args.k,
+                projection.version,
+            ))
+
+    write_report("projection", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Memory / recall report for the local index quantization modes.
+
+Embeds a local corpus, builds one LocalVectorIndex per mode and compares
+recall@k against exact float32 search, plus in-RAM bytes and query latency.
+
+    python -m backend.benchmarks.quantization_bench data/docs --embedder model
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import backend.vectorstore.local_index as local_index
+from backend.benchmarks.common import latency_summary, write_report
+from backend.benchmarks.corpus import get_embedder, load_chunks, make_queries, replicate
+from backend.vectorstore.local_index import LocalVectorIndex
+
+
+def exact_top_k(matrix: np.ndarray, query: np.ndarray, k: int):
+    scores = matrix @ query
+    return set(np.argsort(-scores)[:k].tolist())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="*", help="documents or directories (default: data/docs)")
+    parser.add_argument("--embedder", choices=["hash", "model"], default="hash")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank-factors", default="1,4,8")
+    parser.add_argument("--pq-subvectors", type=int, default=64)
+    parser.add_argument("--replicate", type=int, default=1,
+                        help="add jittered copies of the corpus to simulate a larger tenant")
+    parser.add_argument("--output", help="write JSON report to this path")
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.paths)
+    if not chunks:
+        parser.error("no documents found")
+
+    embedder = get_embedder(args.embedder)
+    vectors = np.asarray(embedder.embed_documents([c["text"] for c in chunks]), dtype=np.float32)
+    vectors = replicate(vectors, args.replicate)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    queries = np.asarray(embedder.embed_documents(make_queries(chunks, args.queries)), dtype=np.float32)
+    truth = [exact_top_k(vectors, q, args.k) for q in queries]
+
+    # Train on whatever this corpus has rather than waiting for the defaults
+    local_index.SQ_TRAIN_SIZE = min(local_index.SQ_TRAIN_SIZE, len(vectors))
+    local_index.PQ_TRAIN_SIZE = min(local_index.PQ_TRAIN_SIZE, len(vectors))
+    local_index.PQ_SUBVECTORS = args.pq_subvectors
+
+    float_bytes = vectors.nbytes
+    results = {
+        "vectors": len(vectors),
+        "dim": vectors.shape[1],
+        "k": args.k,
+        "float32_bytes": float_bytes,
+        "modes": [],
+    }
+
+    for mode in ("none", "int8", "pq"):
+        for factor in [int(f) for f in args.rerank_factors.split(",")]:
+            directory = tempfile.mkdtemp(prefix=f"qbench_{mode}_")
+            try:
+                index = LocalVectorIndex(directory, quantization=mode, rerank_factor=factor)
+
+                started = time.perf_counter()
+                batch = 1000
+                for start in range(0, len(vectors), batch):
+                    index.upsert([
+                        {"id": str(i), "values": vectors[i].tolist()}
+                        for i in range(start, min(start + batch, len(vectors)))
+                    ])
+                build_seconds = time.perf_counter() - started
+
+                latencies, hits = [], 0
+                for q, expected in zip(queries, truth):
+                    started = time.perf_counter()
+                    matches = index.query(q.tolist(), top_k=args.k)["matches"]
+                    latencies.append(time.perf_counter() - started)
+                    hits += len(expected & {int(m["id"]) for m in matches})
+
+                memory = index.memory_bytes()
+                results["modes"].append({
+                    "quantization": mode,
+                    "rerank_factor": factor,
+                    f"recall@{args.k}": round(hits / (args.k * len(queries)), 4),
+                    "ram_bytes": memory,
+                    "ram_vs_float32": round(memory / float_bytes, 4) if float_bytes else None,
+                    "build_seconds": round(build_seconds, 3),
+                    "query_latency": latency_summary(latencies),
+                })
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+
+            if mode == "none":
+                break  # exact search has nothing to re-rank
+
+    write_report("quantization", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
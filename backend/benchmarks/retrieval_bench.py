@@ -0,0 +1,360 @@
+"""
+Retrieval quality vs latency across chunking and index variants.
+
+Builds a labelled question -> passage set from local documents: each query is
+a noisy excerpt of a document, labelled by the character span it came from.
+Because labels are spans rather than chunk IDs, the same set scores every
+chunking; a chunk is relevant when it covers most of the span.
+
+Each chunking (e.g. files.py's 1000/200 vs load_docs.py's 1000/150) is run
+against each index variant:
+    exact      float32 LocalVectorIndex
+    int8, pq   quantized LocalVectorIndex with exact re-ranking
+    pca<N>     PCA projection to N dims, exact search
+    two_stage  document centroids first, then chunks of the top documents
+    pinecone   the configured Pinecone index, in a scratch namespace (opt-in)
+
+    python -m backend.benchmarks.retrieval_bench data/docs --labels labels.json
+    python -m backend.benchmarks.retrieval_bench --embedder model --chunkings 1000:200,1000:150 --output r.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Dict, List
+
+import numpy as np
+
+import backend.vectorstore.document_vectors as document_vectors
+import backend.vectorstore.local_index as local_index
+from backend.benchmarks.common import latency_summary, write_report
+from backend.benchmarks.corpus import find_documents, get_embedder
+from backend.utils.document_processor import DocumentProcessor
+from backend.vectorstore.document_vectors import DocumentCentroids, document_namespace, query_matches
+from backend.vectorstore.local_index import LocalVectorIndex
+from backend.vectorstore.projection import Projection
+
+DEFAULT_VARIANTS = "exact,int8,pq,pca256,two_stage"
+MIN_SPAN_COVERAGE = 0.5
+
+
+# ============= LABELLED SET =============
+
+def extract_documents(paths: List[str]) -> Dict[str, str]:
+    processor = DocumentProcessor()
+    documents = {}
+    for path in find_documents(paths):
+        text = processor.extract_text(path)
+        if text.strip():
+            documents[path] = text
+    return documents
+
+
+def build_labels(documents: Dict[str, str], count: int, words: int, drop_rate: float, seed: int) -> Dict:
+    """Sample excerpts as queries, dropping some words so they are not verbatim"""
+    rng = random.Random(seed)
+    paths = sorted(documents)
+    queries = []
+    attempts = 0
+    while len(queries) < count and attempts < count * 20:
+        attempts += 1
+        path = rng.choice(paths)
+        text = documents[path]
+        tokens = [(m.start(), m.end()) for m in re.finditer(r"\S+", text)]
+        if len(tokens) < words:
+            continue
+        first = rng.randint(0, len(tokens) - words)
+        span = tokens[first:first + words]
+        start, end = span[0][0], span[-1][1]
+        kept = [text[a:b] for a, b in span if rng.random() >= drop_rate]
+        if len(kept) < words // 2:
+            continue
+        queries.append({
+            "id": f"q{len(queries)}",
+            "document": path,
+            "start": start,
+            "end": end,
+            "query": " ".join(kept),
+        })
+    return {"seed": seed, "words": words, "drop_rate": drop_rate, "queries": queries}
+
+
+def load_or_build_labels(args, documents: Dict[str, str]) -> Dict:
+    if args.labels and os.path.exists(args.labels):
+        with open(args.labels) as f:
+            labels = json.load(f)
+        missing = {q["document"] for q in labels["queries"]} - set(documents)
+        if missing:
+            raise SystemExit(f"Labelled documents not found: {sorted(missing)}")
+        return labels
+
+    labels = build_labels(documents, args.queries, args.query_words, args.drop_rate, args.seed)
+    if args.labels:
+        with open(args.labels, "w") as f:
+            json.dump(labels, f, indent=2)
+        print(f"✅ Labelled set written to {args.labels}")
+    return labels
+
+
+# ============= CHUNKING =============
+
+def chunk_documents(documents: Dict[str, str], chunk_size: int, chunk_overlap: int) -> List[Dict]:
+    """Split like the upload path and recover each chunk's character span"""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len
+    )
+    chunks = []
+    for document_id, path in enumerate(sorted(documents)):
+        text = documents[path]
+        cursor = 0
+        for i, piece in enumerate(splitter.split_text(text)):
+            start = text.find(piece, cursor)
+            if start < 0:
+                start = text.find(piece)
+            end = start + len(piece)
+            cursor = max(cursor, start + 1)
+            chunks.append({
+                "id": f"{document_id}_chunk_{i}",
+                "document": path,
+                "document_id": str(document_id),
+                "start": start,
+                "end": end,
+                "text": piece,
+            })
+    return chunks
+
+
+def relevant_chunks(query: Dict, chunks: List[Dict]) -> set:
+    """Chunks covering most of the query span (at least the best-covering one)"""
+    length = max(1, query["end"] - query["start"])
+    coverage = {}
+    for chunk in chunks:
+        if chunk["document"] != query["document"] or chunk["start"] < 0:
+            continue
+        overlap = min(chunk["end"], query["end"]) - max(chunk["start"], query["start"])
+        if overlap > 0:
+            coverage[chunk["id"]] = overlap / length
+    if not coverage:
+        return set()
+    best = max(coverage.values())
+    return {cid for cid, c in coverage.items() if c >= min(MIN_SPAN_COVERAGE, best)}
+
+
+# ============= SCORING =============
+
+def score(ranked: List[List[str]], truth: List[set], ks: List[int]) -> Dict:
+    results = {}
+    for k in ks:
+        recalls = [len(set(r[:k]) & t) / len(t) for r, t in zip(ranked, truth) if t]
+        results[f"recall@{k}"] = round(float(np.mean(recalls)), 4) if recalls else 0.0
+    reciprocal = []
+    for r, t in zip(ranked, truth):
+        if not t:
+            continue
+        rank = next((i + 1 for i, cid in enumerate(r) if cid in t), None)
+        reciprocal.append(1.0 / rank if rank else 0.0)
+    results[f"mrr@{max(ks)}"] = round(float(np.mean(reciprocal)), 4) if reciprocal else 0.0
+    return results
+
+
+def run_queries(search, queries: np.ndarray, k: int):
+    ranked, latencies = [], []
+    for q in queries:
+        started = time.perf_counter()
+        matches = search(q.tolist(), k)
+        latencies.append(time.perf_counter() - started)
+        ranked.append([m["id"] if isinstance(m, dict) else m.id for m in matches])
+    return ranked, latencies
+
+
+# ============= VARIANTS =============
+
+def _chunk_vectors(chunks: List[Dict], vectors: np.ndarray) -> List[Dict]:
+    return [
+        {"id": c["id"], "values": v.tolist(), "metadata": {"document_id": c["document_id"]}}
+        for c, v in zip(chunks, vectors)
+    ]
+
+
+def run_local(quantization: str, chunks, vectors, queries, k, rerank_factor, projection=None):
+    directory = tempfile.mkdtemp(prefix=f"rbench_{quantization}_")
+    try:
+        if projection is not None:
+            vectors = projection.transform(vectors)
+            queries = projection.transform(queries)
+        index = LocalVectorIndex(
+            directory,
+            quantization=quantization,
+            rerank_factor=rerank_factor,
+            projection_version=projection.version if projection else None,
+        )
+        started = time.perf_counter()
+        index.upsert(_chunk_vectors(chunks, vectors))
+        build_seconds = time.perf_counter() - started
+
+        ranked, latencies = run_queries(
+            lambda q, top_k: index.query(q, top_k=top_k)["matches"], queries, k
+        )
+        return ranked, latencies, {"build_seconds": round(build_seconds, 3), "index_bytes": index.memory_bytes()}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def run_two_stage(chunks, vectors, queries, k, top_documents):
+    directory = tempfile.mkdtemp(prefix="rbench_two_stage_")
+    try:
+        index = LocalVectorIndex(directory, quantization="none")
+        centroids = DocumentCentroids()
+        for chunk, vector in zip(chunks, vectors):
+            centroids.add(chunk["document_id"], vector.tolist())
+        started = time.perf_counter()
+        index.upsert(_chunk_vectors(chunks, vectors))
+        index.upsert(centroids.vectors(), namespace=document_namespace())
+        build_seconds = time.perf_counter() - started
+
+        document_vectors.TWO_STAGE_RETRIEVAL = True
+        ranked, latencies = run_queries(
+            lambda q, top_k: document_vectors.query_two_stage(index, q, top_k, top_documents=top_documents),
+            queries, k
+        )
+        memory = index.memory_bytes() + index.memory_bytes(document_namespace())
+        return ranked, latencies, {"build_seconds": round(build_seconds, 3), "index_bytes": memory}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def run_pinecone(chunks, vectors, queries, k):
+    from backend.vectorstore.backends import create_index
+    from backend.vectorstore.upsert_engine import UpsertEngine
+
+    index = create_index()
+    namespace = f"retrieval-bench-{uuid.uuid4().hex[:8]}"
+    try:
+        started = time.perf_counter()
+        with UpsertEngine(index, namespace=namespace) as engine:
+            engine.add_many(_chunk_vectors(chunks, vectors))
+
+        # Pinecone is eventually consistent; wait until every vector is visible
+        deadline = time.time() + 120
+        while time.time() < deadline:
+            stats = index.describe_index_stats()
+            namespaces = stats.get("namespaces", {}) if isinstance(stats, dict) else stats.namespaces
+            visible = namespaces.get(namespace, {})
+            count = visible.get("vector_count", 0) if isinstance(visible, dict) else visible.vector_count
+            if count >= len(chunks):
+                break
+            time.sleep(1)
+        build_seconds = time.perf_counter() - started
+
+        ranked, latencies = run_queries(
+            lambda q, top_k: query_matches(index, vector=q, top_k=top_k, namespace=namespace),
+            queries, k
+        )
+        return ranked, latencies, {"build_seconds": round(build_seconds, 3), "index_bytes": None}
+    finally:
+        index.delete(delete_all=True, namespace=namespace)
+
+
+def run_variant(name: str, chunks, vectors, queries, k, args):
+    if name == "exact":
+        return run_local("none", chunks, vectors, queries, k, args.rerank_factor)
+    if name in ("int8", "pq"):
+        return run_local(name, chunks, vectors, queries, k, args.rerank_factor)
+    if name.startswith("pca"):
+        dim = int(name[3:])
+        if dim >= vectors.shape[1] or dim > len(vectors):
+            raise ValueError(f"{name} needs more than {dim} chunks and dimensions")
+        projection = Projection.fit_pca(vectors, dim)
+        return run_local("none", chunks, vectors, queries, k, args.rerank_factor, projection)
+    if name == "two_stage":
+        return run_two_stage(chunks, vectors, queries, k, args.top_documents)
+    if name == "pinecone":
+        return run_pinecone(chunks, vectors, queries, k)
+    raise ValueError(f"Unknown variant: {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="*", help="documents or directories (default: data/docs)")
+    parser.add_argument("--labels", help="labelled set JSON; created if missing, reused if present")
+    parser.add_argument("--embedder", choices=["hash", "model"], default="hash")
+    parser.add_argument("--chunkings", default="1000:200,1000:150", help="size:overlap pairs")
+    parser.add_argument("--variants", default=DEFAULT_VARIANTS)
+    parser.add_argument("--ks", default="1,3,5,10")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-words", type=int, default=16)
+    parser.add_argument("--drop-rate", type=float, default=0.3, help="fraction of excerpt words removed")
+    parser.add_argument("--rerank-factor", type=int, default=local_index.RERANK_FACTOR)
+    parser.add_argument("--top-documents", type=int, default=document_vectors.TWO_STAGE_TOP_DOCUMENTS)
+    parser.add_argument("--pq-subvectors", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON report to this path")
+    args = parser.parse_args()
+
+    documents = extract_documents(args.paths)
+    if not documents:
+        parser.error("no documents found")
+    labels = load_or_build_labels(args, documents)
+    ks = sorted(int(k) for k in args.ks.split(","))
+    k = max(ks)
+
+    embedder = get_embedder(args.embedder)
+    query_vectors = np.asarray(
+        embedder.embed_documents([q["query"] for q in labels["queries"]]), dtype=np.float32
+    )
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+
+    local_index.PQ_SUBVECTORS = args.pq_subvectors
+    sq_train_size, pq_train_size = local_index.SQ_TRAIN_SIZE, local_index.PQ_TRAIN_SIZE
+
+    results = {
+        "documents": len(documents),
+        "queries": len(labels["queries"]),
+        "labels_seed": labels["seed"],
+        "embedder": args.embedder,
+        "runs": [],
+    }
+
+    for chunking in args.chunkings.split(","):
+        size, overlap = (int(x) for x in chunking.split(":"))
+        chunks = chunk_documents(documents, size, overlap)
+        truth = [relevant_chunks(q, chunks) for q in labels["queries"]]
+
+        vectors = np.asarray(embedder.embed_documents([c["text"] for c in chunks]), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        # Train quantizers on whatever this corpus has rather than waiting for the defaults
+        local_index.SQ_TRAIN_SIZE = min(sq_train_size, len(vectors))
+        local_index.PQ_TRAIN_SIZE = min(pq_train_size, len(vectors))
+
+        for variant in args.variants.split(","):
+            entry = {
+                "chunk_size": size,
+                "chunk_overlap": overlap,
+                "chunks": len(chunks),
+                "variant": variant,
+            }
+            try:
+                ranked, latencies, extra = run_variant(variant, chunks, vectors, query_vectors, k, args)
+            except Exception as e:
+                entry["error"] = str(e)
+                results["runs"].append(entry)
+                print(f"⚠️ {chunking} {variant}: {e}")
+                continue
+            entry.update(score(ranked, truth, ks))
+            entry["query_latency"] = latency_summary(latencies)
+            entry.update(extra)
+            results["runs"].append(entry)
+
+    write_report("retrieval", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
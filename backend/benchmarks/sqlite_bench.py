@@ -0,0 +1,181 @@
+"""
+SQLite concurrency: default settings vs WAL and the tuned pragmas.
+
+Concurrent async workers run a chat-like mix against a throwaway database
+through aiosqlite: reads page a user's history, writes insert a message and
+touch its conversation in one transaction. Each mode builds its own engine:
+
+    single    rollback journal, one pooled connection (the untuned default)
+    pool      rollback journal, --pool-size connections
+    wal       tuned pragmas, --pool-size connections, writers use busy_timeout
+              (what backend.database.connection uses with SQLITE_TUNED)
+
+    python -m backend.benchmarks.sqlite_bench --workers 32 --duration 10
+    python -m backend.benchmarks.sqlite_bench --modes pool,wal --write-ratio 0.5 --output sqlite.json
+
+Reports throughput, "database is locked" and other errors, and read/write
+latency percentiles per mode.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from backend.benchmarks.common import latency_summary, write_report
+from backend.database.models import Base, User, Conversation, ChatHistory
+from backend.database.sqlite_tuning import install_pragmas
+
+MODES = ["single", "pool", "wal"]
+
+
+def seed(path: str, users: int, messages: int, seed_value: int):
+    """Create the schema and a starting history for each user"""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"id": user_id, "email": f"u{user_id}@example.com", "username": f"u{user_id}"}
+            for user_id in range(1, users + 1)
+        ])
+        connection.execute(insert(Conversation), [
+            {"id": f"c{user_id}", "user_id": user_id, "created_at": now, "updated_at": now}
+            for user_id in range(1, users + 1)
+        ])
+        connection.execute(insert(ChatHistory), [
+            {
+                "user_id": user_id,
+                "conversation_id": f"c{user_id}",
+                "question": f"question {i}",
+                "answer": "answer " * rng.randint(20, 200),
+                "timestamp": now - timedelta(seconds=messages - i),
+            }
+            for user_id in range(1, users + 1)
+            for i in range(messages)
+        ])
+    engine.dispose()
+
+
+def build_engine(path: str, mode: str, pool_size: int, busy_timeout: float):
+    connect_args = {"check_same_thread": False}
+    if mode == "wal":
+        connect_args["timeout"] = busy_timeout
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        connect_args=connect_args,
+        pool_size=1 if mode == "single" else pool_size,
+        max_overflow=0,
+        pool_timeout=60,
+    )
+    if mode == "wal":
+        install_pragmas(engine.sync_engine)
+    return engine
+
+
+async def read_page(session: AsyncSession, user_id: int):
+    await session.execute(
+        select(ChatHistory.id, ChatHistory.question, ChatHistory.answer, ChatHistory.timestamp)
+        .where(ChatHistory.user_id == user_id)
+        .order_by(ChatHistory.timestamp.desc(), ChatHistory.id.desc())
+        .limit(50)
+    )
+
+
+async def write_message(session: AsyncSession, user_id: int):
+    # Like /api/chat: look the conversation up, then insert and touch it
+    await session.execute(select(Conversation.id).where(Conversation.id == f"c{user_id}"))
+    now = datetime.utcnow()
+    await session.execute(insert(ChatHistory).values(
+        user_id=user_id, conversation_id=f"c{user_id}",
+        question="benchmark question", answer="benchmark answer " * 50, timestamp=now
+    ))
+    await session.execute(update(Conversation).where(Conversation.id == f"c{user_id}").values(updated_at=now))
+    await session.commit()
+
+
+async def run_mode(path: str, mode: str, args) -> dict:
+    engine = build_engine(path, mode, args.pool_size, args.busy_timeout)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    deadline = time.perf_counter() + args.duration
+
+    async def worker(index: int):
+        rng = random.Random(args.seed + index)
+        while time.perf_counter() < deadline:
+            kind = "write" if rng.random() < args.write_ratio else "read"
+            user_id = rng.randint(1, args.users)
+            started = time.perf_counter()
+            try:
+                async with sessions() as session:
+                    if kind == "write":
+                        await write_message(session, user_id)
+                    else:
+                        await read_page(session, user_id)
+                latencies[kind].append(time.perf_counter() - started)
+            except OperationalError as e:
+                errors["locked" if "locked" in str(e) else "other"] += 1
+            except Exception:
+                errors["other"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.workers)))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+
+    completed = sum(len(values) for values in latencies.values())
+    return {
+        "operations": completed,
+        "throughput_ops": round(completed / elapsed, 1),
+        "writes_per_second": round(len(latencies["write"]) / elapsed, 1),
+        "errors": dict(errors),
+        "read_latency": latency_summary(latencies["read"]),
+        "write_latency": latency_summary(latencies["write"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--workers", type=int, default=32, help="concurrent async workers")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per mode")
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    parser.add_argument("--pool-size", type=int, default=4, help="connections for pool/wal")
+    parser.add_argument("--busy-timeout", type=float, default=10.0, help="seconds (wal)")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=200, help="seed messages per user")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON report to this path")
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="sqlite-bench-") as workdir:
+        for mode in modes:
+            # Fresh copy per mode so every run starts from the same data
+            path = os.path.join(workdir, f"{mode}.db")
+            seed(path, args.users, args.messages, args.seed)
+            print(f"🔧 Running {mode} for {args.duration}s with {args.workers} workers")
+            results[mode] = asyncio.run(run_mode(path, mode, args))
+
+    write_report("sqlite_bench", {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "modes": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
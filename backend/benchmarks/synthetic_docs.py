@@ -0,0 +1,116 @@
+"""
+Synthetic PDF / DOCX / TXT documents of configurable size.
+
+PDFs are written by hand (Helvetica text, one content stream per page) so no
+PDF-writing dependency is needed; DOCX uses python-docx, which the app
+already depends on.
+"""
+import os
+import random
+from typing import List
+
+_VOCABULARY = (
+    "django model view template url settings database query migration admin form field "
+    "request response middleware session cache static media user group permission signal "
+    "serializer router test client fixture queryset manager index transaction deploy server "
+    "the a of to and in is for with on that by this as are be from it an or at"
+).split()
+
+LINES_PER_PAGE = 50
+WORDS_PER_LINE = 14
+
+
+def make_paragraphs(words: int, rng: random.Random, paragraph_words: int = 120) -> List[str]:
+    paragraphs = []
+    while words > 0:
+        size = min(words, paragraph_words)
+        sentence = " ".join(rng.choice(_VOCABULARY) for _ in range(size))
+        paragraphs.append(sentence[0].upper() + sentence[1:] + ".")
+        words -= size
+    return paragraphs
+
+
+def _lines(paragraphs: List[str]) -> List[str]:
+    lines = []
+    for paragraph in paragraphs:
+        words = paragraph.split()
+        for i in range(0, len(words), WORDS_PER_LINE):
+            lines.append(" ".join(words[i:i + WORDS_PER_LINE]))
+        lines.append("")
+    return lines
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: int, rng: random.Random) -> int:
+    """Write a text PDF with the given number of pages; returns the page count"""
+    lines = _lines(make_paragraphs(pages * LINES_PER_PAGE * WORDS_PER_LINE, rng))
+    page_lines = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)][:pages]
+
+    # 1 catalog, 2 pages, 3 font, then a (page, content) pair per page
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for chunk in page_lines:
+        body = "BT /F1 10 Tf 14 TL 50 760 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in chunk) + " ET"
+        stream = body.encode("latin-1")
+        page_number = len(objects) + 1
+        kids.append(f"{page_number} 0 R")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_number + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, obj in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + obj + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return len(kids)
+
+
+def write_docx(path: str, pages: int, rng: random.Random) -> int:
+    """Write a DOCX with roughly `pages` pages of paragraphs; returns paragraph count"""
+    from docx import Document
+
+    document = Document()
+    paragraphs = make_paragraphs(pages * LINES_PER_PAGE * WORDS_PER_LINE, rng)
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    document.save(path)
+    return len(paragraphs)
+
+
+def write_txt(path: str, pages: int, rng: random.Random) -> int:
+    paragraphs = make_paragraphs(pages * LINES_PER_PAGE * WORDS_PER_LINE, rng)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(paragraphs))
+    return len(paragraphs)
+
+
+WRITERS = {".pdf": write_pdf, ".docx": write_docx, ".txt": write_txt}
+
+
+def make_corpus(directory: str, fmt: str, documents: int, pages: int, seed: int = 0) -> List[str]:
+    """Create `documents` files of `pages` pages each in `directory`"""
+    rng = random.Random(seed)
+    writer = WRITERS[fmt]
+    paths = []
+    for i in range(documents):
+        path = os.path.join(directory, f"synthetic_{i}{fmt}")
+        writer(path, pages, rng)
+        paths.append(path)
+    return paths
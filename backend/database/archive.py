@@ -0,0 +1,286 @@
+"""
+Tiered archival of old chat history.
+
+Messages older than ARCHIVE_AFTER_DAYS move out of chat_history into
+zstd-compressed NDJSON segments on local disk, one file per (user,
+conversation, day) batch:
+
+    ARCHIVE_DIR/<user_id>/<uuid>.jsonl.zst
+
+The archive_segments table is the index: owner, conversation, row count and
+the (timestamp, id) range of each file. A segment never spans two days, so
+the analytics rollups can count archived messages per day from the index
+alone. Writing a segment, inserting its
+index row and deleting the archived rows from chat_history happen in one
+transaction per batch; if the delete doesn't remove every row (another
+worker archived them first) the batch is rolled back and the file removed.
+
+Archived messages are read back on demand: a conversation page that runs
+past the last hot message is filled from the conversation's segments, with
+the same (timestamp, id) cursor. Archived messages are not covered by the
+full-text search or the flat /chat-history listing.
+"""
+import json
+import os
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import zstandard
+from decouple import config
+from sqlalchemy import select, delete, and_, or_
+from sqlalchemy.orm import Session
+
+from backend.database.connection import SessionLocal
+from backend.database.models import User, ChatHistory, ArchiveSegment
+from backend.utils import rollups
+
+ARCHIVE_ENABLED = config("ARCHIVE_ENABLED", default=False, cast=bool)
+ARCHIVE_AFTER_DAYS = config("ARCHIVE_AFTER_DAYS", default=180, cast=int)
+# Relative paths resolve against the project root, not the working directory,
+# so the server and CLI tools find the same segment files wherever they start
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+ARCHIVE_DIR = os.path.join(PROJECT_ROOT, config("ARCHIVE_DIR", default="chat_archive"))
+ARCHIVE_ZSTD_LEVEL = config("ARCHIVE_ZSTD_LEVEL", default=10, cast=int)
+# Oldest rows of a user moved per batch (split into one segment per conversation and day)
+ARCHIVE_BATCH_ROWS = config("ARCHIVE_BATCH_ROWS", default=2000, cast=int)
+ARCHIVE_INTERVAL = config("ARCHIVE_INTERVAL", default=3600.0, cast=float)
+# Decompressed segments kept in memory for repeated page loads
+ARCHIVE_CACHE_SEGMENTS = config("ARCHIVE_CACHE_SEGMENTS", default=64, cast=int)
+
+SEGMENT_SUFFIX = ".jsonl.zst"
+
+
+def _full_path(path: str) -> str:
+    return os.path.join(ARCHIVE_DIR, path)
+
+
+def _write_segment(user_id: int, chats: List[ChatHistory]) -> str:
+    """Compress chats into a new segment file; returns its path relative to ARCHIVE_DIR"""
+    path = os.path.join(str(user_id), uuid.uuid4().hex + SEGMENT_SUFFIX)
+    full_path = _full_path(path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+    payload = "".join(
+        json.dumps({
+            "id": chat.id,
+            "conversation_id": chat.conversation_id,
+            "question": chat.question,
+            "answer": chat.answer,
+            "timestamp": chat.timestamp.isoformat(),
+        }, ensure_ascii=False) + "\n"
+        for chat in chats
+    ).encode("utf-8")
+
+    temp_path = full_path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(zstandard.ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL).compress(payload))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, full_path)
+    return path
+
+
+def _read_segment_file(path: str) -> Tuple[Dict, ...]:
+    with open(_full_path(path), "rb") as f:
+        raw = zstandard.ZstdDecompressor().decompress(f.read())
+    messages = []
+    for line in raw.decode("utf-8").splitlines():
+        message = json.loads(line)
+        message["timestamp"] = datetime.fromisoformat(message["timestamp"])
+        messages.append(message)
+    return tuple(messages)
+
+
+_load_segment = lru_cache(maxsize=ARCHIVE_CACHE_SEGMENTS)(_read_segment_file)
+
+
+def read_segment(path: str, cached: bool = True) -> List[Dict]:
+    """
+    Messages of the segment at path as dicts (id, conversation_id, question, answer, timestamp).
+    Full reads (exports) pass cached=False so they don't evict the segments
+    cached for conversation pages.
+    """
+    if not cached:
+        return list(_read_segment_file(path))
+    return [dict(message) for message in _load_segment(path)]
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(_full_path(path))
+        except FileNotFoundError:
+            pass
+
+
+def _archive_batch(db: Session, user_id: int, cutoff: datetime) -> int:
+    """Archive the user's oldest rows before cutoff; returns the rows moved, -1 on conflict"""
+    chats = db.scalars(
+        select(ChatHistory)
+        .where(ChatHistory.user_id == user_id, ChatHistory.timestamp < cutoff)
+        .order_by(ChatHistory.timestamp, ChatHistory.id)
+        .limit(ARCHIVE_BATCH_ROWS)
+    ).all()
+    if not chats:
+        return 0
+
+    by_conversation_day = defaultdict(list)
+    for chat in chats:
+        by_conversation_day[chat.conversation_id, chat.timestamp.date()].append(chat)
+
+    paths = []
+    try:
+        for (conversation_id, _), group in by_conversation_day.items():
+            path = _write_segment(user_id, group)
+            paths.append(path)
+            db.add(ArchiveSegment(
+                user_id=user_id,
+                conversation_id=conversation_id,
+                path=path,
+                row_count=len(group),
+                min_timestamp=group[0].timestamp,
+                min_chat_id=group[0].id,
+                max_timestamp=group[-1].timestamp,
+                max_chat_id=group[-1].id,
+            ))
+
+        ids = [chat.id for chat in chats]
+        result = db.execute(
+            delete(ChatHistory).where(ChatHistory.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        if result.rowcount != len(ids):
+            db.rollback()
+            _remove_files(paths)
+            return -1
+        db.commit()
+    except Exception:
+        db.rollback()
+        _remove_files(paths)
+        raise
+
+    for chat in chats:
+        db.expunge(chat)
+    return len(chats)
+
+
+def run_archive(db: Session = None, cutoff: Optional[datetime] = None) -> Dict[str, int]:
+    """Move every message older than cutoff (default: ARCHIVE_AFTER_DAYS ago) to segments"""
+    cutoff = cutoff or datetime.utcnow() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    own_session = db is None
+    db = db or SessionLocal()
+    archived = users = 0
+    try:
+        # Archived rows stay in the chat totals, so fold them in before they
+        # leave chat_history
+        rollups.refresh(db)
+        # Per user, so every batch query is served by (user_id, timestamp, id)
+        for user_id in db.scalars(select(User.id).order_by(User.id)).all():
+            moved_any = False
+            while True:
+                moved = _archive_batch(db, user_id, cutoff)
+                if moved <= 0:
+                    break
+                archived += moved
+                moved_any = True
+            users += moved_any
+        return {"messages": archived, "users": users}
+    finally:
+        if own_session:
+            db.close()
+
+
+def _key(message: Dict) -> Tuple[datetime, int]:
+    return message["timestamp"], message["id"]
+
+
+def archived_messages(
+        db: Session,
+        user_id: int,
+        conversation_id: str,
+        before: Optional[Tuple[datetime, int]],
+        limit: int
+) -> List[Dict]:
+    """
+    Up to limit archived messages of a conversation with a (timestamp, id)
+    key below before (all of them if None), newest first.
+    """
+    query = select(ArchiveSegment).where(
+        ArchiveSegment.user_id == user_id,
+        ArchiveSegment.conversation_id == conversation_id
+    )
+    if before:
+        timestamp, chat_id = before
+        query = query.where(or_(
+            ArchiveSegment.min_timestamp < timestamp,
+            and_(ArchiveSegment.min_timestamp == timestamp, ArchiveSegment.min_chat_id < chat_id)
+        ))
+    segments = db.scalars(
+        query.order_by(ArchiveSegment.max_timestamp.desc(), ArchiveSegment.max_chat_id.desc())
+    ).all()
+
+    messages = []
+    for segment in segments:
+        # Segments are newest-first by their last message; once a full page is
+        # collected, older segments can't contribute anything newer
+        if len(messages) >= limit and (segment.max_timestamp, segment.max_chat_id) < _key(messages[limit - 1]):
+            break
+        for message in read_segment(segment.path):
+            if before is None or _key(message) < tuple(before):
+                messages.append(message)
+        messages.sort(key=_key, reverse=True)
+    return messages[:limit]
+
+
+def delete_segments(db: Session, *criteria) -> int:
+    """Delete matching segments and their files; returns the archived messages removed"""
+    segments = db.execute(select(ArchiveSegment.path, ArchiveSegment.row_count).where(*criteria)).all()
+    if not segments:
+        return 0
+    rollups.unfold_archived(db, *criteria)
+    db.execute(delete(ArchiveSegment).where(*criteria).execution_options(synchronize_session=False))
+    db.commit()
+    # Files go only after the index rows are gone; a crash in between leaves
+    # unreferenced files, never index rows pointing at nothing
+    _remove_files(path for path, _ in segments)
+    return sum(row_count for _, row_count in segments)
+
+
+class ChatArchiver:
+    """Runs run_archive() every ARCHIVE_INTERVAL seconds in a daemon thread"""
+
+    def __init__(self, interval: float = ARCHIVE_INTERVAL):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the archive loop (no-op if already running)"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="chat-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                result = run_archive()
+                if result["messages"]:
+                    print(f"✅ Archived {result['messages']} messages of {result['users']} users")
+            except Exception as e:
+                print(f"⚠️ Chat archival failed: {e}")
+            self._stop.wait(self.interval)
+
+
+# Global instance
+chat_archiver = ChatArchiver()
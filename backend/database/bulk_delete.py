@@ -0,0 +1,99 @@
+"""
+Set-based deletes for conversations, chat history and users.
+
+`session.delete(conversation)` with an ORM cascade loads every message and
+deletes them one statement at a time. These helpers delete children with
+`DELETE ... WHERE id IN (...)` in chunks of BULK_DELETE_CHUNK_SIZE ids, committing after each chunk so a long delete
+never holds the (SQLite) write lock for the whole run, then delete the parent.
+
+Migration 0006 also adds ON DELETE CASCADE to the foreign keys on PostgreSQL,
+and the relationships use passive_deletes, so a plain parent delete never
+loads children either. SQLite keeps its foreign keys unenforced, which is
+why the children are always deleted explicitly here.
+
+Deleted messages are also taken out of the analytics rollups
+(backend.utils.rollups) in the same transaction as each chunk.
+
+All helpers take a sync Session; async handlers call them through
+`await db.run_sync(...)`. A delete interrupted between chunks leaves the
+parent with fewer children; running it again finishes the job.
+"""
+from typing import Callable, Dict, List, Optional
+
+from decouple import config
+from sqlalchemy import select, delete, update
+from sqlalchemy.orm import Session
+
+from backend.database import archive
+from backend.database.models import User, Conversation, ChatHistory, AdminAction, ArchiveSegment
+from backend.utils import rollups
+
+BULK_DELETE_CHUNK_SIZE = config("BULK_DELETE_CHUNK_SIZE", default=1000, cast=int)
+
+
+def delete_in_chunks(
+        db: Session,
+        model,
+        *criteria,
+        chunk_size: int = BULK_DELETE_CHUNK_SIZE,
+        before_delete: Optional[Callable[[Session, List[int]], None]] = None
+) -> int:
+    """
+    Delete rows of model matching criteria, chunk_size rows per transaction.
+    before_delete(db, ids) runs in each chunk's transaction ahead of its delete.
+    """
+    deleted = 0
+    while True:
+        ids = db.scalars(select(model.id).where(*criteria).order_by(model.id).limit(chunk_size)).all()
+        if not ids:
+            return deleted
+        if before_delete is not None:
+            before_delete(db, ids)
+        result = db.execute(
+            delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        db.commit()
+        deleted += result.rowcount
+        if len(ids) < chunk_size:
+            return deleted
+
+
+def delete_conversation(db: Session, user_id: int, conversation_id: str) -> int:
+    """Delete a conversation and its (hot and archived) messages; returns the messages deleted"""
+    messages = delete_in_chunks(
+        db, ChatHistory, ChatHistory.conversation_id == conversation_id, before_delete=rollups.unfold_chats
+    )
+    messages += archive.delete_segments(
+        db, ArchiveSegment.user_id == user_id, ArchiveSegment.conversation_id == conversation_id
+    )
+    db.execute(
+        delete(Conversation)
+        .where(Conversation.id == conversation_id)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return messages
+
+
+def clear_history(db: Session, user_id: int) -> int:
+    """Delete all of a user's chat messages, archived ones included (conversations are kept)"""
+    messages = delete_in_chunks(
+        db, ChatHistory, ChatHistory.user_id == user_id, before_delete=rollups.unfold_chats
+    )
+    return messages + archive.delete_segments(db, ArchiveSegment.user_id == user_id)
+
+
+def purge_user(db: Session, user_id: int) -> Dict[str, int]:
+    """
+    Hard-delete a user with their messages and conversations.
+    Audit rows and block markers that point at the user are kept with the
+    reference cleared.
+    """
+    messages = clear_history(db, user_id)
+    conversations = delete_in_chunks(db, Conversation, Conversation.user_id == user_id)
+
+    db.execute(update(AdminAction).where(AdminAction.target_user_id == user_id).values(target_user_id=None))
+    db.execute(update(User).where(User.blocked_by == user_id).values(blocked_by=None))
+    db.execute(delete(User).where(User.id == user_id).execution_options(synchronize_session=False))
+    db.commit()
+    return {"messages": messages, "conversations": conversations}
@@ -1,20 +1,122 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from decouple import config
-from backend.database.models import Base
+import os
+import time
+
+from backend.utils.metrics import (
+    DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, DB_POOL_CONNECTIONS, DB_POOL_WAIT_SECONDS
+)
+from backend.database.sqlite_tuning import (
+    SQLITE_TUNED, SQLITE_BUSY_TIMEOUT, SQLITE_READ_POOL_SIZE, install_pragmas
+)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "alembic.ini")
+# Revision matching the schema the old create_all-based init_db produced
+BASELINE_REVISION = "0001"
 
 DATABASE_URL = config("DATABASE_URL", default="sqlite:///./genai_chatbot.db")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# Connection pool (SQLite uses its own settings, see _engine_options)
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=10, cast=int)
+DB_MAX_OVERFLOW = config("DB_MAX_OVERFLOW", default=20, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=30.0, cast=float)
+DB_POOL_RECYCLE = config("DB_POOL_RECYCLE", default=1800, cast=int)
+DB_POOL_PRE_PING = config("DB_POOL_PRE_PING", default=True, cast=bool)
+
+# Async drivers for the sync DATABASE_URL's backend
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def _async_url(url: str) -> str:
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {parsed.get_backend_name()}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = config("ASYNC_DATABASE_URL", default=None) or _async_url(DATABASE_URL)
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+
+def _engine_options(is_async: bool = False) -> dict:
+    if IS_SQLITE:
+        options = {"connect_args": {"check_same_thread": False}}
+        if SQLITE_TUNED:
+            # WAL lets reads run beside the writer; writers wait on
+            # busy_timeout (see backend.database.sqlite_tuning)
+            options["connect_args"]["timeout"] = SQLITE_BUSY_TIMEOUT
+            if is_async:
+                options.update(pool_size=SQLITE_READ_POOL_SIZE, max_overflow=0, pool_timeout=DB_POOL_TIMEOUT)
+            return options
+        if is_async:
+            # SQLite allows one writer at a time; with several pooled async
+            # connections concurrent requests fail with "database is locked"
+            # instead of queueing, so requests share a single connection
+            options.update(pool_size=1, max_overflow=0, pool_timeout=DB_POOL_TIMEOUT)
+        return options
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _instrument_pool(sync_engine, name: str):
+    """Report checked-out/overflow connections of an engine's pool to /metrics"""
+    pool = sync_engine.pool
+    checked_out = DB_POOL_CHECKED_OUT.labels(engine=name)
+    overflow = DB_POOL_OVERFLOW.labels(engine=name)
+    connections = DB_POOL_CONNECTIONS.labels(engine=name)
+
+    def update_overflow():
+        if hasattr(pool, "overflow"):
+            overflow.set(max(pool.overflow(), 0))
+
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        connections.inc()
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_out.inc()
+        update_overflow()
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out.dec()
+        update_overflow()
+
+
+engine = create_engine(DATABASE_URL, **_engine_options())
+_instrument_pool(engine, "sync")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(is_async=True))
+_instrument_pool(async_engine.sync_engine, "async")
+
+if IS_SQLITE and SQLITE_TUNED:
+    install_pragmas(engine)
+    install_pragmas(async_engine.sync_engine)
+
+# expire_on_commit=False: attributes stay readable after commit without an
+# implicit (and, under asyncio, illegal) lazy reload
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 
 def get_db():
-    """Database dependency for FastAPI"""
+    """Database dependency for FastAPI (sync handlers and background jobs)"""
     db = SessionLocal()
     try:
         yield db
@@ -22,7 +124,32 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Async database dependency for FastAPI"""
+    async with AsyncSessionLocal() as db:
+        # Check out the connection up front so pool waits are measured
+        started = time.perf_counter()
+        await db.connection()
+        DB_POOL_WAIT_SECONDS.labels(engine="async").observe(time.perf_counter() - started)
+        yield db
+
+
 def init_db():
-    """Create all database tables"""
-    Base.metadata.create_all(bind=engine)
+    """Create or upgrade database tables through the Alembic migrations"""
+    from alembic import command
+    from alembic.config import Config
+
+    alembic_config = Config(ALEMBIC_INI)
+    alembic_config.attributes["configure_logger"] = False
+
+    with engine.begin() as connection:
+        alembic_config.attributes["connection"] = connection
+        tables = set(inspect(connection).get_table_names())
+
+        # Databases created by create_all before migrations existed
+        if "users" in tables and "alembic_version" not in tables:
+            command.stamp(alembic_config, BASELINE_REVISION)
+            print(f"✅ Existing database stamped at revision {BASELINE_REVISION}")
+
+        command.upgrade(alembic_config, "head")
     print("✅ Database tables created successfully!")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, Text, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -42,8 +42,15 @@ class User(Base):
     last_login = Column(DateTime, nullable=True)
 
     # Relationships
-    chat_history = relationship("ChatHistory", back_populates="user", cascade="all, delete-orphan")
-    conversations = relationship("Conversation", back_populates="user", cascade="all, delete-orphan")
+    # passive_deletes: children are removed by ON DELETE CASCADE or by
+    # backend.database.bulk_delete, never loaded just to be deleted
+    chat_history = relationship("ChatHistory", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    conversations = relationship("Conversation", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        # Keyset order of the admin user list
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
     def __repr__(self):
         return f"<User {self.email}>"
@@ -54,7 +61,7 @@ class Conversation(Base):
     __tablename__ = "conversations"
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     title = Column(String, default="New Chat")
     
     # Timestamps
@@ -63,7 +70,12 @@ class Conversation(Base):
     
     # Relationships
     user = relationship("User", back_populates="conversations")
-    messages = relationship("ChatHistory", back_populates="conversation", cascade="all, delete-orphan")
+    messages = relationship("ChatHistory", back_populates="conversation", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        # Conversation list: a user's conversations, most recently updated first
+        Index("ix_conversations_user_updated", "user_id", "updated_at", "id"),
+    )
 
 
 class ChatHistory(Base):
@@ -71,8 +83,8 @@ class ChatHistory(Base):
     __tablename__ = "chat_history"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    conversation_id = Column(String, ForeignKey("conversations.id"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    conversation_id = Column(String, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=True)
     
     question = Column(Text, nullable=False)
     answer = Column(Text, nullable=False)
@@ -82,6 +94,12 @@ class ChatHistory(Base):
     user = relationship("User", back_populates="chat_history")
     conversation = relationship("Conversation", back_populates="messages")
 
+    __table_args__ = (
+        # History pages are keyset-paginated on (timestamp, id) per user / conversation
+        Index("ix_chat_history_user_timestamp", "user_id", "timestamp", "id"),
+        Index("ix_chat_history_conversation_timestamp", "conversation_id", "timestamp", "id"),
+    )
+
     def __repr__(self):
         return f"<ChatHistory {self.id}>"
 
@@ -115,3 +133,41 @@ class UserAnalytics(Base):
     
     def __repr__(self):
         return f"<UserAnalytics {self.date}>"
+
+
+class AnalyticsCounter(Base):
+    """Running totals and rollup watermarks maintained by backend.utils.rollups"""
+    __tablename__ = "analytics_counters"
+    
+    name = Column(String(64), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<AnalyticsCounter {self.name}={self.value}>"
+
+
+class ArchiveSegment(Base):
+    """Index entry for a compressed file of archived chat history (backend.database.archive)"""
+    __tablename__ = "archive_segments"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    conversation_id = Column(String, nullable=True)  # NULL for messages outside any conversation
+    path = Column(String, nullable=False)  # Relative to ARCHIVE_DIR
+    row_count = Column(Integer, nullable=False)
+
+    # (timestamp, id) range of the archived messages, for keyset paging
+    min_timestamp = Column(DateTime, nullable=False)
+    min_chat_id = Column(Integer, nullable=False)
+    max_timestamp = Column(DateTime, nullable=False)
+    max_chat_id = Column(Integer, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_archive_segments_conversation", "user_id", "conversation_id", "max_timestamp"),
+    )
+
+    def __repr__(self):
+        return f"<ArchiveSegment {self.path}>"
@@ -0,0 +1,252 @@
+"""
+Indexed search and cheap result counts.
+
+`User.email.contains(q)` compiles to LIKE '%q%', which no B-tree index can
+serve. Migration 0004 adds trigram indexes instead:
+
+- PostgreSQL: pg_trgm GIN indexes on users.email/username, used by ILIKE
+- SQLite: an FTS5 table (users_fts) with the trigram tokenizer, kept in sync
+  with users by triggers
+
+Trigrams need at least 3 characters; shorter terms fall back to a LIKE scan.
+
+Chat history gets word-level full-text search (migration 0005):
+
+- PostgreSQL: a generated, weighted tsvector column (search_vector) with a
+  GIN index on (user_id, search_vector)
+- SQLite: an FTS5 table (chat_history_fts) over user_id, question and
+  answer, kept in sync by triggers; user_id is indexed as a token so the
+  per-user filter is part of the full-text lookup
+"""
+import html
+import re
+from typing import Dict, List, Tuple
+
+from decouple import config
+from sqlalchemy import select, func, or_, text, column
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from backend.database.models import User, ChatHistory
+
+MIN_TRIGRAM_LENGTH = 3
+USERS_FTS_TABLE = "users_fts"
+CHAT_HISTORY_FTS_TABLE = "chat_history_fts"
+
+# Created by raw SQL in the migrations, so Alembic autogenerate must skip them
+# (FTS5 also creates <table>_data, _idx, _docsize and _config shadow tables)
+SEARCH_TABLE_PREFIXES = (USERS_FTS_TABLE, CHAT_HISTORY_FTS_TABLE)
+SEARCH_INDEXES = {"ix_users_email_trgm", "ix_users_username_trgm", "ix_chat_history_search"}
+SEARCH_COLUMNS = {"search_vector"}
+
+# Highlight markers used inside SQL; swapped for <mark> after HTML-escaping
+MARK_START, MARK_END = "\x02", "\x03"
+SNIPPET_WORDS = 24
+
+# Estimated counts on SQLite stop counting here
+SEARCH_COUNT_CAP = config("SEARCH_COUNT_CAP", default=10000, cast=int)
+
+
+def is_search_object(name: str, type_: str) -> bool:
+    """True for tables/indexes managed outside the SQLAlchemy metadata"""
+    if type_ == "table":
+        return name.startswith(SEARCH_TABLE_PREFIXES)
+    if type_ == "index":
+        return name in SEARCH_INDEXES
+    if type_ == "column":
+        return name in SEARCH_COLUMNS
+    return False
+
+
+def dialect_name(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def has_table(db: Session, name: str) -> bool:
+    """Cheap existence check for SQLite virtual tables"""
+    return db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": name}
+    ).first() is not None
+
+
+def fts_phrase(term: str) -> str:
+    """Quote a user-supplied term as a single FTS5 phrase"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def like_pattern(term: str) -> str:
+    """'%term%' with LIKE wildcards escaped (use with escape='\\\\')"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def user_search_clause(db: Session, term: str):
+    """WHERE clause matching users whose email or username contains term"""
+    term = term.strip()
+
+    if (
+        dialect_name(db) == "sqlite"
+        and len(term) >= MIN_TRIGRAM_LENGTH
+        and has_table(db, USERS_FTS_TABLE)
+    ):
+        matches = text(
+            f"SELECT rowid FROM {USERS_FTS_TABLE} WHERE {USERS_FTS_TABLE} MATCH :fts_query"
+        ).bindparams(fts_query=fts_phrase(term)).columns(column("rowid"))
+        return User.id.in_(matches)
+
+    # On PostgreSQL the trigram GIN indexes serve ILIKE '%term%'
+    pattern = like_pattern(term)
+    return or_(
+        User.email.ilike(pattern, escape="\\"),
+        User.username.ilike(pattern, escape="\\")
+    )
+
+
+def estimate_count(db: Session, query: Select) -> Tuple[int, bool]:
+    """
+    Approximate row count of a query as (count, is_estimate).
+    PostgreSQL reads the planner's estimate; elsewhere counting stops at
+    SEARCH_COUNT_CAP.
+    """
+    if dialect_name(db) == "postgresql":
+        compiled = query.compile(dialect=db.get_bind().dialect, compile_kwargs={"render_postcompile": True})
+        # exec_driver_sql passes parameters straight to the driver: a tuple in
+        # placeholder order for positional styles (asyncpg's $1), else a dict
+        params = compiled.params
+        if compiled.positional:
+            params = tuple(params[name] for name in compiled.positiontup)
+        plan = db.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), params).scalar()
+        return int(plan[0]["Plan"]["Plan Rows"]), True
+
+    capped = query.order_by(None).limit(SEARCH_COUNT_CAP).subquery()
+    count = db.scalar(select(func.count()).select_from(capped))
+    return count, count >= SEARCH_COUNT_CAP
+
+
+def search_terms(query: str) -> List[str]:
+    """Words of a free-text query (operators and punctuation are dropped)"""
+    return re.findall(r"\w+", query.lower())
+
+
+def render_highlight(value: str) -> str:
+    """HTML-escape stored text, then turn the match markers into <mark> tags"""
+    if value is None:
+        return None
+    escaped = html.escape(value)
+    return escaped.replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def _python_highlight(value: str, terms: List[str]) -> str:
+    if not terms:
+        return value
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    return pattern.sub(lambda match: MARK_START + match.group(0) + MARK_END, value)
+
+
+def _search_chat_history_postgres(db: Session, user_id: int, query: str, limit: int):
+    # ts_headline is expensive, so it only runs on the ranked top rows
+    options = (
+        f"StartSel={MARK_START}, StopSel={MARK_END}, "
+        f"MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}, MaxFragments=2"
+    )
+    return db.execute(text("""
+        WITH q AS (SELECT websearch_to_tsquery('english', :query) AS query),
+        hits AS (
+            SELECT chat_history.id, ts_rank_cd(search_vector, q.query) AS rank
+            FROM chat_history, q
+            WHERE user_id = :user_id AND search_vector @@ q.query
+            ORDER BY rank DESC, chat_history.id DESC
+            LIMIT :limit
+        )
+        SELECT c.id, c.conversation_id, c.timestamp, hits.rank,
+               ts_headline('english', c.question, q.query, :full_options) AS question,
+               ts_headline('english', c.answer, q.query, :options) AS answer
+        FROM hits JOIN chat_history c ON c.id = hits.id, q
+        ORDER BY hits.rank DESC, c.id DESC
+    """), {
+        "query": query,
+        "user_id": user_id,
+        "limit": limit,
+        "options": options,
+        "full_options": f"StartSel={MARK_START}, StopSel={MARK_END}, HighlightAll=true",
+    }).mappings().all()
+
+
+def _search_chat_history_sqlite(db: Session, user_id: int, terms: List[str], limit: int):
+    # bm25 is lower-is-better; question matches weigh double (user_id column 0)
+    match = f'user_id : "{int(user_id)}" AND {{question answer}} : (' + " ".join(
+        fts_phrase(term) for term in terms
+    ) + ")"
+    table = CHAT_HISTORY_FTS_TABLE
+    return db.execute(text(f"""
+        SELECT c.id, c.conversation_id, c.timestamp, -bm25({table}, 0.0, 2.0, 1.0) AS rank,
+               highlight({table}, 1, :start, :end) AS question,
+               snippet({table}, 2, :start, :end, '…', :words) AS answer
+        FROM {table} JOIN chat_history c ON c.id = {table}.rowid
+        WHERE {table} MATCH :match
+        ORDER BY bm25({table}, 0.0, 2.0, 1.0), c.id DESC
+        LIMIT :limit
+    """), {
+        "match": match,
+        "start": MARK_START,
+        "end": MARK_END,
+        "words": SNIPPET_WORDS,
+        "limit": limit,
+    }).mappings().all()
+
+
+def _search_chat_history_like(db: Session, user_id: int, terms: List[str], limit: int):
+    # No full-text index: newest rows containing every term
+    query = select(ChatHistory).where(ChatHistory.user_id == user_id)
+    for term in terms:
+        pattern = like_pattern(term)
+        query = query.where(or_(
+            ChatHistory.question.ilike(pattern, escape="\\"),
+            ChatHistory.answer.ilike(pattern, escape="\\")
+        ))
+    chats = db.scalars(
+        query.order_by(ChatHistory.timestamp.desc(), ChatHistory.id.desc()).limit(limit)
+    ).all()
+    return [
+        {
+            "id": chat.id,
+            "conversation_id": chat.conversation_id,
+            "timestamp": chat.timestamp,
+            "rank": None,
+            "question": _python_highlight(chat.question, terms),
+            "answer": _python_highlight(chat.answer, terms),
+        }
+        for chat in chats
+    ]
+
+
+def search_chat_history(db: Session, user_id: int, query: str, limit: int = 20) -> List[Dict]:
+    """
+    Ranked full-text search over one user's questions and answers.
+    Returns dicts with id, conversation_id, timestamp, rank and HTML-safe
+    question/answer highlights (matches wrapped in <mark>).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    dialect = dialect_name(db)
+    if dialect == "postgresql":
+        rows = _search_chat_history_postgres(db, user_id, query, limit)
+    elif dialect == "sqlite" and has_table(db, CHAT_HISTORY_FTS_TABLE):
+        rows = _search_chat_history_sqlite(db, user_id, terms, limit)
+    else:
+        rows = _search_chat_history_like(db, user_id, terms, limit)
+
+    return [
+        {
+            "id": row["id"],
+            "conversation_id": row["conversation_id"],
+            "timestamp": row["timestamp"],
+            "rank": row["rank"],
+            "question": render_highlight(row["question"]),
+            "answer": render_highlight(row["answer"]),
+        }
+        for row in rows
+    ]
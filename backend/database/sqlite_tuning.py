@@ -0,0 +1,59 @@
+"""
+Production settings for SQLite deployments.
+
+With SQLITE_TUNED (default on), every SQLite connection gets:
+- journal_mode=WAL: readers no longer block the writer or each other
+- synchronous=NORMAL: in WAL mode, fsync only at checkpoints; a power loss can
+  drop the last transactions but never corrupts the database
+- mmap_size, cache_size, temp_store=MEMORY: fewer read syscalls
+- busy_timeout: a writer waits for the lock instead of failing with
+  "database is locked"
+
+SQLite still allows a single writer. Concurrent writers, from the async
+engine and the sync one (rollups, archiver, write-behind flush), wait on the
+database lock through busy_timeout, while reads run in parallel on up to
+SQLITE_READ_POOL_SIZE async connections. An in-process queue for async
+writers was measured and dropped: sync writers bypassed it, and it was
+slower than busy_timeout alone (see backend.benchmarks.sqlite_bench).
+"""
+from decouple import config
+from sqlalchemy import event
+
+SQLITE_TUNED = config("SQLITE_TUNED", default=True, cast=bool)
+SQLITE_SYNCHRONOUS = config("SQLITE_SYNCHRONOUS", default="NORMAL")
+SQLITE_BUSY_TIMEOUT = config("SQLITE_BUSY_TIMEOUT", default=10.0, cast=float)  # seconds
+SQLITE_MMAP_SIZE = config("SQLITE_MMAP_SIZE", default=256 * 1024 * 1024, cast=int)  # bytes
+SQLITE_CACHE_SIZE_KB = config("SQLITE_CACHE_SIZE_KB", default=64 * 1024, cast=int)
+# Async connections in tuned mode (reads run in parallel; writes wait on busy_timeout)
+SQLITE_READ_POOL_SIZE = config("SQLITE_READ_POOL_SIZE", default=4, cast=int)
+
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def pragmas():
+    """PRAGMA statements run on every new connection in tuned mode"""
+    synchronous = SQLITE_SYNCHRONOUS.upper()
+    if synchronous not in SYNCHRONOUS_MODES:
+        raise ValueError(f"SQLITE_SYNCHRONOUS must be one of {sorted(SYNCHRONOUS_MODES)}")
+    return [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT * 1000)}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def install_pragmas(sync_engine):
+    """Apply the tuned pragmas to each connection the engine opens"""
+    statements = pragmas()
+
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
@@ -0,0 +1,352 @@
+"""
+Optional write-behind buffer for chat history and login bookkeeping.
+
+With WRITE_BEHIND_ENABLED, /api/chat and /auth/login don't commit their own
+small transactions. New conversations, chat rows and last_login/login_count
+updates are queued in memory and written by a background thread every
+WRITE_BEHIND_FLUSH_INTERVAL seconds (or sooner once WRITE_BEHIND_MAX_BATCH
+items are queued), one bulk transaction per flush. The buffer is flushed on
+shutdown.
+
+Read-your-writes: endpoints that read or delete a user's history call
+`await write_behind.ensure_flushed(user_id)` first, which flushes (or waits
+for the flush in progress) when that user has queued or in-flight rows. The
+buffer is per process, so this only holds for requests served by the worker
+that queued the write; with several workers a read on another worker can
+miss rows for up to WRITE_BEHIND_FLUSH_INTERVAL. Rows still queued when the
+process is killed without a shutdown are lost, hence the feature is off by
+default.
+
+Since chat rows are inserted later, /api/chat responds with "id": null while
+write-behind is on; the ids show up in the history endpoints after the flush.
+
+A flush that fails because of the rows themselves (a constraint or data
+error) is retried in halves, so the good rows are still written and only
+rows that fail on their own are dropped. Other errors (database locked or
+unreachable) put the whole batch back for the next flush, and it is dropped
+after WRITE_BEHIND_MAX_ATTEMPTS attempts. Dropped rows are counted in
+write_behind_dropped_rows_total.
+"""
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from decouple import config
+from sqlalchemy import insert, update, bindparam, func
+from sqlalchemy.exc import DBAPIError, DataError, IntegrityError, StatementError
+from starlette.concurrency import run_in_threadpool
+
+from backend.database.connection import SessionLocal
+from backend.database.models import User, Conversation, ChatHistory
+from backend.utils.metrics import (
+    WRITE_BEHIND_FLUSH_SECONDS, WRITE_BEHIND_ROWS, WRITE_BEHIND_PENDING, WRITE_BEHIND_DROPPED
+)
+
+WRITE_BEHIND_ENABLED = config("WRITE_BEHIND_ENABLED", default=False, cast=bool)
+WRITE_BEHIND_FLUSH_INTERVAL = config("WRITE_BEHIND_FLUSH_INTERVAL", default=0.5, cast=float)
+WRITE_BEHIND_MAX_BATCH = config("WRITE_BEHIND_MAX_BATCH", default=500, cast=int)
+# A batch that keeps failing (other than on its own rows) is dropped after this many flush attempts
+WRITE_BEHIND_MAX_ATTEMPTS = config("WRITE_BEHIND_MAX_ATTEMPTS", default=5, cast=int)
+
+_UPDATE_LOGIN = (
+    update(User)
+    .where(User.id == bindparam("b_user_id"))
+    .values(
+        last_login=bindparam("b_last_login"),
+        login_count=func.coalesce(User.login_count, 0) + bindparam("b_logins")
+    )
+)
+
+_TOUCH_CONVERSATION = (
+    update(Conversation)
+    .where(Conversation.id == bindparam("b_id"))
+    .values(updated_at=bindparam("b_updated_at"))
+)
+
+
+class WriteBehind:
+    """Thread-safe queue of pending writes plus the thread that flushes it"""
+
+    def __init__(
+            self,
+            enabled: bool = WRITE_BEHIND_ENABLED,
+            interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+            max_batch: int = WRITE_BEHIND_MAX_BATCH
+    ):
+        self.enabled = enabled
+        self.interval = interval
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        # Serializes flushes so a forced flush waits for one in progress
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._reset()
+        # Batch being written by flush(): still pending for readers until committed
+        self._inflight_conversations: Dict[str, Dict] = {}
+        self._inflight_users = set()
+        self._attempts = 0
+
+    def _reset(self):
+        self._conversations: Dict[str, Dict] = {}
+        self._chats: List[Dict] = []
+        self._logins: Dict[int, Dict] = {}
+        self._users = set()
+
+    def _pending(self) -> int:
+        return len(self._conversations) + len(self._chats) + len(self._logins)
+
+    def _queued(self):
+        pending = self._pending()
+        WRITE_BEHIND_PENDING.set(pending)
+        if pending >= self.max_batch:
+            self._wake.set()
+
+    # ----- producers -----
+
+    def add_conversation(self, conversation_id: str, user_id: int, title: str, created_at: datetime):
+        with self._lock:
+            self._conversations[conversation_id] = {
+                "id": conversation_id,
+                "user_id": user_id,
+                "title": title,
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+            self._users.add(user_id)
+            self._queued()
+
+    def add_chat(self, user_id: int, conversation_id: str, question: str, answer: str, timestamp: datetime):
+        with self._lock:
+            self._chats.append({
+                "user_id": user_id,
+                "conversation_id": conversation_id,
+                "question": question,
+                "answer": answer,
+                "timestamp": timestamp,
+            })
+            self._users.add(user_id)
+            self._queued()
+
+    def add_login(self, user_id: int, when: datetime):
+        with self._lock:
+            entry = self._logins.setdefault(user_id, {"b_user_id": user_id, "b_logins": 0})
+            entry["b_last_login"] = when
+            entry["b_logins"] += 1
+            self._queued()
+
+    # ----- readers -----
+
+    def pending_conversation(self, conversation_id: str, user_id: int) -> Optional[Dict]:
+        """A queued (not yet inserted) conversation of this user, if any"""
+        with self._lock:
+            conversation = (
+                self._conversations.get(conversation_id)
+                or self._inflight_conversations.get(conversation_id)
+            )
+        if conversation and conversation["user_id"] == user_id:
+            return conversation
+        return None
+
+    def has_pending(self, user_id: int) -> bool:
+        """Queued rows of this user, or rows in a flush that hasn't committed yet"""
+        with self._lock:
+            return user_id in self._users or user_id in self._inflight_users
+
+    async def ensure_flushed(self, user_id: int):
+        """
+        Flush before reading/deleting history if this user has pending rows.
+        If they are in a flush already running, flush() waits for it on
+        _flush_lock before returning.
+        """
+        if self.enabled and self.has_pending(user_id):
+            await run_in_threadpool(self.flush)
+
+    # ----- flushing -----
+
+    def flush(self) -> int:
+        """Write everything queued in one transaction; returns the rows written"""
+        with self._flush_lock:
+            with self._lock:
+                conversations = list(self._conversations.values())
+                chats = self._chats
+                logins = list(self._logins.values())
+                self._inflight_conversations = self._conversations
+                self._inflight_users = self._users
+                self._reset()
+            if not (conversations or chats or logins):
+                return 0
+
+            try:
+                with WRITE_BEHIND_FLUSH_SECONDS.time():
+                    self._write(conversations, chats, logins)
+                written = len(conversations) + len(chats) + len(logins)
+                self._attempts = 0
+                WRITE_BEHIND_ROWS.labels(kind="conversation").inc(len(conversations))
+                WRITE_BEHIND_ROWS.labels(kind="chat").inc(len(chats))
+                WRITE_BEHIND_ROWS.labels(kind="login").inc(len(logins))
+            except Exception as e:
+                if _row_error(e):
+                    written = self._write_pieces(conversations, chats, logins)
+                else:
+                    self._requeue(conversations, chats, logins, e)
+                    written = 0
+            finally:
+                with self._lock:
+                    self._inflight_conversations = {}
+                    self._inflight_users = set()
+
+            with self._lock:
+                WRITE_BEHIND_PENDING.set(self._pending())
+            return written
+
+    @staticmethod
+    def _write(conversations=(), chats=(), logins=()):
+        db = SessionLocal()
+        try:
+            # Conversations first: chat rows reference them
+            if conversations:
+                db.execute(insert(Conversation), conversations)
+            if chats:
+                db.execute(insert(ChatHistory), chats)
+                # Same transaction as the chat rows, like the direct path
+                db.connection().execute(_TOUCH_CONVERSATION, _latest_activity(chats))
+            if logins:
+                db.connection().execute(_UPDATE_LOGIN, logins)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _write_pieces(self, conversations, chats, logins) -> int:
+        """
+        Retry a batch that failed on a row-level error in halves, one
+        transaction per piece, until the bad rows are isolated and dropped.
+        Returns the rows written.
+        """
+        written = 0
+        # Stack of (kind, rows): conversations come off first
+        pieces = [("login", logins), ("chat", chats), ("conversation", conversations)]
+        while pieces:
+            kind, rows = pieces.pop()
+            if not rows:
+                continue
+            try:
+                self._write(**{f"{kind}s": rows})
+            except Exception as e:
+                if not _row_error(e):
+                    # Not the rows' fault: put back everything not written yet
+                    pieces.append((kind, rows))
+                    self._requeue(*_by_kind(pieces), e)
+                    return written
+                if len(rows) == 1:
+                    self._drop(kind, rows, e)
+                else:
+                    middle = len(rows) // 2
+                    pieces += [(kind, rows[middle:]), (kind, rows[:middle])]
+                continue
+            written += len(rows)
+            WRITE_BEHIND_ROWS.labels(kind=kind).inc(len(rows))
+        self._attempts = 0
+        return written
+
+    @staticmethod
+    def _drop(kind: str, rows: List[Dict], error: Exception):
+        print(f"⚠️ Write-behind dropping {len(rows)} {kind} rows: {error}")
+        WRITE_BEHIND_DROPPED.labels(kind=kind).inc(len(rows))
+
+    def _requeue(self, conversations, chats, logins, error: Exception):
+        self._attempts += 1
+        if self._attempts >= WRITE_BEHIND_MAX_ATTEMPTS:
+            print(f"⚠️ Write-behind flush failed {self._attempts} times")
+            for kind, rows in (("conversation", conversations), ("chat", chats), ("login", logins)):
+                if rows:
+                    self._drop(kind, rows, error)
+            self._attempts = 0
+            return
+
+        print(f"⚠️ Write-behind flush failed (attempt {self._attempts}): {error}")
+        with self._lock:
+            # Put the failed batch back in front of anything queued meanwhile
+            for conversation in conversations:
+                self._conversations.setdefault(conversation["id"], conversation)
+                self._users.add(conversation["user_id"])
+            self._chats[:0] = chats
+            self._users.update(chat["user_id"] for chat in chats)
+            for login in logins:
+                entry = self._logins.get(login["b_user_id"])
+                if entry is None:
+                    self._logins[login["b_user_id"]] = login
+                else:
+                    entry["b_logins"] += login["b_logins"]
+                    entry["b_last_login"] = max(entry["b_last_login"], login["b_last_login"])
+
+    def start(self):
+        """Start the flusher thread (no-op if disabled or already running)"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flusher and write whatever is still queued"""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join(timeout=30)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Write-behind flusher error: {e}")
+
+
+def _row_error(error: Exception) -> bool:
+    """Errors caused by the rows themselves, which a retry of the same rows won't fix"""
+    if isinstance(error, (IntegrityError, DataError)):
+        return True
+    # Raised while binding parameters, before anything reached the database
+    return isinstance(error, StatementError) and not isinstance(error, DBAPIError)
+
+
+def _by_kind(pieces):
+    """(conversations, chats, logins) lists from a stack of (kind, rows) pieces"""
+    rows = {"conversation": [], "chat": [], "login": []}
+    for kind, piece in reversed(pieces):
+        rows[kind].extend(piece)
+    return rows["conversation"], rows["chat"], rows["login"]
+
+
+def _latest_activity(chats: List[Dict]) -> List[Dict]:
+    """updated_at parameters: the newest chat timestamp of each conversation"""
+    latest: Dict[str, datetime] = {}
+    for chat in chats:
+        conversation_id = chat["conversation_id"]
+        if conversation_id not in latest or chat["timestamp"] > latest[conversation_id]:
+            latest[conversation_id] = chat["timestamp"]
+    return [{"b_id": conversation_id, "b_updated_at": when} for conversation_id, when in latest.items()]
+
+
+def record_login(db, user: User):
+    """Update last_login/login_count now, or queue it when write-behind is on"""
+    now = datetime.utcnow()
+    if write_behind.enabled:
+        write_behind.add_login(user.id, now)
+        return
+    user.last_login = now
+    user.login_count = (user.login_count or 0) + 1
+    db.commit()
+
+
+# Global instance
+write_behind = WriteBehind()
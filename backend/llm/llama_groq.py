@@ -1,6 +1,10 @@
 # backend/llm/llama_groq.py
 from groq import Groq
+from backend.utils.metrics import (
+    LLM_GENERATION_SECONDS, LLM_STREAMS_IN_FLIGHT, LLM_TOKENS, LLM_TTFT_SECONDS
+)
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -47,18 +51,28 @@ Your Response:"""
 """
     
     # Stream the completion
-    stream = client.chat.completions.create(
-        model="llama-3.3-70b-versatile",  # Updated to current supported model
-        messages=[
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.7,
-        max_tokens=1024,
-        stream=True
-    )
-    
-    for chunk in stream:
-        if chunk.choices[0].delta.content:
-            yield chunk.choices[0].delta.content
+    started = time.perf_counter()
+    first_token = True
+    LLM_STREAMS_IN_FLIGHT.inc()
+    try:
+        stream = client.chat.completions.create(
+            model="llama-3.3-70b-versatile",  # Updated to current supported model
+            messages=[
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=1024,
+            stream=True
+        )
 
+        for chunk in stream:
+            if chunk.choices[0].delta.content:
+                if first_token:
+                    LLM_TTFT_SECONDS.observe(time.perf_counter() - started)
+                    first_token = False
+                LLM_TOKENS.inc()
+                yield chunk.choices[0].delta.content
+    finally:
+        LLM_STREAMS_IN_FLIGHT.dec()
+        LLM_GENERATION_SECONDS.observe(time.perf_counter() - started)
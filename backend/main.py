@@ -1,13 +1,26 @@
-from fastapi import FastAPI, WebSocket, Depends
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, Query
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
-from sqlalchemy.orm import Session
-from backend.vectorstore.pinecone_utils import get_relevant_context
+from sqlalchemy import text, select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from backend.llm.llama_groq import ask_llama_with_context
 from backend.auth.router import router as auth_router
 from backend.auth.dependencies import get_current_user
 from backend.database.models import User, ChatHistory
-from backend.database.connection import get_db
+from backend.database.connection import get_async_db, SessionLocal
+from backend.database.write_behind import write_behind
+from backend.utils.warmup import warmup
+from backend.utils.rollups import analytics_rollup, ANALYTICS_ROLLUP_ON_STARTUP
+from backend.database.archive import chat_archiver, ARCHIVE_ENABLED
+from backend.utils.profiling import ProfilingMiddleware
+from backend.utils.pagination import decode_cursor, next_cursor
+from backend.utils.metrics import (
+    registry, CONTENT_TYPE, CHAT_REQUEST_SECONDS, DB_COMMIT_SECONDS, WEBSOCKET_CONNECTIONS
+)
+from typing import Optional
+from datetime import datetime
 import os
 
 # Fix tokenizers parallelism warning
@@ -42,6 +55,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# On-demand profiling (a single flag check per request unless a session is active)
+app.add_middleware(ProfilingMiddleware)
+
 # ============= INCLUDE ROUTERS =============
 # Include authentication router
 app.include_router(auth_router)
@@ -85,6 +101,14 @@ try:
 except ImportError as e:
     print(f"⚠️ Admin router not found: {e}")
 
+# Include admin profiling router
+try:
+    from backend.api.profiling import router as profiling_router
+    app.include_router(profiling_router)
+    print("✅ Profiling router loaded successfully")
+except ImportError as e:
+    print(f"⚠️ Profiling router not found: {e}")
+
 
 @app.get("/")
 def root():
@@ -96,27 +120,105 @@ def root():
     }
 
 
+# ============= STARTUP =============
+@app.on_event("startup")
+def start_warmup():
+    """Load the embedding model and vector index in the background"""
+    if warmup.enabled:
+        warmup.start()
+
+
+@app.on_event("startup")
+def start_analytics_rollup():
+    """Keep the admin dashboard rollups up to date in the background"""
+    if ANALYTICS_ROLLUP_ON_STARTUP:
+        analytics_rollup.start()
+
+
+@app.on_event("startup")
+def start_chat_archiver():
+    """Move old chat history to compressed archive segments (if enabled)"""
+    if ARCHIVE_ENABLED:
+        chat_archiver.start()
+
+
+@app.on_event("startup")
+def start_write_behind():
+    """Flush queued chat/login writes in the background (if enabled)"""
+    write_behind.start()
+
+
+@app.on_event("shutdown")
+def flush_write_behind():
+    """Write everything still queued before the process exits"""
+    write_behind.stop()
+
+
 @app.get("/health")
+@app.get("/health/live")
 def health_check():
-    """Health check endpoint"""
+    """Liveness: the process is up and serving requests"""
     return {"status": "healthy"}
 
 
+@app.get("/health/ready")
+def readiness_check():
+    """Readiness: the database answers and the RAG components are loaded"""
+    checks = {"components": warmup.status()}
+
+    try:
+        db = SessionLocal()
+        try:
+            db.execute(text("SELECT 1"))
+        finally:
+            db.close()
+        checks["database"] = "ok"
+    except Exception as e:
+        checks["database"] = f"error: {e}"
+
+    ready = checks["database"] == "ok" and warmup.ready
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", **checks}
+    )
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics"""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+
 # ============= CHAT HISTORY ENDPOINT =============
 @app.get("/api/chat/history")
 async def get_chat_history(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    limit: int = 50
+    db: AsyncSession = Depends(get_async_db),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None
 ):
-    """Get chat history for the current user"""
-    history = db.query(ChatHistory).filter(
-        ChatHistory.user_id == current_user.id
-    ).order_by(ChatHistory.timestamp.desc()).limit(limit).all()
-    
+    """
+    Get chat history for the current user, newest page first.
+    Pass next_cursor back as `cursor` to load older messages.
+    """
+    await write_behind.ensure_flushed(current_user.id)
+
+    query = select(ChatHistory).where(ChatHistory.user_id == current_user.id)
+    if cursor:
+        timestamp, chat_id = decode_cursor(cursor, 2)
+        query = query.where(or_(
+            ChatHistory.timestamp < timestamp,
+            and_(ChatHistory.timestamp == timestamp, ChatHistory.id < chat_id)
+        ))
+
+    history = (await db.scalars(
+        query.order_by(ChatHistory.timestamp.desc(), ChatHistory.id.desc()).limit(limit + 1)
+    )).all()
+    history, next_page = next_cursor(history, limit, lambda chat: (chat.timestamp, chat.id))
+
     # Reverse to show oldest first
-    history.reverse()
-    
+    history = list(reversed(history))
+
     return {
         "history": [
             {
@@ -127,7 +229,8 @@ async def get_chat_history(
             }
             for chat in history
         ],
-        "count": len(history)
+        "count": len(history),
+        "next_cursor": next_page
     }
 
 
@@ -137,24 +240,30 @@ async def chat(websocket: WebSocket):
     """WebSocket endpoint for real-time chat (no auth for now)"""
     await websocket.accept()
 
-    while True:
-        try:
-            # Receive user query
-            user_query = await websocket.receive_text()
+    from backend.vectorstore.pinecone_utils import get_relevant_context
+
+    with WEBSOCKET_CONNECTIONS.track_in_progress():
+        while True:
+            try:
+                # Receive user query
+                user_query = await websocket.receive_text()
 
-            # Get relevant context from Pinecone
-            context = get_relevant_context(user_query)
+                with CHAT_REQUEST_SECONDS.labels(endpoint="websocket").time():
+                    # Get relevant context from Pinecone
+                    context = get_relevant_context(user_query)
 
-            # Stream response from Llama 3
-            for chunk in ask_llama_with_context(user_query, context):
-                await websocket.send_text(chunk)
+                    # Stream response from Llama 3
+                    for chunk in ask_llama_with_context(user_query, context):
+                        await websocket.send_text(chunk)
 
-            # Send end signal
-            await websocket.send_text("[DONE]")
+                # Send end signal
+                await websocket.send_text("[DONE]")
 
-        except Exception as e:
-            await websocket.send_text(f"Error: {str(e)}")
-            break
+            except WebSocketDisconnect:
+                break
+            except Exception as e:
+                await websocket.send_text(f"Error: {str(e)}")
+                break
 
 
 # ============= AUTHENTICATED CHAT WITH HISTORY SAVING =============
@@ -162,7 +271,7 @@ async def chat(websocket: WebSocket):
 async def chat_with_auth(
     query: dict,  # {question: str, conversation_id?: str}
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Authenticated chat endpoint with history saving
@@ -172,10 +281,15 @@ async def chat_with_auth(
     Request body:
     - question (required): The user's question
     - conversation_id (optional): ID of conversation to add to, creates new if not provided
+
+    The response "id" is null when WRITE_BEHIND_ENABLED is set: the chat row
+    is only inserted by the next write-behind flush.
     """
     from backend.database.models import Conversation
+    import time
     import uuid
-    
+
+    started = time.perf_counter()
     user_query = query.get("question", "")
     conversation_id = query.get("conversation_id")
 
@@ -184,11 +298,13 @@ async def chat_with_auth(
 
     # Get or create conversation
     if conversation_id:
-        # Use existing conversation
-        conversation = db.query(Conversation).filter(
-            Conversation.id == conversation_id,
-            Conversation.user_id == current_user.id
-        ).first()
+        # Use existing conversation (possibly still queued for write-behind)
+        conversation = write_behind.pending_conversation(conversation_id, current_user.id) or (await db.scalars(
+            select(Conversation).where(
+                Conversation.id == conversation_id,
+                Conversation.user_id == current_user.id
+            )
+        )).first()
         
         if not conversation:
             return {"error": "Conversation not found"}
@@ -200,20 +316,24 @@ async def chat_with_auth(
             user_id=current_user.id,
             title=title
         )
-        db.add(conversation)
-        db.flush()  # Get the ID without committing
+
+    # End the read transaction so no pooled connection is held while the
+    # retrieval and LLM calls run; the new rows are written afterwards
+    await db.commit()
 
     # Get context from Pinecone - FILTERED BY USER ID
     try:
-        from backend.vectorstore.pinecone_utils import vectorstore
+        from backend.vectorstore.pinecone_utils import search_chunks
         
-        # Search with user_id filter (each user only sees their documents)
-        results = vectorstore.similarity_search(
+        # Search with user_id filter (each user only sees their documents);
+        # embedding and the index query block, so keep them off the event loop
+        results = await run_in_threadpool(
+            search_chunks,
             user_query,
             k=3,
             filter={"user_id": {"$eq": str(current_user.id)}}
         )
-        context = "\n\n".join([doc.page_content for doc in results])
+        context = "\n\n".join([chunk["text"] for chunk in results])
         
         if not context:
             context = f"No documents found for user {current_user.username}. Please upload documents first."
@@ -221,31 +341,46 @@ async def chat_with_auth(
         print(f"Error retrieving context: {e}")
         context = "No relevant context available."
 
-    # Get response from Llama
-    response_chunks = []
-    for chunk in ask_llama_with_context(user_query, context):
-        response_chunks.append(chunk)
+    # Get response from Llama (blocking stream, collected in a worker thread)
+    full_response = await run_in_threadpool(
+        lambda: "".join(ask_llama_with_context(user_query, context))
+    )
 
-    full_response = "".join(response_chunks)
+    if write_behind.enabled:
+        # Queued for the next bulk flush; the row id isn't known yet
+        timestamp = datetime.utcnow()
+        if not conversation_id:
+            write_behind.add_conversation(conversation.id, current_user.id, conversation.title, timestamp)
+        write_behind.add_chat(current_user.id, conversation_id or conversation.id, user_query, full_response, timestamp)
+        chat_id = None
+    else:
+        # Save to chat history with conversation link; bumping updated_at in
+        # the same transaction keeps the conversation list ordered by activity
+        timestamp = datetime.utcnow()
+        conversation.updated_at = timestamp
+        db.add(conversation)
+        chat_history = ChatHistory(
+            user_id=current_user.id,
+            conversation_id=conversation.id,
+            question=user_query,
+            answer=full_response,
+            timestamp=timestamp
+        )
+        db.add(chat_history)
+        with DB_COMMIT_SECONDS.labels(handler="chat").time():
+            await db.commit()
+        await db.refresh(chat_history)
+        chat_id, timestamp = chat_history.id, chat_history.timestamp
 
-    # Save to chat history with conversation link
-    chat_history = ChatHistory(
-        user_id=current_user.id,
-        conversation_id=conversation.id,
-        question=user_query,
-        answer=full_response
-    )
-    db.add(chat_history)
-    db.commit()
-    db.refresh(chat_history)
+    CHAT_REQUEST_SECONDS.labels(endpoint="http").observe(time.perf_counter() - started)
 
     return {
-        "id": chat_history.id,
-        "conversation_id": conversation.id,
+        "id": chat_id,
+        "conversation_id": conversation_id or conversation.id,
         "question": user_query,
         "answer": full_response,
         "user": current_user.username,
-        "timestamp": chat_history.timestamp.isoformat()
+        "timestamp": timestamp.isoformat()
     }
 
 
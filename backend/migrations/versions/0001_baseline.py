@@ -0,0 +1,97 @@
+"""Baseline: schema as previously created by Base.metadata.create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Existing databases created by the old init_db are stamped at this revision
+instead of running it (see backend.database.connection.init_db).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=True),
+        sa.Column("full_name", sa.String(), nullable=True),
+        sa.Column("avatar_url", sa.String(), nullable=True),
+        sa.Column("bio", sa.Text(), nullable=True),
+        sa.Column("google_id", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("is_verified", sa.Boolean(), nullable=True),
+        sa.Column("is_admin", sa.Boolean(), nullable=True),
+        sa.Column("is_blocked", sa.Boolean(), nullable=True),
+        sa.Column("blocked_at", sa.DateTime(), nullable=True),
+        sa.Column("blocked_by", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("block_reason", sa.Text(), nullable=True),
+        sa.Column("login_count", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("last_login", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("google_id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    op.create_table(
+        "conversations",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+    op.create_table(
+        "chat_history",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("conversation_id", sa.String(), sa.ForeignKey("conversations.id"), nullable=True),
+        sa.Column("question", sa.Text(), nullable=False),
+        sa.Column("answer", sa.Text(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_chat_history_id", "chat_history", ["id"])
+
+    op.create_table(
+        "admin_actions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("admin_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("action_type", sa.String(50), nullable=False),
+        sa.Column("target_user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("details", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_admin_actions_id", "admin_actions", ["id"])
+
+    op.create_table(
+        "user_analytics",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("date", sa.DateTime(), nullable=False),
+        sa.Column("total_users", sa.Integer(), nullable=True),
+        sa.Column("active_users", sa.Integer(), nullable=True),
+        sa.Column("new_users", sa.Integer(), nullable=True),
+        sa.Column("total_chats", sa.Integer(), nullable=True),
+        sa.Column("files_uploaded", sa.Integer(), nullable=True),
+    )
+    op.create_index("ix_user_analytics_id", "user_analytics", ["id"])
+    op.create_index("ix_user_analytics_date", "user_analytics", ["date"], unique=True)
+
+
+def downgrade():
+    op.drop_table("user_analytics")
+    op.drop_table("admin_actions")
+    op.drop_table("chat_history")
+    op.drop_table("conversations")
+    op.drop_table("users")
@@ -0,0 +1,30 @@
+"""Composite indexes for keyset-paginated history and conversation lists
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_chat_history_user_timestamp", "chat_history", ["user_id", "timestamp", "id"]
+    )
+    op.create_index(
+        "ix_chat_history_conversation_timestamp", "chat_history", ["conversation_id", "timestamp", "id"]
+    )
+    op.create_index(
+        "ix_conversations_user_updated", "conversations", ["user_id", "updated_at", "id"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_conversations_user_updated", table_name="conversations")
+    op.drop_index("ix_chat_history_conversation_timestamp", table_name="chat_history")
+    op.drop_index("ix_chat_history_user_timestamp", table_name="chat_history")
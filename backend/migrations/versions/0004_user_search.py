@@ -0,0 +1,69 @@
+"""Trigram search indexes for the admin user list
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+PostgreSQL gets pg_trgm GIN indexes; SQLite gets an FTS5 trigram table kept
+in sync by triggers (see backend.database.search). Other databases, and
+SQLite builds older than 3.34, keep the LIKE scan.
+"""
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def _sqlite_has_trigram():
+    version = op.get_bind().exec_driver_sql("SELECT sqlite_version()").scalar()
+    return tuple(int(part) for part in version.split(".")[:2]) >= (3, 34)
+
+
+def upgrade():
+    # Keyset order of the admin user list
+    op.create_index("ix_users_created_at_id", "users", ["created_at", "id"])
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX ix_users_email_trgm ON users USING gin (email gin_trgm_ops)")
+        op.execute("CREATE INDEX ix_users_username_trgm ON users USING gin (username gin_trgm_ops)")
+
+    elif dialect == "sqlite" and _sqlite_has_trigram():
+        op.execute(
+            "CREATE VIRTUAL TABLE users_fts USING fts5("
+            "email, username, content='users', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER users_fts_insert AFTER INSERT ON users BEGIN "
+            "INSERT INTO users_fts(rowid, email, username) "
+            "VALUES (new.id, new.email, new.username); END"
+        )
+        op.execute(
+            "CREATE TRIGGER users_fts_delete AFTER DELETE ON users BEGIN "
+            "INSERT INTO users_fts(users_fts, rowid, email, username) "
+            "VALUES ('delete', old.id, old.email, old.username); END"
+        )
+        op.execute(
+            "CREATE TRIGGER users_fts_update AFTER UPDATE OF email, username ON users BEGIN "
+            "INSERT INTO users_fts(users_fts, rowid, email, username) "
+            "VALUES ('delete', old.id, old.email, old.username); "
+            "INSERT INTO users_fts(rowid, email, username) "
+            "VALUES (new.id, new.email, new.username); END"
+        )
+        op.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_users_username_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_users_email_trgm")
+    elif dialect == "sqlite":
+        for trigger in ("users_fts_update", "users_fts_delete", "users_fts_insert"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS users_fts")
+
+    op.drop_index("ix_users_created_at_id", table_name="users")
@@ -0,0 +1,67 @@
+"""Full-text search over chat history questions and answers
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+PostgreSQL gets a generated, weighted tsvector column with a GIN index on
+(user_id, search_vector); SQLite gets an FTS5 table kept in sync by triggers
+(see backend.database.search). Other databases fall back to LIKE.
+"""
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+FTS_COLUMNS = "user_id, question, answer"
+NEW_ROW = "new.id, new.user_id, new.question, new.answer"
+OLD_ROW = "old.id, old.user_id, old.question, old.answer"
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute(
+            "ALTER TABLE chat_history ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', coalesce(question, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(answer, '')), 'B')) STORED"
+        )
+        # btree_gin lets the per-user filter live in the same GIN index
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+        op.execute("CREATE INDEX ix_chat_history_search ON chat_history USING gin (user_id, search_vector)")
+
+    elif dialect == "sqlite":
+        op.execute(
+            f"CREATE VIRTUAL TABLE chat_history_fts USING fts5({FTS_COLUMNS}, "
+            "content='chat_history', content_rowid='id', tokenize='porter unicode61')"
+        )
+        op.execute(
+            "CREATE TRIGGER chat_history_fts_insert AFTER INSERT ON chat_history BEGIN "
+            f"INSERT INTO chat_history_fts(rowid, {FTS_COLUMNS}) VALUES ({NEW_ROW}); END"
+        )
+        op.execute(
+            "CREATE TRIGGER chat_history_fts_delete AFTER DELETE ON chat_history BEGIN "
+            f"INSERT INTO chat_history_fts(chat_history_fts, rowid, {FTS_COLUMNS}) "
+            f"VALUES ('delete', {OLD_ROW}); END"
+        )
+        op.execute(
+            "CREATE TRIGGER chat_history_fts_update AFTER UPDATE OF user_id, question, answer "
+            "ON chat_history BEGIN "
+            f"INSERT INTO chat_history_fts(chat_history_fts, rowid, {FTS_COLUMNS}) "
+            f"VALUES ('delete', {OLD_ROW}); "
+            f"INSERT INTO chat_history_fts(rowid, {FTS_COLUMNS}) VALUES ({NEW_ROW}); END"
+        )
+        op.execute("INSERT INTO chat_history_fts(chat_history_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_chat_history_search")
+        op.execute("ALTER TABLE chat_history DROP COLUMN IF EXISTS search_vector")
+    elif dialect == "sqlite":
+        for trigger in ("chat_history_fts_update", "chat_history_fts_delete", "chat_history_fts_insert"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS chat_history_fts")
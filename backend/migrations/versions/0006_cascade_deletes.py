@@ -0,0 +1,47 @@
+"""ON DELETE CASCADE for conversation and chat history foreign keys
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+Deleting a user or conversation removes its rows in the database instead of
+the ORM loading and deleting them one by one. SQLite is left alone: it only
+enforces foreign keys with PRAGMA foreign_keys, which the app doesn't set,
+and rebuilding chat_history would drop the FTS triggers of migration 0005.
+There backend.database.bulk_delete removes the children explicitly.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table)
+CASCADE_KEYS = [
+    ("conversations", "user_id", "users"),
+    ("chat_history", "user_id", "users"),
+    ("chat_history", "conversation_id", "conversations"),
+]
+
+
+def _replace_foreign_keys(ondelete):
+    inspector = sa.inspect(op.get_bind())
+    for table, column, referred in CASCADE_KEYS:
+        for foreign_key in inspector.get_foreign_keys(table):
+            if foreign_key["constrained_columns"] != [column]:
+                continue
+            name = foreign_key["name"] or f"{table}_{column}_fkey"
+            op.drop_constraint(name, table, type_="foreignkey")
+            op.create_foreign_key(name, table, referred, [column], ["id"], ondelete=ondelete)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        _replace_foreign_keys("CASCADE")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        _replace_foreign_keys(None)
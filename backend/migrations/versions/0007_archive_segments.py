@@ -0,0 +1,38 @@
+"""Index of compressed chat history archive segments
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "archive_segments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("conversation_id", sa.String(), nullable=True),
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False),
+        sa.Column("min_timestamp", sa.DateTime(), nullable=False),
+        sa.Column("min_chat_id", sa.Integer(), nullable=False),
+        sa.Column("max_timestamp", sa.DateTime(), nullable=False),
+        sa.Column("max_chat_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        "ix_archive_segments_conversation", "archive_segments",
+        ["user_id", "conversation_id", "max_timestamp"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_archive_segments_conversation", table_name="archive_segments")
+    op.drop_table("archive_segments")
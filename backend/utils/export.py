@@ -0,0 +1,196 @@
+"""
+Streaming export of a user's conversations and chat history.
+
+Rows are read in chunks of EXPORT_CHUNK_ROWS and encoded as they arrive, so
+memory stays flat however long the history is:
+
+- PostgreSQL: one server-side cursor per query (AsyncSession.stream with
+  yield_per)
+- SQLite: a short keyset-paginated read per chunk, because the async engine
+  shares a single connection and a long-lived cursor would block every
+  other request for the duration of the export
+
+Archived messages (backend.database.archive) are exported first, one
+segment at a time (oldest segment first), then the hot rows in
+(timestamp, id) order.
+
+Formats:
+- ndjson: a {"type": "conversation", ...} line per conversation, then a
+  {"type": "message", ...} line per message
+- parquet: one row per message (with its conversation title), one row group
+  per chunk; requires pyarrow
+"""
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Sequence
+
+from decouple import config
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from starlette.concurrency import run_in_threadpool
+
+from backend.database import archive
+from backend.database.connection import AsyncSessionLocal, async_engine
+from backend.database.models import Conversation, ChatHistory, ArchiveSegment
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+EXPORT_CHUNK_ROWS = config("EXPORT_CHUNK_ROWS", default=1000, cast=int)
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+async def _partitions(query, order_columns: Sequence, chunk_rows: int = EXPORT_CHUNK_ROWS) -> AsyncIterator[List[Dict]]:
+    """Rows of query as lists of mappings, chunk_rows at a time, ordered by order_columns"""
+    if async_engine.dialect.name != "sqlite":
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(query.order_by(*order_columns).execution_options(yield_per=chunk_rows))
+            async for rows in result.mappings().partitions():
+                yield rows
+        return
+
+    last = None
+    while True:
+        chunk = query
+        if last is not None:
+            chunk = chunk.where(tuple_(*order_columns) > tuple_(*last))
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(chunk.order_by(*order_columns).limit(chunk_rows))).mappings().all()
+        if rows:
+            yield rows
+        if len(rows) < chunk_rows:
+            return
+        last = [rows[-1][column.key] for column in order_columns]
+
+
+async def iter_conversations(user_id: int) -> AsyncIterator[List[Dict]]:
+    query = select(
+        Conversation.id, Conversation.title, Conversation.created_at, Conversation.updated_at
+    ).where(Conversation.user_id == user_id)
+    async for rows in _partitions(query, [Conversation.id]):
+        yield rows
+
+
+async def iter_messages(user_id: int) -> AsyncIterator[List[Dict]]:
+    """Archived, then hot messages of a user, with their conversation titles"""
+    segments = select(
+        ArchiveSegment.id, ArchiveSegment.min_timestamp, ArchiveSegment.path, ArchiveSegment.conversation_id
+    ).where(ArchiveSegment.user_id == user_id)
+    async for batch in _partitions(segments, [ArchiveSegment.min_timestamp, ArchiveSegment.id]):
+        for segment in batch:
+            title = None
+            if segment["conversation_id"] is not None:
+                async with AsyncSessionLocal() as db:
+                    title = await db.scalar(
+                        select(Conversation.title).where(Conversation.id == segment["conversation_id"])
+                    )
+            messages = await run_in_threadpool(archive.read_segment, segment["path"], False)
+            for start in range(0, len(messages), EXPORT_CHUNK_ROWS):
+                yield [
+                    dict(message, conversation_title=title)
+                    for message in messages[start:start + EXPORT_CHUNK_ROWS]
+                ]
+
+    query = (
+        select(
+            ChatHistory.id,
+            ChatHistory.conversation_id,
+            Conversation.title.label("conversation_title"),
+            ChatHistory.question,
+            ChatHistory.answer,
+            ChatHistory.timestamp,
+        )
+        .outerjoin(Conversation, Conversation.id == ChatHistory.conversation_id)
+        .where(ChatHistory.user_id == user_id)
+    )
+    async for rows in _partitions(query, [ChatHistory.timestamp, ChatHistory.id]):
+        yield rows
+
+
+def _json_line(record: Dict) -> str:
+    return json.dumps(record, default=lambda value: value.isoformat(), ensure_ascii=False) + "\n"
+
+
+async def export_ndjson(user_id: int) -> AsyncIterator[bytes]:
+    async for rows in iter_conversations(user_id):
+        yield "".join(_json_line({"type": "conversation", **row}) for row in rows).encode("utf-8")
+    async for rows in iter_messages(user_id):
+        yield "".join(_json_line({"type": "message", **row}) for row in rows).encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file object that hands ParquetWriter's output back in pieces"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+if PYARROW_AVAILABLE:
+    MESSAGE_SCHEMA = pa.schema([
+        ("id", pa.int64()),
+        ("conversation_id", pa.string()),
+        ("conversation_title", pa.string()),
+        ("question", pa.string()),
+        ("answer", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+    ])
+
+
+async def export_parquet(user_id: int) -> AsyncIterator[bytes]:
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, MESSAGE_SCHEMA, compression="zstd")
+    async for rows in iter_messages(user_id):
+        writer.write_table(pa.Table.from_pylist([dict(row) for row in rows], schema=MESSAGE_SCHEMA))
+        data = sink.drain()
+        if data:
+            yield data
+    # Footer (schema and row group offsets)
+    writer.close()
+    yield sink.drain()
+
+
+def export_response(user_id: int, export_format: str) -> StreamingResponse:
+    """Streaming download of a user's export in the given format (see EXPORT_FORMATS)"""
+    if export_format == "parquet":
+        if not PYARROW_AVAILABLE:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+        stream = export_parquet(user_id)
+    else:
+        stream = export_ndjson(user_id)
+
+    filename = f"chat-export-{user_id}-{datetime.utcnow():%Y%m%d}.{export_format}"
+    return StreamingResponse(
+        stream,
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,296 @@
+"""
+Lightweight in-process metrics exposed in Prometheus text format.
+
+Counters, gauges and histograms are plain Python objects guarded by a lock;
+observing a value is a bisect plus a couple of additions, so they are cheap
+enough for the chat hot path. ``/metrics`` renders everything registered.
+
+    EMBED_SECONDS.labels(op="query").observe(0.012)
+    with VECTOR_QUERY_SECONDS.time():
+        ...
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+# Seconds; covers sub-millisecond vector lookups up to slow LLM generations
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Dict[str, str] = None) -> str:
+    pairs = list(zip(names, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+
+    def labels(self, **labels) -> "_Metric":
+        """Child metric for one combination of label values"""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _new_child(self) -> "_Metric":
+        return type(self)(self.name, self.documentation)
+
+    def _series(self) -> List[Tuple[Tuple[str, ...], "_Metric"]]:
+        if self.labelnames:
+            return sorted(self._children.items())
+        return [((), self)]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for values, metric in self._series():
+            lines.extend(metric._samples(self.labelnames, values))
+        return lines
+
+    def _samples(self, names, values) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def _samples(self, names, values):
+        return [f"{self.name}{_format_labels(names, values)} {_format_value(self._value)}"]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down (in-flight requests, open connections)"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float):
+        self._value = value
+
+    @contextmanager
+    def track_in_progress(self):
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def _samples(self, names, values):
+        return [f"{self.name}{_format_labels(names, values)} {_format_value(self._value)}"]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of observed values"""
+    type_name = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+
+    def _new_child(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def _samples(self, names, values):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(names, values, {"le": _format_value(bound)})
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(names, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Global registry
+registry = Registry()
+
+# ============= CHAT PIPELINE METRICS =============
+CHAT_REQUEST_SECONDS = registry.histogram(
+    "chat_request_seconds", "End-to-end chat request latency", ["endpoint"]
+)
+EMBED_SECONDS = registry.histogram(
+    "rag_embed_seconds", "Time spent embedding text", ["op"]
+)
+VECTOR_QUERY_SECONDS = registry.histogram(
+    "rag_vector_query_seconds", "Vector index query latency (both stages)"
+)
+CHUNKS_RETRIEVED = registry.counter(
+    "rag_chunks_retrieved_total", "Chunks returned as chat context"
+)
+CHUNKS_INDEXED = registry.counter(
+    "rag_chunks_indexed_total", "Chunks embedded and upserted"
+)
+LLM_TTFT_SECONDS = registry.histogram(
+    "llm_time_to_first_token_seconds", "Time from LLM request to first streamed token"
+)
+LLM_GENERATION_SECONDS = registry.histogram(
+    "llm_generation_seconds", "Total LLM streaming generation time"
+)
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total", "Streamed LLM output chunks (approximately tokens)"
+)
+LLM_STREAMS_IN_FLIGHT = registry.gauge(
+    "llm_streams_in_flight", "LLM responses currently streaming"
+)
+DB_COMMIT_SECONDS = registry.histogram(
+    "db_commit_seconds", "Database commit latency", ["handler"]
+)
+WEBSOCKET_CONNECTIONS = registry.gauge(
+    "websocket_connections", "Open chat WebSocket connections"
+)
+DB_POOL_CHECKED_OUT = registry.gauge(
+    "db_pool_checked_out", "Database connections currently checked out of the pool", ["engine"]
+)
+DB_POOL_OVERFLOW = registry.gauge(
+    "db_pool_overflow", "Connections open beyond the pool size", ["engine"]
+)
+DB_POOL_CONNECTIONS = registry.counter(
+    "db_pool_connections_total", "New database connections opened", ["engine"]
+)
+DB_POOL_WAIT_SECONDS = registry.histogram(
+    "db_pool_wait_seconds", "Time to acquire a pooled connection for a request", ["engine"]
+)
+PRINCIPAL_CACHE_LOOKUPS = registry.counter(
+    "principal_cache_lookups_total", "Authenticated-user cache lookups", ["result"]
+)
+WRITE_BEHIND_FLUSH_SECONDS = registry.histogram(
+    "write_behind_flush_seconds", "Duration of one write-behind bulk transaction"
+)
+WRITE_BEHIND_ROWS = registry.counter(
+    "write_behind_rows_total", "Rows written by the write-behind buffer", ["kind"]
+)
+WRITE_BEHIND_DROPPED = registry.counter(
+    "write_behind_dropped_rows_total", "Queued rows the write-behind buffer gave up on", ["kind"]
+)
+WRITE_BEHIND_PENDING = registry.gauge(
+    "write_behind_pending", "Writes queued in the write-behind buffer"
+)
@@ -0,0 +1,57 @@
+"""
+Opaque cursors for keyset pagination.
+
+A cursor encodes the sort key of the last row of a page, e.g.
+(updated_at, id); the next page asks for rows strictly after it. Unlike
+OFFSET, the database seeks straight to the position through the index, so
+deep pages cost the same as the first one.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Sequence, Tuple
+
+from fastapi import HTTPException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_value(value: Any):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(*values) -> str:
+    """Encode the sort key of the last row on a page"""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> Tuple:
+    """Decode a cursor into its sort-key values; 400 if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("wrong cursor size")
+        return tuple(_decode_value(v) for v in values)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def next_cursor(rows: Sequence, limit: int, key) -> Tuple[Sequence, Any]:
+    """
+    Given up to limit + 1 rows, return the page and the cursor for the next
+    one (None on the last page). `key` maps a row to its sort-key tuple.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(*key(page[-1]))
@@ -0,0 +1,306 @@
+"""
+On-demand sampling CPU profiler and tracemalloc snapshots for live requests.
+
+An admin starts a profiling session targeting a user, a route prefix, or
+both, for a time window. While a matching request is in flight, a sampler
+thread records the Python stacks of the worker threads every few ms;
+results are written in the collapsed-stack format that flamegraph.pl,
+speedscope and inferno read. Sessions with ``memory=True`` also diff
+tracemalloc snapshots taken at start and stop.
+
+The matching only decides *when* to sample; the samples themselves are
+process-wide. Every thread of the process is recorded (except the sampler
+and threads parked in select/poll/wait), and the event loop thread runs all
+concurrent requests, so stacks of non-matching requests and background jobs
+show up too. Each stack is rooted at its thread name, so a flame graph can
+be narrowed to one thread. Profile a quiet worker, or narrow the session
+with a user and route, for a view dominated by the matched requests.
+
+CPU frames are 'module:function' (no line numbers, so a function's samples
+aggregate into one frame); memory frames are 'module:lineno', which is how
+tracemalloc attributes allocations.
+
+With no active session the middleware does a single attribute check per
+request, and neither the sampler thread nor tracemalloc is running.
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from decouple import config
+
+PROFILING_DIR = config("PROFILING_DIR", default="profiles")
+PROFILING_MAX_DURATION = config("PROFILING_MAX_DURATION", default=600, cast=int)
+PROFILING_MAX_SESSIONS = config("PROFILING_MAX_SESSIONS", default=4, cast=int)
+PROFILING_TRACEMALLOC_FRAMES = config("PROFILING_TRACEMALLOC_FRAMES", default=25, cast=int)
+
+# Leaf functions of threads that are parked rather than doing work
+_IDLE_FUNCTIONS = {"select", "poll", "wait", "_wait_for_tstate_lock"}
+
+
+def _collapse(frame) -> List[str]:
+    """Stack from root to leaf as 'module:function' names"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        stack.append(f"{module}:{code.co_name}")
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class ProfileSession:
+    """One profiling request from an admin"""
+
+    def __init__(
+            self,
+            created_by: int,
+            user_email: Optional[str] = None,
+            user_id: Optional[int] = None,
+            route: Optional[str] = None,
+            duration_seconds: int = 60,
+            sample_interval_ms: float = 10.0,
+            memory: bool = False
+    ):
+        self.id = uuid.uuid4().hex[:12]
+        self.created_by = created_by
+        self.user_email = user_email
+        self.user_id = user_id
+        self.route = route
+        self.sample_interval = max(0.001, sample_interval_ms / 1000)
+        self.memory = memory
+        self.started_at = time.time()
+        self.expires_at = self.started_at + min(duration_seconds, PROFILING_MAX_DURATION)
+        self.stopped_at = None
+        self.state = "active"
+
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.requests_matched = 0
+        self.in_flight = 0
+        self.snapshot_start = None
+        self.files: Dict[str, str] = {}
+
+    def matches(self, path: str, email: Optional[str]) -> bool:
+        if self.route and not path.startswith(self.route):
+            return False
+        if self.user_email and email != self.user_email:
+            return False
+        return True
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "user_id": self.user_id,
+            "route": self.route,
+            "memory": self.memory,
+            "sample_interval_ms": round(self.sample_interval * 1000, 3),
+            "started_at": datetime.utcfromtimestamp(self.started_at).isoformat(),
+            "expires_at": datetime.utcfromtimestamp(self.expires_at).isoformat(),
+            "stopped_at": datetime.utcfromtimestamp(self.stopped_at).isoformat() if self.stopped_at else None,
+            "requests_matched": self.requests_matched,
+            "samples": self.sample_count,
+            "files": sorted(self.files),
+        }
+
+
+class Profiler:
+    """Owns the sessions, the sampler thread and tracemalloc"""
+
+    def __init__(self, directory: str = PROFILING_DIR):
+        self.directory = directory
+        self.sessions: Dict[str, ProfileSession] = {}
+        # Checked by the middleware on every request; only True while a session is live
+        self.active = False
+        self._lock = threading.Lock()
+        self._thread = None
+        self._owns_tracemalloc = False
+
+    # ----- session lifecycle -----
+
+    def start(self, session: ProfileSession) -> ProfileSession:
+        with self._lock:
+            live = [s for s in self.sessions.values() if s.state == "active"]
+            if len(live) >= PROFILING_MAX_SESSIONS:
+                raise ValueError(f"At most {PROFILING_MAX_SESSIONS} profiling sessions can run at once")
+
+            if session.memory:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(PROFILING_TRACEMALLOC_FRAMES)
+                    self._owns_tracemalloc = True
+                session.snapshot_start = tracemalloc.take_snapshot()
+
+            self.sessions[session.id] = session
+            self.active = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        print(f"🔍 Profiling session {session.id} started")
+        return session
+
+    def stop(self, session_id: str, state: str = "stopped") -> ProfileSession:
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                raise KeyError(session_id)
+            if session.state != "active":
+                return session
+            session.state = state
+            session.stopped_at = time.time()
+            self.active = any(s.state == "active" for s in self.sessions.values())
+            memory_still_needed = any(s.state == "active" and s.memory for s in self.sessions.values())
+
+        self._write_results(session)
+        if session.memory and not memory_still_needed and self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        print(f"✅ Profiling session {session.id} {state}: {session.sample_count} samples")
+        return session
+
+    def list(self) -> List[ProfileSession]:
+        return sorted(self.sessions.values(), key=lambda s: s.started_at, reverse=True)
+
+    def file_path(self, session_id: str, kind: str) -> Optional[str]:
+        session = self.sessions.get(session_id)
+        if session is None:
+            return None
+        return session.files.get(kind)
+
+    # ----- request tracking (called by the middleware) -----
+
+    def enter(self, path: str, email: Optional[str]) -> List[ProfileSession]:
+        matched = []
+        with self._lock:
+            for session in self.sessions.values():
+                if session.state == "active" and session.matches(path, email):
+                    session.in_flight += 1
+                    session.requests_matched += 1
+                    matched.append(session)
+        return matched
+
+    def exit(self, sessions: List[ProfileSession]):
+        with self._lock:
+            for session in sessions:
+                session.in_flight -= 1
+
+    # ----- sampling -----
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                live = [s for s in self.sessions.values() if s.state == "active"]
+                if not live:
+                    self._thread = None
+                    return
+
+            now = time.time()
+            for session in live:
+                if now >= session.expires_at:
+                    self.stop(session.id, state="expired")
+
+            sampling = [s for s in live if s.state == "active" and s.in_flight > 0]
+            if sampling:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                stacks = []
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    if frame.f_code.co_name in _IDLE_FUNCTIONS:
+                        continue
+                    stack = [names.get(ident, str(ident))] + _collapse(frame)
+                    stacks.append(";".join(stack))
+                with self._lock:
+                    for session in sampling:
+                        session.samples.update(stacks)
+                        session.sample_count += 1
+
+            time.sleep(min(s.sample_interval for s in live))
+
+    # ----- output -----
+
+    def _write_results(self, session: ProfileSession):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, session.id)
+
+        with self._lock:
+            samples = session.samples.most_common()
+
+        path = f"{base}.cpu.collapsed"
+        with open(path, "w") as f:
+            for stack, count in samples:
+                f.write(f"{stack} {count}\n")
+        session.files["cpu"] = path
+
+        if session.memory and session.snapshot_start is not None and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ])
+            diff = snapshot.compare_to(session.snapshot_start, "traceback")
+
+            path = f"{base}.memory.collapsed"
+            with open(path, "w") as f:
+                for stat in diff:
+                    if stat.size_diff <= 0:
+                        continue
+                    frames = [
+                        f"{os.path.splitext(os.path.basename(frame.filename))[0]}:{frame.lineno}"
+                        for frame in stat.traceback  # oldest frame first
+                    ]
+                    f.write(f"{';'.join(frames)} {stat.size_diff}\n")
+            session.files["memory"] = path
+
+            path = f"{base}.memory.txt"
+            with open(path, "w") as f:
+                f.write(f"Top allocations since session start ({session.id})\n")
+                for stat in snapshot.compare_to(session.snapshot_start, "lineno")[:50]:
+                    f.write(f"{stat}\n")
+            session.files["memory_top"] = path
+            session.snapshot_start = None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware routing requests to active profiling sessions"""
+
+    def __init__(self, app, instance: Profiler = None):
+        self.app = app
+        self.profiler = instance or profiler
+
+    async def __call__(self, scope, receive, send):
+        if not self.profiler.active or scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        sessions = self.profiler.enter(scope["path"], _request_email(scope))
+        if not sessions:
+            return await self.app(scope, receive, send)
+        try:
+            return await self.app(scope, receive, send)
+        finally:
+            self.profiler.exit(sessions)
+
+
+def _request_email(scope) -> Optional[str]:
+    """Subject of the bearer token, if any (only decoded while profiling)"""
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            from backend.auth.utils import decode_token
+            payload = decode_token(token)
+            return payload.get("sub") if payload else None
+    return None
+
+
+# Global instance
+profiler = Profiler()
@@ -0,0 +1,307 @@
+"""
+Incremental analytics rollups for the admin dashboard.
+
+A background thread periodically folds the chat_history and users rows added
+since the last run (tracked by an id watermark) into the per-day UserAnalytics
+rows and the AnalyticsCounter running totals. The dashboard then reads a few
+rows instead of counting the big tables on every load.
+
+Each run claims its id range by compare-and-swapping the watermark, so several
+workers can run the job without counting a row twice. Rows committed late with
+an id below the watermark are missed until the next rebuild().
+
+Chat totals cover hot and archived messages alike: archival moves rows that
+were already folded, and deletes take their already-folded rows back out
+(unfold_chats, unfold_archived) so the running totals match what rebuild()
+recounts.
+"""
+import threading
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Optional
+
+from decouple import config
+from sqlalchemy import select, update, insert, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.database.connection import SessionLocal
+from backend.database.models import User, ChatHistory, UserAnalytics, AnalyticsCounter, ArchiveSegment
+
+ANALYTICS_ROLLUP_ON_STARTUP = config("ANALYTICS_ROLLUP_ON_STARTUP", default=True, cast=bool)
+ANALYTICS_ROLLUP_INTERVAL = config("ANALYTICS_ROLLUP_INTERVAL", default=60.0, cast=float)
+
+# Counter names
+CHATS_WATERMARK = "chat_history_watermark"
+USERS_WATERMARK = "users_watermark"
+TOTAL_CHATS = "total_chats"
+TOTAL_USERS = "total_users"
+ACTIVE_USERS_7D = "active_users_7d"
+ACTIVE_USERS_30D = "active_users_30d"
+BLOCKED_USERS = "blocked_users"
+LAST_ROLLUP = "last_rollup"
+
+COUNTERS = [
+    CHATS_WATERMARK, USERS_WATERMARK, TOTAL_CHATS, TOTAL_USERS,
+    ACTIVE_USERS_7D, ACTIVE_USERS_30D, BLOCKED_USERS, LAST_ROLLUP,
+]
+
+
+def day_start(value) -> Optional[datetime]:
+    """Midnight of a date/datetime/'YYYY-MM-DD' (func.date returns a string on SQLite)"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        value = value.date()
+    return datetime(value.year, value.month, value.day)
+
+
+def read_counters(db: Session) -> Dict[str, int]:
+    """All counters as {name: value}"""
+    return dict(db.execute(select(AnalyticsCounter.name, AnalyticsCounter.value)).all())
+
+
+def _ensure_counters(db: Session):
+    existing = set(db.scalars(select(AnalyticsCounter.name)).all())
+    for name in COUNTERS:
+        if name in existing:
+            continue
+        try:
+            with db.begin_nested():
+                db.execute(insert(AnalyticsCounter).values(name=name, value=0))
+        except IntegrityError:
+            pass  # Another worker created it
+
+
+def _set_counter(db: Session, name: str, value: int):
+    db.execute(
+        update(AnalyticsCounter)
+        .where(AnalyticsCounter.name == name)
+        .values(value=value, updated_at=datetime.utcnow())
+    )
+
+
+def _add_counter(db: Session, name: str, delta: int):
+    db.execute(
+        update(AnalyticsCounter)
+        .where(AnalyticsCounter.name == name)
+        .values(value=AnalyticsCounter.value + delta, updated_at=datetime.utcnow())
+    )
+
+
+def _claim(db: Session, name: str, old: int, new: int) -> bool:
+    """Move a watermark from old to new; False if another worker moved it first"""
+    result = db.execute(
+        update(AnalyticsCounter)
+        .where(AnalyticsCounter.name == name, AnalyticsCounter.value == old)
+        .values(value=new, updated_at=datetime.utcnow())
+    )
+    return result.rowcount == 1
+
+
+def _update_day(db: Session, day: datetime, increment: bool, **values):
+    """Add to (or set) columns of the UserAnalytics row for a day, creating it if needed"""
+    if increment:
+        assignments = {name: getattr(UserAnalytics, name) + delta for name, delta in values.items()}
+    else:
+        assignments = values
+    statement = update(UserAnalytics).where(UserAnalytics.date == day).values(**assignments)
+
+    if db.execute(statement).rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(UserAnalytics).values(date=day, **values))
+    except IntegrityError:
+        # Created concurrently; apply to the existing row
+        db.execute(statement)
+
+
+def record_file_upload(db: Session):
+    """Atomically count one uploaded file for today"""
+    _update_day(db, day_start(datetime.utcnow()), increment=True, files_uploaded=1)
+    db.commit()
+
+
+def _subtract_days(db: Session, rows):
+    """Take (day, count) rows back out of the per-day totals and TOTAL_CHATS"""
+    removed = 0
+    for value, count in rows:
+        count = int(count or 0)
+        removed += count
+        if value is not None and count:
+            db.execute(
+                update(UserAnalytics)
+                .where(UserAnalytics.date == day_start(value))
+                .values(total_chats=UserAnalytics.total_chats - count)
+            )
+    if removed:
+        _add_counter(db, TOTAL_CHATS, -removed)
+
+
+def unfold_chats(db: Session, ids: List[int]):
+    """
+    Before deleting the chat_history rows with these ids, subtract the ones
+    already folded (at or below the watermark). Runs in the caller's
+    transaction; the caller commits together with the delete.
+    """
+    watermark = db.scalar(select(AnalyticsCounter.value).where(AnalyticsCounter.name == CHATS_WATERMARK)) or 0
+    if not ids or not watermark:
+        return
+    day = func.date(ChatHistory.timestamp)
+    _subtract_days(db, db.execute(
+        select(day, func.count(ChatHistory.id))
+        .where(ChatHistory.id.in_(ids), ChatHistory.id <= watermark)
+        .group_by(day)
+    ).all())
+
+
+def unfold_archived(db: Session, *criteria):
+    """Before deleting the matching archive segments, subtract their messages (each segment holds a single day)"""
+    day = func.date(ArchiveSegment.min_timestamp)
+    _subtract_days(db, db.execute(
+        select(day, func.sum(ArchiveSegment.row_count)).where(*criteria).group_by(day)
+    ).all())
+
+
+def _fold_archived(db: Session):
+    """Add every archived message to the per-day totals and TOTAL_CHATS"""
+    day = func.date(ArchiveSegment.min_timestamp)
+    rows = db.execute(select(day, func.sum(ArchiveSegment.row_count)).group_by(day)).all()
+    archived = 0
+    for value, count in rows:
+        count = int(count or 0)
+        archived += count
+        if value is not None and count:
+            _update_day(db, day_start(value), increment=True, total_chats=count)
+    _add_counter(db, TOTAL_CHATS, archived)
+
+
+def _fold_new_rows(db: Session, counters: Dict[str, int], watermark: str, model, timestamp_column, day_column: str) -> int:
+    """Add rows past the watermark to the per-day column; returns the number folded, -1 on conflict"""
+    old = counters[watermark]
+    max_id = db.scalar(select(func.max(model.id))) or 0
+    if max_id <= old:
+        return 0
+    if not _claim(db, watermark, old, max_id):
+        return -1
+
+    day = func.date(timestamp_column)
+    rows = db.execute(
+        select(day, func.count(model.id))
+        .where(model.id > old, model.id <= max_id)
+        .group_by(day)
+    ).all()
+
+    folded = 0
+    for value, count in rows:
+        folded += count
+        if value is not None:
+            _update_day(db, day_start(value), increment=True, **{day_column: count})
+    return folded
+
+
+def refresh(db: Session = None) -> bool:
+    """Run one rollup pass; False if another worker was mid-pass"""
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        _ensure_counters(db)
+        db.commit()
+        counters = read_counters(db)
+
+        new_chats = _fold_new_rows(db, counters, CHATS_WATERMARK, ChatHistory, ChatHistory.timestamp, "total_chats")
+        if new_chats < 0:
+            db.rollback()
+            return False
+        _add_counter(db, TOTAL_CHATS, new_chats)
+
+        if _fold_new_rows(db, counters, USERS_WATERMARK, User, User.created_at, "new_users") < 0:
+            db.rollback()
+            return False
+
+        # User gauges change in place (logins, blocks), so they are recounted;
+        # the users table is small next to chat_history
+        now = datetime.utcnow()
+        today = day_start(now)
+        total_users, active_7d, active_30d, active_today, blocked = db.execute(
+            select(
+                func.count(User.id),
+                func.count(User.id).filter(User.last_login >= now - timedelta(days=7)),
+                func.count(User.id).filter(User.last_login >= now - timedelta(days=30)),
+                func.count(User.id).filter(User.last_login >= today),
+                func.count(User.id).filter(User.is_blocked == True),
+            )
+        ).one()
+
+        _set_counter(db, TOTAL_USERS, total_users)
+        _set_counter(db, ACTIVE_USERS_7D, active_7d)
+        _set_counter(db, ACTIVE_USERS_30D, active_30d)
+        _set_counter(db, BLOCKED_USERS, blocked)
+        _set_counter(db, LAST_ROLLUP, int(now.timestamp()))
+        _update_day(db, today, increment=False, total_users=total_users, active_users=active_today)
+
+        db.commit()
+        return True
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if own_session:
+            db.close()
+
+
+def rebuild(db: Session = None):
+    """
+    Recount everything from scratch (files_uploaded is kept; it isn't derivable).
+    Archived messages are counted from the segment index, hot ones by refresh().
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        _ensure_counters(db)
+        for name in (CHATS_WATERMARK, USERS_WATERMARK, TOTAL_CHATS):
+            _set_counter(db, name, 0)
+        db.execute(update(UserAnalytics).values(total_chats=0, new_users=0))
+        _fold_archived(db)
+        db.commit()
+        refresh(db)
+    finally:
+        if own_session:
+            db.close()
+
+
+class AnalyticsRollup:
+    """Runs refresh() every ANALYTICS_ROLLUP_INTERVAL seconds in a daemon thread"""
+
+    def __init__(self, interval: float = ANALYTICS_ROLLUP_INTERVAL):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the rollup loop (no-op if already running)"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="analytics-rollup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                refresh()
+            except Exception as e:
+                print(f"⚠️ Analytics rollup failed: {e}")
+            self._stop.wait(self.interval)
+
+
+# Global instance
+analytics_rollup = AnalyticsRollup()
@@ -0,0 +1,142 @@
+"""
+Background warm-up of the heavy RAG dependencies.
+
+The app starts serving immediately; the embedding model and vector index are
+loaded in a daemon thread (retrying with backoff, e.g. while the network is
+still coming up). /health/ready reports 503 until every component is loaded.
+
+A component counts as loaded once the shared instance in
+backend.vectorstore.backends exists, whoever created it, so a lazy load by a
+request makes the app ready too. A component that used up its attempts is
+retried on the next readiness check. With WARMUP_ON_STARTUP=False nothing is
+preloaded: components report "lazy" and don't hold readiness back.
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from decouple import config
+
+WARMUP_ON_STARTUP = config("WARMUP_ON_STARTUP", default=True, cast=bool)
+WARMUP_MAX_ATTEMPTS = config("WARMUP_MAX_ATTEMPTS", default=10, cast=int)
+WARMUP_BACKOFF_BASE = config("WARMUP_BACKOFF_BASE", default=1.0, cast=float)
+WARMUP_BACKOFF_MAX = config("WARMUP_BACKOFF_MAX", default=60.0, cast=float)
+
+
+def _load_embeddings():
+    from backend.vectorstore.pinecone_utils import get_embeddings
+    # Run one query so the model weights and tokenizer are actually in memory
+    get_embeddings().embed_query("warm up")
+
+
+def _load_index():
+    from backend.vectorstore.pinecone_utils import get_index
+    get_index()
+
+
+def _embeddings_loaded() -> bool:
+    from backend.vectorstore.backends import embeddings_loaded
+    return embeddings_loaded()
+
+
+def _index_loaded() -> bool:
+    from backend.vectorstore.backends import index_loaded
+    return index_loaded()
+
+
+# (name, load, loaded): loaded() reports whether the component exists already
+DEFAULT_COMPONENTS: List[Tuple[str, Callable[[], None], Optional[Callable[[], bool]]]] = [
+    ("embeddings", _load_embeddings, _embeddings_loaded),
+    ("vector_index", _load_index, _index_loaded),
+]
+
+
+class WarmUp:
+    """Loads components in a background thread and tracks their status"""
+
+    def __init__(self, components: List[Tuple] = None, enabled: bool = WARMUP_ON_STARTUP):
+        self.components = [
+            (component[0], component[1], component[2] if len(component) > 2 else None)
+            for component in (components or DEFAULT_COMPONENTS)
+        ]
+        self.enabled = enabled
+        self._status: Dict[str, Dict] = {
+            name: {"state": "pending" if enabled else "lazy", "attempts": 0, "error": None, "seconds": None}
+            for name, _, _ in self.components
+        }
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start warming up (no-op if already running)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._load_all()
+            with self._lock:
+                # retry_failed() may have reset a component while this thread
+                # was finishing; pick it up instead of exiting
+                if not any(s["state"] == "pending" for s in self._status.values()):
+                    self._thread = None
+                    return
+
+    def _load_all(self):
+        for name, load, _ in self.components:
+            if self._status[name]["state"] == "ready":
+                continue
+            started = time.perf_counter()
+            for attempt in range(1, WARMUP_MAX_ATTEMPTS + 1):
+                self._update(name, state="loading", attempts=attempt)
+                try:
+                    load()
+                except Exception as e:
+                    self._update(name, error=str(e))
+                    print(f"⚠️ Warm-up of {name} failed (attempt {attempt}): {e}")
+                    if attempt == WARMUP_MAX_ATTEMPTS:
+                        self._update(name, state="failed")
+                        break
+                    time.sleep(min(WARMUP_BACKOFF_MAX, WARMUP_BACKOFF_BASE * 2 ** (attempt - 1)))
+                    continue
+
+                seconds = round(time.perf_counter() - started, 2)
+                self._update(name, state="ready", error=None, seconds=seconds)
+                print(f"✅ Warm-up: {name} ready in {seconds}s")
+                break
+
+    def _update(self, name: str, **fields):
+        with self._lock:
+            self._status[name].update(fields)
+
+    def status(self) -> Dict[str, Dict]:
+        for name, _, loaded in self.components:
+            if loaded is not None and self._status[name]["state"] != "ready" and loaded():
+                # Loaded on demand by a request (or by a retry that outlived us)
+                self._update(name, state="ready", error=None)
+        with self._lock:
+            return {name: dict(status) for name, status in self._status.items()}
+
+    def retry_failed(self):
+        """Start another round of attempts for components that gave up"""
+        with self._lock:
+            failed = [name for name, status in self._status.items() if status["state"] == "failed"]
+            for name in failed:
+                self._status[name].update(state="pending", attempts=0)
+        if failed:
+            print(f"🔧 Retrying warm-up of {', '.join(failed)}")
+            self.start()
+
+    @property
+    def ready(self) -> bool:
+        status = self.status()
+        if self.enabled and any(s["state"] == "failed" for s in status.values()):
+            self.retry_failed()
+        return all(s["state"] in ("ready", "lazy") for s in status.values())
+
+
+# Global instance
+warmup = WarmUp()
@@ -0,0 +1,181 @@
+"""
+Factories for the embedding model and vector index backend.
+
+VECTOR_BACKEND selects where vectors live:
+    pinecone - managed Pinecone index (default)
+    local    - LocalVectorIndex on disk, with VECTOR_QUANTIZATION
+
+EMBEDDING_BACKEND selects how the embedding model runs:
+    torch - sentence-transformers via HuggingFaceEmbeddings (default)
+    onnx  - ONNX Runtime export, optionally int8-quantized (ONNX_QUANTIZE)
+    remote - the shared embedding service (backend.vectorstore.embedding_server)
+
+EMBEDDING_PROJECTION_PATH optionally points at a projection fit with
+``python -m backend.vectorstore.projection``; it is applied to every
+embedding at ingest and query time. The projection version an index was
+built with is recorded on the index (the local manifest, or a marker vector
+in Pinecone's PROJECTION_NAMESPACE) and a mismatch refuses to start.
+"""
+import threading
+
+from decouple import config
+
+VECTOR_BACKEND = config("VECTOR_BACKEND", default="pinecone")
+PINECONE_INDEX_NAME = config("PINECONE_INDEX_NAME", default="my-genai-index")
+EMBEDDING_MODEL = config("EMBEDDING_MODEL", default="BAAI/bge-large-en-v1.5")
+EMBEDDING_BACKEND = config("EMBEDDING_BACKEND", default="torch")
+EMBEDDING_PROJECTION_PATH = config("EMBEDDING_PROJECTION_PATH", default="")
+
+# Reserved Pinecone namespace holding the marker vector that records the
+# projection version; queries never search it
+PROJECTION_NAMESPACE = "__index_meta__"
+PROJECTION_MARKER_ID = "embedding-projection"
+
+_index = None
+_embeddings = None
+_projection = None
+_lock = threading.Lock()
+
+
+def get_projection():
+    """The configured Projection, or None when embeddings are full-dimension"""
+    global _projection
+
+    if not EMBEDDING_PROJECTION_PATH:
+        return None
+    with _lock:
+        if _projection is None:
+            from backend.vectorstore.projection import Projection
+            _projection = Projection.load(EMBEDDING_PROJECTION_PATH)
+        return _projection
+
+
+def create_base_embeddings(backend: str = None):
+    """The embedding model itself, without any projection"""
+    backend = backend or EMBEDDING_BACKEND
+
+    if backend == "torch":
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+    if backend == "onnx":
+        from backend.vectorstore.onnx_embeddings import OnnxEmbeddings
+        return OnnxEmbeddings(EMBEDDING_MODEL)
+
+    if backend == "remote":
+        from backend.vectorstore.embedding_server import RemoteEmbeddings
+        return RemoteEmbeddings()
+
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+
+
+def create_embeddings():
+    """Shared embeddings instance used for both ingest and queries"""
+    global _embeddings
+
+    projection = get_projection()
+    with _lock:
+        if _embeddings is None:
+            embeddings = create_base_embeddings()
+            if projection is not None:
+                from backend.vectorstore.projection import ProjectedEmbeddings
+                embeddings = ProjectedEmbeddings(embeddings, projection)
+            _embeddings = embeddings
+        return _embeddings
+
+
+def embeddings_loaded() -> bool:
+    """True once the shared embeddings instance exists (by warm-up or first use)"""
+    return _embeddings is not None
+
+
+def index_loaded() -> bool:
+    """True once the shared index client exists (by warm-up or first use)"""
+    return _index is not None
+
+
+def create_index():
+    """Return an object implementing the Pinecone Index upsert/query/delete API"""
+    global _index
+
+    projection = get_projection()
+
+    # One instance per process so every caller shares connections and,
+    # for the local index, the in-memory codes
+    with _lock:
+        if _index is not None:
+            return _index
+
+        if VECTOR_BACKEND == "local":
+            from backend.vectorstore.local_index import LocalVectorIndex
+            _index = LocalVectorIndex(
+                projection_version=projection.version if projection else None
+            )
+            return _index
+
+        if VECTOR_BACKEND == "pinecone":
+            from pinecone import Pinecone
+            pc = Pinecone(api_key=config("PINECONE_API_KEY"))
+            index = pc.Index(PINECONE_INDEX_NAME)
+
+            _check_pinecone_projection(index, projection)
+            _index = index
+            return _index
+
+    raise ValueError(f"Unknown VECTOR_BACKEND: {VECTOR_BACKEND}")
+
+
+def _check_pinecone_projection(index, projection):
+    """
+    Refuse an index built with a different projection than the configured one.
+    An index without a marker gets one: "none" for existing unprojected data,
+    the configured version when it is still empty.
+    """
+    version = projection.version if projection else None
+    stats = index.describe_index_stats()
+    dimension = stats.get("dimension")
+
+    # A Pinecone index has a fixed dimension, so projected vectors need
+    # their own index; catch a mismatch before upserts start failing
+    if projection is not None and dimension and dimension != projection.out_dim:
+        raise ValueError(
+            f"Pinecone index {PINECONE_INDEX_NAME} has dimension {dimension}, "
+            f"but projection {projection.version} outputs {projection.out_dim}"
+        )
+
+    marker = _fetch_metadata(index, PROJECTION_MARKER_ID, PROJECTION_NAMESPACE)
+    if marker is not None:
+        built_with = marker.get("projection") or None
+        if built_with != version:
+            raise ValueError(
+                f"Pinecone index {PINECONE_INDEX_NAME} was built with embedding projection "
+                f"{built_with or 'none'}, but {version or 'none'} is configured; re-index documents"
+            )
+        return
+
+    if version is not None and stats.get("total_vector_count"):
+        raise ValueError(
+            f"Pinecone index {PINECONE_INDEX_NAME} has vectors but no projection marker; "
+            f"re-index documents into an empty index to use projection {version}"
+        )
+    if dimension:
+        # Pinecone rejects all-zero dense vectors
+        index.upsert(
+            vectors=[{
+                "id": PROJECTION_MARKER_ID,
+                "values": [1.0] + [0.0] * (int(dimension) - 1),
+                "metadata": {"projection": version or ""},
+            }],
+            namespace=PROJECTION_NAMESPACE,
+        )
+
+
+def _fetch_metadata(index, vector_id: str, namespace: str):
+    """Metadata of one vector for dict or Pinecone fetch responses, None if absent"""
+    response = index.fetch(ids=[vector_id], namespace=namespace)
+    vectors = response.get("vectors", {}) if isinstance(response, dict) else response.vectors
+    vector = vectors.get(vector_id)
+    if vector is None:
+        return None
+    metadata = vector.get("metadata") if isinstance(vector, dict) else vector.metadata
+    return metadata or {}
@@ -0,0 +1,215 @@
+"""
+Compact local store for chunk text.
+
+Vectors only carry chunk IDs; the text lives here so query results stay small
+on the wire and index storage doesn't grow with document size.
+
+Layout (in CHUNK_STORE_DIR; a relative setting is resolved against the
+project root, not the working directory):
+    chunks.dat  - append-only zstd frames, one per chunk, memory-mapped for reads
+    chunks.idx  - append-only fixed-size records: key digest, offset, length
+    chunks.lock - advisory lock serializing writers across worker processes
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import random
+import struct
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import zstandard
+from decouple import config
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+CHUNK_STORE_DIR = os.path.join(PROJECT_ROOT, config("CHUNK_STORE_DIR", default="chunk_store"))
+CHUNK_STORE_ZSTD_LEVEL = config("CHUNK_STORE_ZSTD_LEVEL", default=3, cast=int)
+
+# 16-byte key digest, u64 offset, u32 length (0 = deleted)
+_RECORD = struct.Struct("<16sQI")
+
+
+def _key(chunk_id: str) -> bytes:
+    return hashlib.blake2b(chunk_id.encode("utf-8"), digest_size=16).digest()
+
+
+class ChunkStore:
+    """Append-only, memory-mapped chunk text store keyed by chunk ID"""
+
+    def __init__(self, directory: str = CHUNK_STORE_DIR, level: int = CHUNK_STORE_ZSTD_LEVEL):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.data_path = os.path.join(directory, "chunks.dat")
+        self.index_path = os.path.join(directory, "chunks.idx")
+        self.lock_path = os.path.join(directory, "chunks.lock")
+
+        for path in (self.data_path, self.index_path):
+            open(path, "ab").close()
+
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._lock = threading.Lock()
+        self._offsets: Dict[bytes, tuple] = {}
+        self._index_read = 0
+        self._map: Optional[mmap.mmap] = None
+        self._map_size = 0
+
+    # ---------- writes ----------
+
+    def put_many(self, chunks: Dict[str, str]):
+        """Store text for several chunk IDs in one append"""
+        if not chunks:
+            return
+
+        frames = [
+            (_key(chunk_id), self._compressor.compress(text.encode("utf-8")))
+            for chunk_id, text in chunks.items()
+        ]
+        self._append(frames)
+
+    def put(self, chunk_id: str, text: str):
+        self.put_many({chunk_id: text})
+
+    def delete_many(self, chunk_ids: Iterable[str]):
+        """Tombstone chunk IDs (space is reclaimed by rewriting the store)"""
+        self._append([(_key(chunk_id), None) for chunk_id in chunk_ids])
+
+    def _append(self, frames: List[tuple]):
+        with open(self.lock_path, "ab") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(self.data_path, "ab") as data, open(self.index_path, "ab") as index:
+                    offset = data.tell()
+                    records = []
+                    for key, frame in frames:
+                        if frame is None:
+                            records.append(_RECORD.pack(key, 0, 0))
+                            continue
+                        data.write(frame)
+                        records.append(_RECORD.pack(key, offset, len(frame)))
+                        offset += len(frame)
+                    # Data must be on disk before the index points at it
+                    data.flush()
+                    os.fsync(data.fileno())
+                    index.write(b"".join(records))
+                    index.flush()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # ---------- reads ----------
+
+    def _refresh(self):
+        """Pick up records appended by this or other processes"""
+        size = os.path.getsize(self.index_path)
+        if size > self._index_read:
+            # Only whole records; a writer may be mid-append
+            usable = size - (size - self._index_read) % _RECORD.size
+            with open(self.index_path, "rb") as index:
+                index.seek(self._index_read)
+                raw = index.read(usable - self._index_read)
+            for key, offset, length in _RECORD.iter_unpack(raw):
+                if length:
+                    self._offsets[key] = (offset, length)
+                else:
+                    self._offsets.pop(key, None)
+            self._index_read = usable
+
+        data_size = os.path.getsize(self.data_path)
+        if data_size and data_size != self._map_size:
+            if self._map is not None:
+                self._map.close()
+            with open(self.data_path, "rb") as data:
+                self._map = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+            self._map_size = data_size
+
+    def get_many(self, chunk_ids: Iterable[str]) -> Dict[str, str]:
+        """Fetch text for several chunks in one pass over the mapped file"""
+        with self._lock:
+            self._refresh()
+            wanted = []
+            for chunk_id in chunk_ids:
+                location = self._offsets.get(_key(chunk_id))
+                if location is not None:
+                    wanted.append((location, chunk_id))
+
+            # Read in file order to keep page faults sequential
+            wanted.sort()
+            decompressor = zstandard.ZstdDecompressor()
+            return {
+                chunk_id: decompressor.decompress(
+                    self._map[offset:offset + length]
+                ).decode("utf-8")
+                for (offset, length), chunk_id in wanted
+            }
+
+    def sample(self, count: int, seed: int = 0) -> List[str]:
+        """Random sample of stored texts (used to fit embedding projections)"""
+        with self._lock:
+            self._refresh()
+            locations = sorted(self._offsets.values())
+            rng = random.Random(seed)
+            picked = sorted(rng.sample(locations, min(count, len(locations))))
+            decompressor = zstandard.ZstdDecompressor()
+            return [
+                decompressor.decompress(self._map[offset:offset + length]).decode("utf-8")
+                for offset, length in picked
+            ]
+
+    def get(self, chunk_id: str) -> Optional[str]:
+        return self.get_many([chunk_id]).get(chunk_id)
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._offsets)
+
+
+def _field(match, name: str, default=None):
+    """Read a field from a Pinecone match object or a plain dict"""
+    if isinstance(match, dict):
+        return match.get(name, default)
+    return getattr(match, name, default)
+
+
+def hydrate_matches(matches: List, store: "ChunkStore" = None) -> List[Dict]:
+    """
+    Turn index query matches into dicts with their chunk text attached.
+    Text comes from the chunk store in one batched read; vectors indexed
+    before the store existed still carry it in metadata.
+    """
+    store = store or get_chunk_store()
+    ids = [_field(match, "id") for match in matches]
+    texts = store.get_many(ids)
+
+    results = []
+    for match in matches:
+        metadata = dict(_field(match, "metadata") or {})
+        legacy_text = metadata.pop("text", "")
+        chunk_id = _field(match, "id")
+        results.append({
+            "id": chunk_id,
+            "score": _field(match, "score"),
+            "text": texts.get(chunk_id) or legacy_text,
+            "metadata": metadata,
+        })
+    return results
+
+
+# Global instance, created on first use so importing this module touches no files
+_chunk_store = None
+_chunk_store_lock = threading.Lock()
+
+
+def get_chunk_store() -> ChunkStore:
+    global _chunk_store
+
+    with _chunk_store_lock:
+        if _chunk_store is None:
+            _chunk_store = ChunkStore()
+        return _chunk_store
+
+
+def __getattr__(name):
+    if name == "chunk_store":
+        return get_chunk_store()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,26 +1,34 @@
 from typing import List, Dict
-from langchain_huggingface import HuggingFaceEmbeddings
-from pinecone import Pinecone
+from backend.vectorstore.backends import create_embeddings, create_index
 from decouple import config
+from backend.vectorstore.upsert_engine import UpsertEngine
+from backend.vectorstore.chunk_store import get_chunk_store, hydrate_matches
+from backend.vectorstore.document_vectors import (
+    DocumentCentroids, document_namespace, query_two_stage
+)
+from backend.utils.metrics import CHUNKS_INDEXED, EMBED_SECONDS
+import threading
 import uuid
 
+EMBED_BATCH_SIZE = config("EMBED_BATCH_SIZE", default=32, cast=int)
+# Pinecone accepts at most 1000 IDs per delete call
+DELETE_BATCH_SIZE = 1000
+
 
 class DocumentIndexer:
     """Index documents into Pinecone"""
 
     def __init__(self):
-        # Initialize Pinecone
-        pc = Pinecone(api_key=config("PINECONE_API_KEY"))
-        self.index = pc.Index(config("PINECONE_INDEX_NAME"))
+        # Initialize Pinecone (or the local index, per VECTOR_BACKEND)
+        self.index = create_index()
 
-        # Initialize embeddings
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="BAAI/bge-large-en-v1.5"
-        )
+        # Initialize embeddings (shared instance, projected if configured)
+        self.embeddings = create_embeddings()
 
     def embed_text(self, text: str) -> List[float]:
         """Generate embeddings for text"""
-        return self.embeddings.embed_query(text)
+        with EMBED_SECONDS.labels(op="query").time():
+            return self.embeddings.embed_query(text)
 
     def index_document_chunks(
             self,
@@ -43,50 +51,74 @@ class DocumentIndexer:
         if not document_id:
             document_id = str(uuid.uuid4())
 
-        vectors_to_upsert = []
-
-        for chunk in chunks:
-            # Generate embedding
-            embedding = self.embed_text(chunk["text"])
-
-            # Create unique ID for this chunk
-            chunk_id = f"{document_id}_chunk_{chunk['chunk_index']}"
-
-            # Prepare metadata
-            metadata = {
-                "user_id": user_id,
-                "document_id": document_id,
-                "chunk_index": chunk["chunk_index"],
-                "total_chunks": chunk["total_chunks"],
-                "file_name": chunk["file_name"],
-                "text": chunk["text"][:1000]  # Store first 1000 chars in metadata
-            }
-
-            # Add to upsert list
-            vectors_to_upsert.append({
-                "id": chunk_id,
-                "values": embedding,
-                "metadata": metadata
-            })
-
-        # Upsert to Pinecone (batch upsert for efficiency)
-        batch_size = 100
-        for i in range(0, len(vectors_to_upsert), batch_size):
-            batch = vectors_to_upsert[i:i + batch_size]
-            self.index.upsert(vectors=batch, namespace=f"user_{user_id}")
-
+        namespace = f"user_{user_id}"
+        centroids = DocumentCentroids()
+
+        # Embed in batches and hand vectors to the upsert engine as they are
+        # ready, so network upserts overlap with embedding of the next batch
+        with UpsertEngine(self.index, namespace=namespace) as engine:
+            for start in range(0, len(chunks), EMBED_BATCH_SIZE):
+                batch = chunks[start:start + EMBED_BATCH_SIZE]
+                with EMBED_SECONDS.labels(op="documents").time():
+                    embeddings = self.embeddings.embed_documents([c["text"] for c in batch])
+                chunk_ids = [f"{document_id}_chunk_{c['chunk_index']}" for c in batch]
+
+                # Text goes to the local chunk store; vectors only carry the ID
+                get_chunk_store().put_many({
+                    chunk_id: chunk["text"] for chunk_id, chunk in zip(chunk_ids, batch)
+                })
+
+                for chunk_id, chunk, embedding in zip(chunk_ids, batch, embeddings):
+                    # Prepare metadata
+                    metadata = {
+                        "user_id": user_id,
+                        "document_id": document_id,
+                        "chunk_index": chunk["chunk_index"],
+                        "total_chunks": chunk["total_chunks"],
+                        "file_name": chunk["file_name"]
+                    }
+
+                    engine.add({
+                        "id": chunk_id,
+                        "values": embedding,
+                        "metadata": metadata
+                    })
+                    centroids.add(document_id, embedding, {
+                        "user_id": user_id,
+                        "file_name": chunk["file_name"]
+                    })
+
+        # Document-level vector for two-stage retrieval
+        with UpsertEngine(self.index, namespace=document_namespace(namespace)) as engine:
+            engine.add_many(centroids.vectors())
+
+        CHUNKS_INDEXED.inc(len(chunks))
         return {
             "document_id": document_id,
             "chunks_indexed": len(chunks),
             "status": "success"
         }
 
-    def delete_document(self, document_id: str, user_id: int):
-        """Delete all chunks of a document from Pinecone"""
-        # Query to get all chunk IDs for this document
-        # Then delete them
-        # This is simplified - in production, you'd want better tracking
-        pass
+    def delete_document(self, document_id: str, user_id: int) -> int:
+        """
+        Delete a document's chunk vectors, its document vector and its chunk
+        text; returns the number of chunks deleted.
+
+        Chunk IDs are "<document_id>_chunk_<n>", so they are listed by
+        prefix (index.list) rather than found through a metadata query.
+        """
+        namespace = f"user_{user_id}"
+        chunk_ids = []
+        for page in self.index.list(prefix=f"{document_id}_chunk_", namespace=namespace):
+            chunk_ids.extend(page)
+
+        for start in range(0, len(chunk_ids), DELETE_BATCH_SIZE):
+            self.index.delete(ids=chunk_ids[start:start + DELETE_BATCH_SIZE], namespace=namespace)
+        self.index.delete(ids=[document_id], namespace=document_namespace(namespace))
+
+        # Text last: a query racing the delete never gets a match without text
+        get_chunk_store().delete_many(chunk_ids)
+        return len(chunk_ids)
 
     def search_user_documents(
             self,
@@ -103,21 +135,37 @@ class DocumentIndexer:
             top_k: Number of results to return
 
         Returns:
-            List of relevant chunks with scores
+            List of relevant chunks with scores and text
         """
         # Generate query embedding
         query_embedding = self.embed_text(query)
 
-        # Search in user's namespace
-        results = self.index.query(
-            vector=query_embedding,
-            top_k=top_k,
-            namespace=f"user_{user_id}",
-            include_metadata=True
+        # Search in user's namespace (best documents first, then their chunks)
+        matches = query_two_stage(
+            self.index,
+            query_embedding,
+            top_k,
+            namespace=f"user_{user_id}"
         )
 
-        return results.get("matches", [])
+        return hydrate_matches(matches)
+
+
+# Global instance, created on first use so importing this module is cheap
+_document_indexer = None
+_document_indexer_lock = threading.Lock()
+
+
+def get_document_indexer() -> DocumentIndexer:
+    global _document_indexer
+
+    with _document_indexer_lock:
+        if _document_indexer is None:
+            _document_indexer = DocumentIndexer()
+        return _document_indexer
 
 
-# Global instance
-document_indexer = DocumentIndexer()
+def __getattr__(name):
+    if name == "document_indexer":
+        return get_document_indexer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,136 @@
+"""
+Document-level vectors for two-stage retrieval.
+
+Each ingested document also gets one vector: the normalized mean of its chunk
+embeddings, stored in a sibling namespace. Queries first pick the top
+documents from that (much smaller) namespace, then search only their chunks.
+
+Chunks stored without a document_id (indexed before document vectors, or
+added without one) have no document vector, so stage one can never pick
+them. With TWO_STAGE_LEGACY_CHUNKS (default on) a second chunk search over
+`document_id $exists: false` is sent concurrently with the `$in` chunk
+search (on a small shared thread pool), so a query costs two sequential
+round trips like before: the document search, then both chunk searches at
+once. The two result lists are merged by score. Turn it off once every
+chunk carries a document_id.
+"""
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from decouple import config
+
+from backend.utils.metrics import VECTOR_QUERY_SECONDS
+
+TWO_STAGE_RETRIEVAL = config("TWO_STAGE_RETRIEVAL", default=True, cast=bool)
+TWO_STAGE_TOP_DOCUMENTS = config("TWO_STAGE_TOP_DOCUMENTS", default=5, cast=int)
+TWO_STAGE_LEGACY_CHUNKS = config("TWO_STAGE_LEGACY_CHUNKS", default=True, cast=bool)
+TWO_STAGE_QUERY_THREADS = config("TWO_STAGE_QUERY_THREADS", default=8, cast=int)
+
+# Runs the legacy chunk search while the calling thread runs the $in search
+_legacy_executor = ThreadPoolExecutor(max_workers=TWO_STAGE_QUERY_THREADS, thread_name_prefix="two-stage")
+
+
+def document_namespace(namespace: Optional[str] = None) -> str:
+    """Namespace holding document vectors for a chunk namespace"""
+    return f"{namespace}__documents" if namespace else "__documents__"
+
+
+class DocumentCentroids:
+    """Accumulates chunk embeddings per document while they stream past"""
+
+    def __init__(self):
+        self._sums: Dict[str, List[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._metadata: Dict[str, Dict] = {}
+
+    def add(self, document_id: str, embedding: List[float], metadata: Dict = None):
+        total = self._sums.get(document_id)
+        if total is None:
+            self._sums[document_id] = list(embedding)
+            self._counts[document_id] = 1
+            self._metadata[document_id] = dict(metadata or {})
+            return
+        for i, value in enumerate(embedding):
+            total[i] += value
+        self._counts[document_id] += 1
+
+    def vectors(self) -> List[Dict]:
+        """Pinecone-style vectors, one per document"""
+        vectors = []
+        for document_id, total in self._sums.items():
+            norm = math.sqrt(sum(x * x for x in total)) or 1.0
+            metadata = self._metadata[document_id]
+            metadata["document_id"] = document_id
+            metadata["chunk_count"] = self._counts[document_id]
+            vectors.append({
+                "id": document_id,
+                "values": [x / norm for x in total],
+                "metadata": metadata,
+            })
+        return vectors
+
+
+def query_matches(index, **kwargs) -> List:
+    """Run index.query and return its matches for dict or Pinecone responses"""
+    results = index.query(**kwargs)
+    if isinstance(results, dict):
+        return results.get("matches", [])
+    return results.matches
+
+
+def _match_id(match) -> str:
+    return match["id"] if isinstance(match, dict) else match.id
+
+
+def _match_score(match) -> float:
+    return match["score"] if isinstance(match, dict) else match.score
+
+
+def query_two_stage(
+        index,
+        vector: List[float],
+        top_k: int,
+        filter: Dict = None,
+        namespace: str = None,
+        top_documents: int = TWO_STAGE_TOP_DOCUMENTS
+) -> List:
+    """
+    Pick the best documents first, then search only their chunks.
+    Falls back to a plain chunk search when no document vectors exist
+    (e.g. everything was indexed before document vectors were added).
+    """
+    with VECTOR_QUERY_SECONDS.time():
+        return _query_two_stage(index, vector, top_k, filter, namespace, top_documents)
+
+
+def _query_two_stage(index, vector, top_k, filter, namespace, top_documents) -> List:
+    chunk_kwargs = {"vector": vector, "top_k": top_k, "include_metadata": True}
+    if namespace:
+        chunk_kwargs["namespace"] = namespace
+
+    document_ids = []
+    if TWO_STAGE_RETRIEVAL:
+        kwargs = {"vector": vector, "top_k": top_documents, "namespace": document_namespace(namespace)}
+        if filter:
+            kwargs["filter"] = filter
+        document_ids = [_match_id(m) for m in query_matches(index, **kwargs)]
+
+    if not document_ids:
+        if filter:
+            chunk_kwargs["filter"] = filter
+        return query_matches(index, **chunk_kwargs)
+
+    legacy = None
+    if TWO_STAGE_LEGACY_CHUNKS:
+        legacy = _legacy_executor.submit(
+            query_matches, index, filter={**(filter or {}), "document_id": {"$exists": False}}, **chunk_kwargs
+        )
+    matches = list(query_matches(
+        index, filter={**(filter or {}), "document_id": {"$in": document_ids}}, **chunk_kwargs
+    ))
+    if legacy is not None:
+        matches += legacy.result()
+        matches.sort(key=_match_score, reverse=True)
+        matches = matches[:top_k]
+    return matches
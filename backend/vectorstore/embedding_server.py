@@ -0,0 +1,273 @@
+"""
+Out-of-process embedding service shared by all uvicorn workers.
+
+One process owns the model and micro-batches requests from every worker, so
+N app workers no longer mean N copies of bge-large or N oversubscribed
+thread pools. Workers talk to it over a Unix socket with a small binary
+protocol (little-endian):
+
+    request:  b"EMB1" | op:u8 (1=documents, 2=query) | count:u32
+              then per text: length:u32 | utf-8 bytes
+    response: b"EMB1" | status:u8 (0=ok, 1=error) | count:u32 | dim:u32
+              then count*dim float32 (or, on error, count bytes of message)
+
+Run the service, then start the app with EMBEDDING_BACKEND=remote:
+    python -m backend.vectorstore.embedding_server
+    EMBEDDING_BACKEND=remote uvicorn backend.main:app --workers 4
+"""
+import asyncio
+import os
+import socket
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import numpy as np
+from decouple import config
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_SOCKET_PATH = config("EMBEDDING_SOCKET_PATH", default="/tmp/genai-embeddings.sock")
+EMBEDDING_SERVER_BACKEND = config("EMBEDDING_SERVER_BACKEND", default="torch")
+EMBEDDING_SERVER_MAX_BATCH = config("EMBEDDING_SERVER_MAX_BATCH", default=64, cast=int)
+EMBEDDING_SERVER_BATCH_WAIT_MS = config("EMBEDDING_SERVER_BATCH_WAIT_MS", default=5, cast=float)
+EMBEDDING_CLIENT_TIMEOUT = config("EMBEDDING_CLIENT_TIMEOUT", default=60, cast=float)
+
+MAGIC = b"EMB1"
+OP_DOCUMENTS = 1
+OP_QUERY = 2
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+_REQUEST_HEADER = struct.Struct("<4sBI")
+_RESPONSE_HEADER = struct.Struct("<4sBII")
+_LENGTH = struct.Struct("<I")
+
+
+class EmbeddingServiceError(Exception):
+    """The embedding service returned an error or could not be reached"""
+
+
+# ============= SERVER =============
+
+class _Batcher:
+    """Collects texts from concurrent requests and runs them as one model call"""
+
+    def __init__(self, embeddings, max_batch: int, wait_seconds: float):
+        self.embeddings = embeddings
+        self.max_batch = max_batch
+        self.wait_seconds = wait_seconds
+        self.queues = {OP_DOCUMENTS: asyncio.Queue(), OP_QUERY: asyncio.Queue()}
+        self.query_encoder = query_encoder(embeddings)
+        # A single model thread: the model parallelises internally
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+
+    async def embed(self, op: int, texts: List[str]) -> np.ndarray:
+        future = asyncio.get_running_loop().create_future()
+        await self.queues[op].put((texts, future))
+        return await future
+
+    async def run(self, op: int):
+        queue = self.queues[op]
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await queue.get()]
+            size = len(items[0][0])
+
+            # Give other workers a moment to join this batch
+            deadline = loop.time() + self.wait_seconds
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in items for text in item_texts]
+            try:
+                vectors = await loop.run_in_executor(self.executor, self._compute, op, texts)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for item_texts, future in items:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+    def _compute(self, op: int, texts: List[str]) -> np.ndarray:
+        if op == OP_QUERY:
+            vectors = self.query_encoder(texts)
+        else:
+            vectors = self.embeddings.embed_documents(texts)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def query_encoder(embeddings) -> Callable[[List[str]], List[List[float]]]:
+    """
+    A function embedding many queries the way embed_query embeds one, as a
+    single model call where the backend allows:
+    - an embed_queries method (OnnxEmbeddings)
+    - HuggingFaceEmbeddings, whose embed_query is embed_documents with
+      query_encode_kwargs (e.g. a bge instruction prompt) in place of
+      encode_kwargs; a model_copy with those swapped shares the loaded model
+    Anything else falls back to one embed_query call per text.
+    """
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries
+    if hasattr(embeddings, "query_encode_kwargs") and hasattr(embeddings, "model_copy"):
+        if embeddings.query_encode_kwargs:
+            embeddings = embeddings.model_copy(update={"encode_kwargs": dict(embeddings.query_encode_kwargs)})
+        return embeddings.embed_documents
+    return lambda texts: [embeddings.embed_query(text) for text in texts]
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    magic, op, count = _REQUEST_HEADER.unpack(await reader.readexactly(_REQUEST_HEADER.size))
+    if magic != MAGIC or op not in (OP_DOCUMENTS, OP_QUERY):
+        raise ValueError("bad request header")
+    texts = []
+    for _ in range(count):
+        (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+        texts.append((await reader.readexactly(length)).decode("utf-8"))
+    return op, texts
+
+
+async def _handle_client(batcher: _Batcher, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            try:
+                op, texts = await _read_request(reader)
+            except asyncio.IncompleteReadError:
+                break  # client closed the connection
+
+            try:
+                vectors = await batcher.embed(op, texts) if texts else np.zeros((0, 0), dtype=np.float32)
+                count, dim = vectors.shape if vectors.ndim == 2 else (0, 0)
+                writer.write(_RESPONSE_HEADER.pack(MAGIC, STATUS_OK, count, dim))
+                writer.write(vectors.astype("<f4").tobytes())
+            except Exception as e:
+                message = str(e).encode("utf-8")
+                writer.write(_RESPONSE_HEADER.pack(MAGIC, STATUS_ERROR, len(message), 0))
+                writer.write(message)
+            await writer.drain()
+    except (ValueError, ConnectionError) as e:
+        print(f"⚠️ Embedding client error: {e}")
+    finally:
+        writer.close()
+
+
+async def serve(socket_path: str = EMBEDDING_SOCKET_PATH, backend: str = EMBEDDING_SERVER_BACKEND):
+    if backend == "remote":
+        raise ValueError("EMBEDDING_SERVER_BACKEND cannot be 'remote'")
+
+    from backend.vectorstore.backends import create_base_embeddings
+
+    print(f"🔧 Loading {backend} embedding model...")
+    embeddings = create_base_embeddings(backend)
+    batcher = _Batcher(embeddings, EMBEDDING_SERVER_MAX_BATCH, EMBEDDING_SERVER_BATCH_WAIT_MS / 1000)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = await asyncio.start_unix_server(
+        lambda r, w: _handle_client(batcher, r, w), path=socket_path
+    )
+    os.chmod(socket_path, 0o660)
+    print(f"✅ Embedding service listening on {socket_path}")
+
+    async with server:
+        await asyncio.gather(
+            server.serve_forever(),
+            batcher.run(OP_DOCUMENTS),
+            batcher.run(OP_QUERY),
+        )
+
+
+# ============= CLIENT =============
+
+class RemoteEmbeddings(Embeddings):
+    """LangChain embeddings backed by the shared embedding service"""
+
+    def __init__(self, socket_path: str = EMBEDDING_SOCKET_PATH, timeout: float = EMBEDDING_CLIENT_TIMEOUT):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        # One connection per thread; requests on a connection are sequential
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError as e:
+                sock.close()
+                raise EmbeddingServiceError(
+                    f"Embedding service not reachable at {self.socket_path}: {e}"
+                ) from e
+            self._local.sock = sock
+        return sock
+
+    def _reset(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = None
+
+    @staticmethod
+    def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+        buffer = bytearray()
+        while len(buffer) < size:
+            chunk = sock.recv(size - len(buffer))
+            if not chunk:
+                raise ConnectionError("embedding service closed the connection")
+            buffer.extend(chunk)
+        return bytes(buffer)
+
+    def _request(self, op: int, texts: List[str]) -> np.ndarray:
+        parts = [_REQUEST_HEADER.pack(MAGIC, op, len(texts))]
+        for text in texts:
+            encoded = text.encode("utf-8")
+            parts.append(_LENGTH.pack(len(encoded)))
+            parts.append(encoded)
+        payload = b"".join(parts)
+
+        # Retry once on a stale connection (e.g. the service restarted)
+        for attempt in (1, 2):
+            sock = self._connection()
+            try:
+                sock.sendall(payload)
+                magic, status, count, dim = _RESPONSE_HEADER.unpack(
+                    self._recv_exactly(sock, _RESPONSE_HEADER.size)
+                )
+                if magic != MAGIC:
+                    raise ConnectionError("bad response header")
+                if status != STATUS_OK:
+                    message = self._recv_exactly(sock, count).decode("utf-8", "replace")
+                    raise EmbeddingServiceError(message)
+                data = self._recv_exactly(sock, 4 * count * dim)
+                return np.frombuffer(data, dtype="<f4").reshape(count, dim)
+            except (ConnectionError, socket.timeout, OSError) as e:
+                self._reset()
+                if attempt == 2:
+                    raise EmbeddingServiceError(f"Embedding request failed: {e}") from e
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._request(OP_DOCUMENTS, texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._request(OP_QUERY, [text])[0].tolist()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve())
@@ -0,0 +1,518 @@
+"""
+Local vector index with quantized candidate generation.
+
+Exposes the subset of the Pinecone Index API the app uses (upsert / query /
+delete / list), so it can stand in for Pinecone on self-hosted deployments.
+
+Full-precision vectors stay on disk (memory-mapped); only compact codes are
+held in RAM:
+    none - float32 in RAM (4 bytes/dim, exact search)
+    int8 - per-dimension scalar quantization (1 byte/dim)
+    pq   - product quantization, PQ_SUBVECTORS bytes per vector
+Candidates are scored on the codes, then a short list of
+top_k * RERANK_FACTOR is re-scored exactly against the on-disk vectors.
+"""
+import fcntl
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from decouple import config
+
+LOCAL_INDEX_DIR = config("LOCAL_INDEX_DIR", default="vector_index")
+VECTOR_QUANTIZATION = config("VECTOR_QUANTIZATION", default="int8")
+PQ_SUBVECTORS = config("PQ_SUBVECTORS", default=64, cast=int)
+PQ_TRAIN_SIZE = config("PQ_TRAIN_SIZE", default=4096, cast=int)
+SQ_TRAIN_SIZE = config("SQ_TRAIN_SIZE", default=256, cast=int)
+# int8 codes are widened to float32 this many rows at a time while scoring
+SQ_SCORE_BLOCK = config("SQ_SCORE_BLOCK", default=8192, cast=int)
+RERANK_FACTOR = config("RERANK_FACTOR", default=8, cast=int)
+
+# Metadata keys kept in postings lists so filters don't scan every row
+INDEXED_METADATA_KEYS = ("user_id", "document_id")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class ScalarQuantizer:
+    """Symmetric per-dimension int8 quantization"""
+
+    def __init__(self, scale: np.ndarray = None, block: int = None):
+        self.scale = scale
+        self.block = block or SQ_SCORE_BLOCK
+
+    @property
+    def trained(self) -> bool:
+        return self.scale is not None
+
+    def fit(self, vectors: np.ndarray):
+        scale = np.abs(vectors).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        self.scale = scale.astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors / self.scale), -127, 127).astype(np.int8)
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        # Fold the scale into the query instead of decoding every row, and
+        # widen the codes block by block into one reused float32 buffer so
+        # the copy stays small while the dot product still uses BLAS
+        weights = (query * self.scale).astype(np.float32)
+        scores = np.empty(len(codes), dtype=np.float32)
+        buffer = np.empty((min(self.block, len(codes)), codes.shape[1]), dtype=np.float32)
+        for start in range(0, len(codes), self.block):
+            block = codes[start:start + self.block]
+            widened = buffer[:len(block)]
+            widened[...] = block
+            np.dot(widened, weights, out=scores[start:start + len(block)])
+        return scores
+
+    def nbytes_per_vector(self, dim: int) -> int:
+        return dim
+
+
+class ProductQuantizer:
+    """Product quantization with 256 centroids per subspace (uint8 codes)"""
+
+    def __init__(self, subvectors: int = None, centroids: np.ndarray = None):
+        self.subvectors = subvectors or PQ_SUBVECTORS
+        self.centroids = centroids  # (subvectors, 256, sub_dim)
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def fit(self, vectors: np.ndarray, iterations: int = 20, seed: int = 0):
+        n, dim = vectors.shape
+        if dim % self.subvectors:
+            raise ValueError(f"dimension {dim} is not divisible by {self.subvectors} subvectors")
+
+        rng = np.random.default_rng(seed)
+        sub_dim = dim // self.subvectors
+        k = min(256, n)
+        centroids = np.zeros((self.subvectors, 256, sub_dim), dtype=np.float32)
+
+        for j in range(self.subvectors):
+            x = vectors[:, j * sub_dim:(j + 1) * sub_dim]
+            c = x[rng.choice(n, size=k, replace=False)].copy()
+            for _ in range(iterations):
+                assign = self._nearest(x, c)
+                sums = np.zeros_like(c)
+                np.add.at(sums, assign, x)
+                counts = np.bincount(assign, minlength=k)
+                filled = counts > 0
+                c[filled] = sums[filled] / counts[filled, None]
+                # Re-seed empty clusters from random points
+                empty = np.flatnonzero(~filled)
+                c[empty] = x[rng.integers(n, size=len(empty))]
+            centroids[j, :k] = c
+
+        self.centroids = centroids
+
+    @staticmethod
+    def _nearest(x: np.ndarray, c: np.ndarray) -> np.ndarray:
+        distances = (x * x).sum(1)[:, None] - 2 * x @ c.T + (c * c).sum(1)[None, :]
+        return distances.argmin(axis=1)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        sub_dim = self.centroids.shape[2]
+        codes = np.empty((len(vectors), self.subvectors), dtype=np.uint8)
+        for j in range(self.subvectors):
+            x = vectors[:, j * sub_dim:(j + 1) * sub_dim]
+            codes[:, j] = self._nearest(x, self.centroids[j])
+        return codes
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        # Asymmetric distance: one lookup table per subspace, then gather-sum
+        sub_dim = self.centroids.shape[2]
+        tables = np.einsum(
+            "jkd,jd->jk", self.centroids, query.reshape(self.subvectors, sub_dim)
+        )
+        return tables[np.arange(self.subvectors), codes].sum(axis=1)
+
+    def nbytes_per_vector(self, dim: int) -> int:
+        return self.subvectors
+
+
+class _Namespace:
+    """Vectors, codes and metadata for one namespace"""
+
+    def __init__(self, directory: str, quantization: str, projection_version: Optional[str] = None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.quantization = quantization
+        self.projection_version = projection_version
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.meta_path = os.path.join(directory, "meta.jsonl")
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.lock_path = os.path.join(directory, "index.lock")
+
+        for path in (self.vectors_path, self.meta_path):
+            open(path, "ab").close()
+
+        self.dim: Optional[int] = None
+        self.quantizer = None
+        self.ids: List[str] = []
+        self.metadata: List[Dict] = []
+        self.alive = np.zeros(0, dtype=bool)
+        self.codes: Optional[np.ndarray] = None
+        self.id_to_row: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[str, set]] = {key: {} for key in INDEXED_METADATA_KEYS}
+
+        self._meta_read = 0
+        self._map: Optional[np.memmap] = None
+
+        self._load_manifest()
+
+    # ---------- persistence ----------
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("projection") != self.projection_version:
+            raise ValueError(
+                f"Index at {self.directory} was built with embedding projection "
+                f"{manifest.get('projection') or 'none'}, but "
+                f"{self.projection_version or 'none'} is configured; re-index documents"
+            )
+        self.dim = manifest["dim"]
+        self.quantizer = self._make_quantizer()
+        params = os.path.join(self.directory, "quantizer.npz")
+        if self.quantizer is None or not os.path.exists(params):
+            return
+        saved = np.load(params)
+        if isinstance(self.quantizer, ScalarQuantizer) and "scale" in saved:
+            self.quantizer.scale = saved["scale"]
+        elif isinstance(self.quantizer, ProductQuantizer) and "centroids" in saved:
+            self.quantizer.centroids = saved["centroids"]
+
+    def _save_manifest(self):
+        with open(self.manifest_path, "w") as f:
+            json.dump({
+                "dim": self.dim,
+                "quantization": self.quantization,
+                "projection": self.projection_version,
+            }, f)
+
+    def _save_quantizer(self):
+        params = {}
+        if isinstance(self.quantizer, ScalarQuantizer):
+            params["scale"] = self.quantizer.scale
+        elif isinstance(self.quantizer, ProductQuantizer):
+            params["centroids"] = self.quantizer.centroids
+        if params:
+            np.savez(os.path.join(self.directory, "quantizer.npz"), **params)
+
+    def _make_quantizer(self):
+        if self.quantization == "int8":
+            return ScalarQuantizer()
+        if self.quantization == "pq":
+            return ProductQuantizer()
+        return None
+
+    def _vector_map(self) -> np.memmap:
+        rows = os.path.getsize(self.vectors_path) // (4 * self.dim)
+        if self._map is None or self._map.shape[0] != rows:
+            self._map = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._map
+
+    # ---------- writes ----------
+
+    def upsert(self, vectors: List[Dict]):
+        values = _normalize(np.asarray([v["values"] for v in vectors], dtype=np.float32))
+
+        with open(self.lock_path, "ab") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if self.dim is None:
+                    self.dim = values.shape[1]
+                    self.quantizer = self._make_quantizer()
+                    self._save_manifest()
+                elif values.shape[1] != self.dim:
+                    raise ValueError(f"Vector dimension {values.shape[1]} does not match index dimension {self.dim}")
+
+                with open(self.vectors_path, "ab") as data, open(self.meta_path, "a") as meta:
+                    first_row = data.tell() // (4 * self.dim)
+                    data.write(values.tobytes())
+                    data.flush()
+                    os.fsync(data.fileno())
+                    for offset, vector in enumerate(vectors):
+                        meta.write(json.dumps({
+                            "id": vector["id"],
+                            "row": first_row + offset,
+                            "metadata": vector.get("metadata") or {},
+                        }) + "\n")
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        self.refresh()
+
+    def delete(self, ids: List[str]):
+        with open(self.lock_path, "ab") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(self.meta_path, "a") as meta:
+                    for vector_id in ids:
+                        meta.write(json.dumps({"id": vector_id, "deleted": True}) + "\n")
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self.refresh()
+
+    # ---------- in-memory state ----------
+
+    def refresh(self):
+        """Apply records appended since the last refresh (by any process)"""
+        if os.path.getsize(self.meta_path) <= self._meta_read:
+            return
+        if self.dim is None:
+            self._load_manifest()
+
+        with open(self.meta_path) as meta:
+            meta.seek(self._meta_read)
+            lines = []
+            while True:
+                line = meta.readline()
+                if not line.endswith("\n"):
+                    break  # partial line from a concurrent writer
+                lines.append(json.loads(line))
+                self._meta_read = meta.tell()
+
+        new_rows = []
+        for record in lines:
+            old_row = self.id_to_row.pop(record["id"], None)
+            if old_row is not None:
+                self._unlink(old_row)
+            if record.get("deleted"):
+                continue
+
+            row = record["row"]
+            while len(self.ids) <= row:
+                self.ids.append("")
+                self.metadata.append({})
+            self.ids[row] = record["id"]
+            self.metadata[row] = record["metadata"]
+            self.id_to_row[record["id"]] = row
+            for key in INDEXED_METADATA_KEYS:
+                if key in record["metadata"]:
+                    self.postings[key].setdefault(str(record["metadata"][key]), set()).add(row)
+            new_rows.append(row)
+
+        # Drop rows that were replaced or deleted later in the same batch
+        new_rows = [row for row in new_rows if self.id_to_row.get(self.ids[row]) == row]
+
+        alive = np.zeros(len(self.ids), dtype=bool)
+        alive[:len(self.alive)] = self.alive[:len(self.ids)]
+        alive[new_rows] = True
+        self.alive = alive
+
+        if new_rows:
+            self._encode_rows(np.asarray(new_rows))
+
+    def _unlink(self, row: int):
+        if row < len(self.alive):
+            self.alive[row] = False
+        for key in INDEXED_METADATA_KEYS:
+            value = self.metadata[row].get(key)
+            if value is not None:
+                self.postings[key].get(str(value), set()).discard(row)
+
+    def _encode_rows(self, rows: np.ndarray):
+        vectors = self._vector_map()
+
+        if self.quantizer is not None and not self.quantizer.trained:
+            sample = np.flatnonzero(self.alive)
+            train_size = PQ_TRAIN_SIZE if isinstance(self.quantizer, ProductQuantizer) else SQ_TRAIN_SIZE
+            if len(sample) < train_size:
+                return  # searched exactly until there is enough data to train
+            sample = sample[:train_size * 4]
+            self.quantizer.fit(np.asarray(vectors[sample]))
+            self._save_quantizer()
+            rows = np.flatnonzero(self.alive)
+
+        if self.quantizer is None:
+            width, dtype = self.dim, np.float32
+        else:
+            width = self.quantizer.nbytes_per_vector(self.dim)
+            dtype = np.int8 if isinstance(self.quantizer, ScalarQuantizer) else np.uint8
+
+        if self.codes is None or self.codes.shape[0] < len(self.ids):
+            grown = np.zeros((max(len(self.ids), 1024, 2 * (0 if self.codes is None else len(self.codes))), width), dtype=dtype)
+            if self.codes is not None:
+                grown[:len(self.codes)] = self.codes
+            self.codes = grown
+
+        ordered = np.sort(rows)
+        block = np.asarray(vectors[ordered])
+        self.codes[ordered] = block if self.quantizer is None else self.quantizer.encode(block)
+
+    # ---------- queries ----------
+
+    def candidate_rows(self, filter: Optional[Dict]) -> np.ndarray:
+        rows = None
+        remaining = {}
+        for key, condition in (filter or {}).items():
+            if key not in INDEXED_METADATA_KEYS:
+                remaining[key] = condition
+                continue
+            if isinstance(condition, dict) and "$exists" in condition:
+                present = set().union(*self.postings[key].values())
+                if condition["$exists"]:
+                    matched = present
+                else:
+                    matched = set(np.flatnonzero(self.alive).tolist()) - present
+                rows = matched if rows is None else rows & matched
+                continue
+            if isinstance(condition, dict) and "$in" in condition:
+                values = condition["$in"]
+            elif isinstance(condition, dict) and "$eq" in condition:
+                values = [condition["$eq"]]
+            elif isinstance(condition, dict):
+                remaining[key] = condition
+                continue
+            else:
+                values = [condition]
+            matched = set()
+            for value in values:
+                matched |= self.postings[key].get(str(value), set())
+            rows = matched if rows is None else rows & matched
+
+        if rows is None:
+            candidates = np.flatnonzero(self.alive)
+        else:
+            candidates = np.fromiter(sorted(rows), dtype=np.int64, count=len(rows))
+
+        if remaining:
+            candidates = np.asarray([
+                row for row in candidates if _matches_filter(self.metadata[row], remaining)
+            ], dtype=np.int64)
+        return candidates
+
+    def query(self, vector, top_k: int, filter: Optional[Dict], rerank_factor: int) -> List[tuple]:
+        if self.dim is None:
+            return []
+
+        query = _normalize(np.asarray(vector, dtype=np.float32))
+        rows = self.candidate_rows(filter)
+        if len(rows) == 0:
+            return []
+
+        vectors = self._vector_map()
+        if self.quantizer is None or not self.quantizer.trained:
+            # Exact scoring (float32 codes, or quantizer not trained yet)
+            source = self.codes if self.quantizer is None else vectors
+            scores = np.asarray(source[rows]) @ query
+            shortlist = rows
+        else:
+            approx = self.quantizer.score(self.codes[rows], query)
+            keep = min(len(rows), top_k * rerank_factor)
+            best = np.argpartition(-approx, keep - 1)[:keep]
+            shortlist = np.sort(rows[best])
+            # Exact re-scoring against the full-precision vectors on disk
+            scores = np.asarray(vectors[shortlist]) @ query
+
+        order = np.argsort(-scores)[:top_k]
+        return [(int(shortlist[i]), float(scores[i])) for i in order]
+
+    def memory_bytes(self) -> int:
+        """Bytes of vector data held in RAM (codes only)"""
+        if self.codes is None:
+            return 0
+        return int(self.codes[:len(self.ids)].nbytes)
+
+
+def _matches_filter(metadata: Dict, filter: Dict) -> bool:
+    """Evaluate the $eq/$in/$exists subset of Pinecone metadata filters"""
+    for key, condition in filter.items():
+        value = metadata.get(key)
+        if isinstance(condition, dict):
+            if "$exists" in condition and (key in metadata) != condition["$exists"]:
+                return False
+            if "$eq" in condition and value != condition["$eq"]:
+                return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class LocalVectorIndex:
+    """Pinecone-compatible index stored on local disk"""
+
+    def __init__(
+            self,
+            directory: str = LOCAL_INDEX_DIR,
+            quantization: str = VECTOR_QUANTIZATION,
+            rerank_factor: int = RERANK_FACTOR,
+            projection_version: Optional[str] = None
+    ):
+        if quantization not in ("none", "int8", "pq"):
+            raise ValueError(f"Unknown quantization: {quantization}")
+        self.directory = directory
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        self.projection_version = projection_version
+        self._lock = threading.Lock()
+        self._namespaces: Dict[str, _Namespace] = {}
+
+    def _namespace(self, namespace: Optional[str]) -> _Namespace:
+        name = namespace or "__default__"
+        if name not in self._namespaces:
+            self._namespaces[name] = _Namespace(
+                os.path.join(self.directory, name), self.quantization, self.projection_version
+            )
+        return self._namespaces[name]
+
+    def upsert(self, vectors: List[Dict], namespace: str = None):
+        with self._lock:
+            self._namespace(namespace).upsert(vectors)
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids: List[str], namespace: str = None):
+        with self._lock:
+            self._namespace(namespace).delete(ids)
+        return {}
+
+    def list(self, prefix: str = "", namespace: str = None, limit: int = 100):
+        """IDs starting with prefix, yielded in pages like Pinecone's index.list()"""
+        with self._lock:
+            ns = self._namespace(namespace)
+            ns.refresh()
+            ids = [vector_id for vector_id in ns.id_to_row if vector_id.startswith(prefix)]
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def query(
+            self,
+            vector: List[float],
+            top_k: int = 10,
+            namespace: str = None,
+            filter: Dict = None,
+            include_metadata: bool = False,
+            **kwargs
+    ) -> Dict:
+        with self._lock:
+            ns = self._namespace(namespace)
+            ns.refresh()
+            hits = ns.query(vector, top_k, filter, self.rerank_factor)
+            matches = []
+            for row, score in hits:
+                match = {"id": ns.ids[row], "score": score}
+                if include_metadata:
+                    match["metadata"] = dict(ns.metadata[row])
+                matches.append(match)
+        return {"matches": matches, "namespace": namespace or ""}
+
+    def memory_bytes(self, namespace: str = None) -> int:
+        with self._lock:
+            ns = self._namespace(namespace)
+            ns.refresh()
+            return ns.memory_bytes()
@@ -0,0 +1,189 @@
+"""
+ONNX Runtime backend for the bge embedder (CPU).
+
+The Hugging Face model is exported to ONNX once (optionally with dynamic int8
+weight quantization) and then served by onnxruntime with tuned threading.
+Output matches the sentence-transformers pipeline: CLS pooling + L2 norm.
+
+Select it with EMBEDDING_BACKEND=onnx. The export happens on first use, or
+ahead of time (e.g. at image build, so serving nodes need no torch) with:
+    python -m backend.vectorstore.onnx_embeddings
+The CLI quantizes per ONNX_QUANTIZE like the runtime does, so it writes the
+file the app will load; --quantize / --no-quantize override it.
+"""
+import argparse
+import fcntl
+import os
+from typing import List
+
+import numpy as np
+from decouple import config
+from langchain_core.embeddings import Embeddings
+
+ONNX_MODEL_DIR = config("ONNX_MODEL_DIR", default="onnx_models")
+ONNX_QUANTIZE = config("ONNX_QUANTIZE", default=True, cast=bool)
+ONNX_INTRA_OP_THREADS = config("ONNX_INTRA_OP_THREADS", default=0, cast=int)
+ONNX_BATCH_SIZE = config("ONNX_BATCH_SIZE", default=16, cast=int)
+ONNX_MAX_LENGTH = config("ONNX_MAX_LENGTH", default=512, cast=int)
+
+
+def model_directory(model_name: str, base_dir: str = ONNX_MODEL_DIR) -> str:
+    return os.path.join(base_dir, model_name.replace("/", "__"))
+
+
+def export_model(model_name: str, output_dir: str, quantize: bool = ONNX_QUANTIZE) -> str:
+    """Export the transformer to ONNX (+ int8 copy); returns the model path to load"""
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    int8_path = os.path.join(output_dir, "model.int8.onnx")
+    target = int8_path if quantize else fp32_path
+
+    os.makedirs(output_dir, exist_ok=True)
+    # Several uvicorn workers may start at once; only one should export
+    with open(os.path.join(output_dir, "export.lock"), "ab") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if os.path.exists(target):
+                return target
+
+            if not os.path.exists(fp32_path):
+                try:
+                    import torch
+                    from transformers import AutoModel, AutoTokenizer
+                except ImportError as e:
+                    flag = "--quantize" if quantize else "--no-quantize"
+                    raise FileNotFoundError(
+                        f"ONNX model {target} not found, and exporting it needs torch and "
+                        f"transformers ({e}). Export it ahead of time with "
+                        f"`python -m backend.vectorstore.onnx_embeddings {flag}` "
+                        f"(ONNX_QUANTIZE={quantize})"
+                    ) from e
+
+                print(f"🔧 Exporting {model_name} to ONNX...")
+                tokenizer = AutoTokenizer.from_pretrained(model_name)
+                model = AutoModel.from_pretrained(model_name).eval()
+                sample = tokenizer(["export sample"], return_tensors="pt")
+
+                with torch.no_grad():
+                    torch.onnx.export(
+                        model,
+                        (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+                        fp32_path,
+                        input_names=["input_ids", "attention_mask", "token_type_ids"],
+                        output_names=["last_hidden_state"],
+                        dynamic_axes={
+                            "input_ids": {0: "batch", 1: "sequence"},
+                            "attention_mask": {0: "batch", 1: "sequence"},
+                            "token_type_ids": {0: "batch", 1: "sequence"},
+                            "last_hidden_state": {0: "batch", 1: "sequence"},
+                        },
+                        opset_version=17,
+                    )
+                tokenizer.save_pretrained(output_dir)
+
+            if quantize:
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+
+                print("🔧 Quantizing ONNX model weights to int8...")
+                quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+            if not os.path.exists(target):
+                raise FileNotFoundError(f"ONNX export finished but {target} was not written")
+            print(f"✅ ONNX model ready at {target}")
+            return target
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class OnnxEmbeddings(Embeddings):
+    """LangChain embeddings served by onnxruntime"""
+
+    def __init__(
+            self,
+            model_name: str,
+            model_dir: str = None,
+            quantize: bool = ONNX_QUANTIZE,
+            intra_op_threads: int = ONNX_INTRA_OP_THREADS,
+            batch_size: int = ONNX_BATCH_SIZE,
+            max_length: int = ONNX_MAX_LENGTH
+    ):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_dir = model_dir or model_directory(model_name)
+        model_path = export_model(model_name, model_dir, quantize)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        # One pool of intra-op threads sized to the cores we own; inter-op
+        # parallelism just oversubscribes a CPU-only node
+        options.intra_op_num_threads = intra_op_threads or os.cpu_count() or 1
+        options.inter_op_num_threads = 1
+
+        self.session = onnxruntime.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        tokenizer_path = os.path.join(model_dir, "tokenizer.json")
+        if not os.path.exists(tokenizer_path):
+            raise FileNotFoundError(
+                f"{tokenizer_path} not found; re-export {model_name} with "
+                f"`python -m backend.vectorstore.onnx_embeddings`"
+            )
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+        self.batch_size = batch_size
+
+    def _run(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.asarray([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.asarray([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.asarray([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        feeds = {name: value for name, value in feeds.items() if name in self.input_names}
+        hidden = self.session.run(None, feeds)[0]
+
+        # bge uses the [CLS] token embedding, L2-normalized
+        cls = hidden[:, 0]
+        return cls / np.linalg.norm(cls, axis=1, keepdims=True)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        # Batch texts of similar length together to minimise padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        output = np.empty((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            ids = order[start:start + self.batch_size]
+            vectors = self._run([texts[i] for i in ids])
+            if output.shape[1] == 0:
+                output = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            output[ids] = vectors
+        return output.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._run([text])[0].tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Batched embed_query (queries are encoded like documents here)"""
+        return self.embed_documents(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model to ONNX")
+    parser.add_argument("--model", default=config("EMBEDDING_MODEL", default="BAAI/bge-large-en-v1.5"))
+    parser.add_argument("--output-dir")
+    parser.add_argument(
+        "--quantize", action=argparse.BooleanOptionalAction, default=ONNX_QUANTIZE,
+        help=f"also write the int8 model the runtime loads (default from ONNX_QUANTIZE: {ONNX_QUANTIZE})"
+    )
+    args = parser.parse_args()
+
+    export_model(args.model, args.output_dir or model_directory(args.model), args.quantize)
+
+
+if __name__ == "__main__":
+    main()
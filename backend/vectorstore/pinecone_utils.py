@@ -1,34 +1,129 @@
 # backend/vectorstore/pinecone_utils.py
-from langchain_pinecone import PineconeVectorStore
-from langchain_huggingface import HuggingFaceEmbeddings
-from pinecone import Pinecone
+from backend.vectorstore.backends import VECTOR_BACKEND, create_embeddings, create_index
+from backend.vectorstore.upsert_engine import UpsertEngine
+from backend.vectorstore.chunk_store import get_chunk_store, hydrate_matches
+from backend.vectorstore.document_vectors import (
+    DocumentCentroids, document_namespace, query_two_stage
+)
+from backend.utils.metrics import CHUNKS_INDEXED, CHUNKS_RETRIEVED, EMBED_SECONDS
+from typing import Dict, List
 import os
+import threading
+import uuid
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Initialize Pinecone
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+# The embedding model and index clients are created on first use (or by the
+# startup warm-up), so importing this module stays fast and works offline
+_vectorstore = None
+_vectorstore_lock = threading.Lock()
 
-# Initialize embeddings (same model as upload)
-embeddings = HuggingFaceEmbeddings(model_name="BAAI/bge-large-en-v1.5")
 
-# Connect to existing index
-vectorstore = PineconeVectorStore(
-    index_name="my-genai-index",
-    embedding=embeddings
-)
+def get_embeddings():
+    """Embeddings (same model as upload, projected if configured)"""
+    return create_embeddings()
+
+
+def get_index():
+    """Vector index (Pinecone, or the local quantized index)"""
+    return create_index()
+
+
+def get_vectorstore():
+    """LangChain PineconeVectorStore over the same index (Pinecone backend only)"""
+    global _vectorstore
+
+    if VECTOR_BACKEND != "pinecone":
+        return None
+    with _vectorstore_lock:
+        if _vectorstore is None:
+            from langchain_pinecone import PineconeVectorStore
+            _vectorstore = PineconeVectorStore(index=get_index(), embedding=get_embeddings())
+        return _vectorstore
+
+
+def __getattr__(name):
+    # Keep `from pinecone_utils import vectorstore` etc. working, lazily
+    if name == "embeddings":
+        return get_embeddings()
+    if name == "index":
+        return get_index()
+    if name == "vectorstore":
+        return get_vectorstore()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+
+
+def add_documents(documents: List, namespace: str = None) -> List[str]:
+    """
+    Embed LangChain documents and upsert them through the pipelined engine.
+    Chunk text is written to the local chunk store; vectors carry only
+    metadata used for filtering. Documents with a document_id also get a
+    centroid vector for two-stage retrieval.
+    """
+    embeddings = get_embeddings()
+    index = get_index()
+    ids = []
+    centroids = DocumentCentroids()
+    with UpsertEngine(index, namespace=namespace) as engine:
+        for start in range(0, len(documents), EMBED_BATCH_SIZE):
+            batch = documents[start:start + EMBED_BATCH_SIZE]
+            with EMBED_SECONDS.labels(op="documents").time():
+                vectors = embeddings.embed_documents([doc.page_content for doc in batch])
+            batch_ids = [str(uuid.uuid4()) for _ in batch]
+
+            # Store text before the vectors become searchable
+            get_chunk_store().put_many({
+                vector_id: doc.page_content for vector_id, doc in zip(batch_ids, batch)
+            })
+
+            for vector_id, doc, values in zip(batch_ids, batch, vectors):
+                engine.add({"id": vector_id, "values": values, "metadata": dict(doc.metadata)})
+                ids.append(vector_id)
+
+                if doc.metadata.get("document_id"):
+                    centroids.add(doc.metadata["document_id"], values, {
+                        key: doc.metadata[key]
+                        for key in ("user_id", "filename", "uploaded_by")
+                        if key in doc.metadata
+                    })
+
+    # Document vectors go in last, once all their chunks are searchable
+    with UpsertEngine(index, namespace=document_namespace(namespace)) as engine:
+        engine.add_many(centroids.vectors())
+
+    CHUNKS_INDEXED.inc(len(ids))
+    return ids
+
+
+def search_chunks(query: str, k: int = 3, filter: Dict = None, namespace: str = None) -> List[Dict]:
+    """
+    Query Pinecone for the top-k chunks and attach their text
+    from the chunk store in one batched read.
+    Searches only chunks of the best-matching documents when
+    two-stage retrieval is enabled.
+    """
+    with EMBED_SECONDS.labels(op="query").time():
+        query_embedding = get_embeddings().embed_query(query)
+    matches = query_two_stage(get_index(), query_embedding, k, filter=filter, namespace=namespace)
+    chunks = hydrate_matches(matches)
+    CHUNKS_RETRIEVED.inc(len(chunks))
+    return chunks
+
 
 def get_relevant_context(query: str, top_k: int = 3):
     """
     Query Pinecone for relevant document chunks
     """
-    results = vectorstore.similarity_search(query, k=top_k)
+    results = search_chunks(query, k=top_k)
     
     context_parts = []
-    for doc in results:
-        source = doc.metadata.get('filename', 'Unknown Source')
-        context_parts.append(f"Source: {source}\nContent: {doc.page_content}")
+    for chunk in results:
+        source = chunk["metadata"].get('filename', 'Unknown Source')
+        context_parts.append(f"Source: {source}\nContent: {chunk['text']}")
     
     context = "\n\n---\n\n".join(context_parts)
     return context
@@ -0,0 +1,138 @@
+"""
+Optional dimensionality reduction for embeddings.
+
+A projection is fit offline from a sample of chunks and applied at both ingest
+and query time, so bge-large's 1024 dims become e.g. 256 or 384:
+    pca      - center + top principal components
+    truncate - keep the first N dims (Matryoshka-style; only sensible for
+               models trained that way, bge-large is not)
+Projected vectors are re-normalized so cosine / dot-product scores still work.
+
+The projection is identified by a content hash (``version``); indexes record
+the version they were built with and refuse vectors from a different one.
+
+Fit from the chunk store or local documents:
+    python -m backend.vectorstore.projection --dim 256 --output projection.npz
+    python -m backend.vectorstore.projection data/docs --dim 384 --output projection.npz
+"""
+import argparse
+import hashlib
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class Projection:
+    """Linear map from the embedding model's space to a smaller one"""
+
+    def __init__(self, matrix: np.ndarray, mean: Optional[np.ndarray] = None, method: str = "pca"):
+        self.matrix = matrix.astype(np.float32)  # (in_dim, out_dim)
+        self.mean = None if mean is None else mean.astype(np.float32)
+        self.method = method
+
+    @property
+    def in_dim(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def out_dim(self) -> int:
+        return self.matrix.shape[1]
+
+    @property
+    def version(self) -> str:
+        digest = hashlib.sha256(self.method.encode("utf-8"))
+        digest.update(self.matrix.tobytes())
+        if self.mean is not None:
+            digest.update(self.mean.tobytes())
+        return f"{self.method}{self.out_dim}-{digest.hexdigest()[:12]}"
+
+    @classmethod
+    def fit_pca(cls, vectors: np.ndarray, dim: int) -> "Projection":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if dim >= vectors.shape[1]:
+            raise ValueError(f"target dimension {dim} must be below {vectors.shape[1]}")
+        if len(vectors) < dim:
+            raise ValueError(f"need at least {dim} sample vectors to fit {dim} components")
+        mean = vectors.mean(axis=0)
+        # Right singular vectors of the centered sample are the principal axes
+        _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+        return cls(vt[:dim].T, mean, method="pca")
+
+    @classmethod
+    def truncate(cls, in_dim: int, dim: int) -> "Projection":
+        return cls(np.eye(in_dim, dim, dtype=np.float32), method="truncate")
+
+    def transform(self, vectors) -> np.ndarray:
+        x = np.asarray(vectors, dtype=np.float32)
+        if self.mean is not None:
+            x = x - self.mean
+        y = x @ self.matrix
+        norms = np.linalg.norm(y, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return y / norms
+
+    def save(self, path: str):
+        params = {"matrix": self.matrix, "method": np.array(self.method)}
+        if self.mean is not None:
+            params["mean"] = self.mean
+        with open(path, "wb") as f:
+            np.savez(f, **params)
+
+    @classmethod
+    def load(cls, path: str) -> "Projection":
+        saved = np.load(path)
+        mean = saved["mean"] if "mean" in saved else None
+        return cls(saved["matrix"], mean, method=str(saved["method"]))
+
+
+class ProjectedEmbeddings(Embeddings):
+    """Wrap a LangChain embeddings object and project its output"""
+
+    def __init__(self, base, projection: Projection):
+        self.base = base
+        self.projection = projection
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self.projection.transform(self.base.embed_documents(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.projection.transform(self.base.embed_query(text)).tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit an embedding projection")
+    parser.add_argument("paths", nargs="*", help="documents to sample (default: the chunk store)")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--method", choices=["pca", "truncate"], default="pca")
+    parser.add_argument("--sample", type=int, default=5000, help="max chunks to embed for fitting")
+    parser.add_argument("--output", default="projection.npz")
+    args = parser.parse_args()
+
+    from backend.vectorstore.backends import create_base_embeddings
+
+    embeddings = create_base_embeddings()
+
+    if args.method == "truncate":
+        dim = len(embeddings.embed_query("dimension probe"))
+        projection = Projection.truncate(dim, args.dim)
+    else:
+        if args.paths:
+            from backend.benchmarks.corpus import load_chunks
+            texts = [chunk["text"] for chunk in load_chunks(args.paths)][:args.sample]
+        else:
+            from backend.vectorstore.chunk_store import get_chunk_store
+            texts = get_chunk_store().sample(args.sample)
+
+        print(f"🔧 Embedding {len(texts)} sample chunks...")
+        projection = Projection.fit_pca(embeddings.embed_documents(texts), args.dim)
+
+    projection.save(args.output)
+    print(f"✅ Saved projection {projection.version} to {args.output}")
+    print(f"   Set EMBEDDING_PROJECTION_PATH={args.output} and re-index documents")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Pipelined vector upserts.
+
+Vectors are grouped into batches sized by their serialized payload, and up to
+``max_in_flight`` batches are sent concurrently. When every slot is busy,
+``add()`` blocks, which throttles the embedding stage that feeds it.
+"""
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from decouple import config
+
+# Pinecone rejects upsert requests above 2MB / 1000 vectors; stay under both
+UPSERT_MAX_IN_FLIGHT = config("UPSERT_MAX_IN_FLIGHT", default=4, cast=int)
+UPSERT_MAX_BATCH_BYTES = config("UPSERT_MAX_BATCH_BYTES", default=1_800_000, cast=int)
+UPSERT_MAX_BATCH_VECTORS = config("UPSERT_MAX_BATCH_VECTORS", default=1000, cast=int)
+UPSERT_MAX_RETRIES = config("UPSERT_MAX_RETRIES", default=5, cast=int)
+UPSERT_BACKOFF_BASE = config("UPSERT_BACKOFF_BASE", default=0.5, cast=float)
+UPSERT_BACKOFF_MAX = config("UPSERT_BACKOFF_MAX", default=8.0, cast=float)
+
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class UpsertError(Exception):
+    """Raised when batches could not be upserted after all retries"""
+
+    def __init__(self, message: str, failed_ids: List[str] = None):
+        super().__init__(message)
+        # IDs of every vector in the failed batches; the others were upserted
+        self.failed_ids = failed_ids or []
+
+
+def is_transient_error(exc: Exception) -> bool:
+    """Decide whether a failed upsert is worth retrying"""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+
+    status = getattr(exc, "status", None) or getattr(exc, "status_code", None)
+    if status is not None:
+        try:
+            return int(status) in TRANSIENT_STATUS_CODES
+        except (TypeError, ValueError):
+            return False
+
+    # urllib3 / httpx / grpc errors that don't carry a status code
+    name = type(exc).__name__.lower()
+    return any(word in name for word in ("timeout", "connection", "protocol", "unavailable"))
+
+
+def estimate_vector_bytes(vector: Dict) -> int:
+    """Approximate request payload size of one vector"""
+    values = vector.get("values") or []
+    # ~20 bytes per JSON-encoded float plus separators
+    size = 20 * len(values) + len(vector["id"]) + 32
+    if vector.get("metadata"):
+        size += len(json.dumps(vector["metadata"], separators=(",", ":"), default=str))
+    return size
+
+
+class UpsertEngine:
+    """Upsert vectors with a bounded number of concurrent batches"""
+
+    def __init__(
+            self,
+            index,
+            namespace: Optional[str] = None,
+            max_in_flight: int = UPSERT_MAX_IN_FLIGHT,
+            max_batch_bytes: int = UPSERT_MAX_BATCH_BYTES,
+            max_batch_vectors: int = UPSERT_MAX_BATCH_VECTORS,
+            max_retries: int = UPSERT_MAX_RETRIES,
+            backoff_base: float = UPSERT_BACKOFF_BASE,
+            backoff_max: float = UPSERT_BACKOFF_MAX
+    ):
+        self.index = index
+        self.namespace = namespace
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_vectors = max_batch_vectors
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight,
+            thread_name_prefix="upsert"
+        )
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._futures = []
+        self._failed_ids: List[str] = []
+        self._lock = threading.Lock()
+
+        self._batch: List[Dict] = []
+        self._batch_bytes = 0
+
+        self.stats = {
+            "vectors": 0,
+            "batches": 0,
+            "bytes": 0,
+            "retries": 0,
+            "failed_batches": 0,
+            "blocked_seconds": 0.0,
+        }
+
+    # ---------- producer side ----------
+
+    def add(self, vector: Dict):
+        """Queue one vector; blocks while all batch slots are in flight"""
+        size = estimate_vector_bytes(vector)
+
+        if self._batch and (
+                self._batch_bytes + size > self.max_batch_bytes
+                or len(self._batch) >= self.max_batch_vectors
+        ):
+            self._dispatch()
+
+        self._batch.append(vector)
+        self._batch_bytes += size
+
+    def add_many(self, vectors: List[Dict]):
+        """Queue several vectors"""
+        for vector in vectors:
+            self.add(vector)
+
+    def flush(self) -> Dict:
+        """Send the pending batch, wait for all batches and raise on failure"""
+        if self._batch:
+            self._dispatch()
+
+        with self._lock:
+            futures, self._futures = self._futures, []
+
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        with self._lock:
+            failed_ids, self._failed_ids = self._failed_ids, []
+        if errors:
+            raise UpsertError(
+                f"{len(errors)} of {len(futures)} upsert batches failed "
+                f"({len(failed_ids)} vectors): {errors[0]}",
+                failed_ids=failed_ids
+            ) from errors[0]
+
+        return dict(self.stats)
+
+    def close(self):
+        """Release worker threads (does not flush)"""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self.close()
+
+    # ---------- consumer side ----------
+
+    def _dispatch(self):
+        batch, size = self._batch, self._batch_bytes
+        self._batch, self._batch_bytes = [], 0
+
+        # Backpressure: wait here until a slot frees up
+        started = time.perf_counter()
+        self._slots.acquire()
+        self.stats["blocked_seconds"] += time.perf_counter() - started
+
+        try:
+            future = self._executor.submit(self._send, batch, size)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._futures.append(future)
+
+    def _send(self, batch: List[Dict], size: int):
+        try:
+            attempt = 0
+            while True:
+                try:
+                    if self.namespace is None:
+                        self.index.upsert(vectors=batch)
+                    else:
+                        self.index.upsert(vectors=batch, namespace=self.namespace)
+                    break
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_transient_error(e):
+                        with self._lock:
+                            self.stats["failed_batches"] += 1
+                            self._failed_ids.extend(vector["id"] for vector in batch)
+                        raise
+                    attempt += 1
+                    with self._lock:
+                        self.stats["retries"] += 1
+                    # Exponential backoff with full jitter
+                    delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+                    time.sleep(random.uniform(0, delay))
+
+            with self._lock:
+                self.stats["vectors"] += len(batch)
+                self.stats["batches"] += 1
+                self.stats["bytes"] += size
+        finally:
+            self._slots.release()
@@ -0,0 +1,55 @@
+"""
+Shared fixtures. The app reads its settings at import time, so the test
+environment (a throwaway SQLite database and archive directory) is set up
+here, before any backend module is imported.
+"""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+WORKDIR = tempfile.mkdtemp(prefix="chatbot-tests-")
+
+for name, value in {
+    "SECRET_KEY": "test-secret",
+    "GOOGLE_CLIENT_ID": "test",
+    "GOOGLE_CLIENT_SECRET": "test",
+    "GOOGLE_REDIRECT_URI": "http://localhost/callback",
+    "EMAIL_HOST": "localhost",
+    "EMAIL_PORT": "25",
+    "EMAIL_HOST_USER": "test",
+    "EMAIL_HOST_PASSWORD": "test",
+    "DEFAULT_FROM_EMAIL": "test@example.com",
+    "WARMUP_ON_STARTUP": "False",
+    "ANALYTICS_ROLLUP_ON_STARTUP": "False",
+    "DATABASE_URL": f"sqlite:///{os.path.join(WORKDIR, 'test.db')}",
+    "ARCHIVE_DIR": os.path.join(WORKDIR, "chat_archive"),
+}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture(scope="session")
+def database():
+    from backend.database.connection import init_db
+
+    init_db()
+    yield
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+@pytest.fixture
+def db(database):
+    """A sync session on an empty, fully migrated database"""
+    from backend.database import archive
+    from backend.database.connection import SessionLocal
+    from backend.database.models import Base
+
+    session = SessionLocal()
+    yield session
+    session.rollback()
+    for table in reversed(Base.metadata.sorted_tables):
+        session.execute(table.delete())
+    session.commit()
+    session.close()
+    shutil.rmtree(archive.ARCHIVE_DIR, ignore_errors=True)
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import pytest
+
+from backend.vectorstore import backends
+
+PROJECTION = SimpleNamespace(version="pca-256-abc", out_dim=4)
+
+
+class PineconeLike:
+    """describe_index_stats/fetch/upsert with Pinecone's dict-shaped responses"""
+
+    def __init__(self, dimension=4, vectors=0):
+        self.dimension = dimension
+        self.vectors = vectors
+        self.namespaces = {}
+
+    def describe_index_stats(self):
+        return {"dimension": self.dimension, "total_vector_count": self.vectors}
+
+    def fetch(self, ids, namespace=""):
+        store = self.namespaces.get(namespace, {})
+        return {"vectors": {i: store[i] for i in ids if i in store}}
+
+    def upsert(self, vectors, namespace=""):
+        store = self.namespaces.setdefault(namespace, {})
+        for vector in vectors:
+            store[vector["id"]] = vector
+        self.vectors += len(vectors)
+
+
+def marker(index):
+    return index.namespaces[backends.PROJECTION_NAMESPACE][backends.PROJECTION_MARKER_ID]
+
+
+def test_marker_written_on_empty_index_and_checked():
+    index = PineconeLike()
+    backends._check_pinecone_projection(index, PROJECTION)
+    assert marker(index)["metadata"] == {"projection": PROJECTION.version}
+
+    backends._check_pinecone_projection(index, PROJECTION)
+    with pytest.raises(ValueError, match="built with embedding projection pca-256-abc"):
+        backends._check_pinecone_projection(index, None)
+    with pytest.raises(ValueError, match="but pca-256-def is configured"):
+        backends._check_pinecone_projection(index, SimpleNamespace(version="pca-256-def", out_dim=4))
+
+
+def test_existing_unprojected_index_marked_none():
+    index = PineconeLike(vectors=10)
+    backends._check_pinecone_projection(index, None)
+    assert marker(index)["metadata"] == {"projection": ""}
+    with pytest.raises(ValueError, match="built with embedding projection none"):
+        backends._check_pinecone_projection(index, PROJECTION)
+
+
+def test_projection_refused_on_unmarked_index_with_vectors():
+    with pytest.raises(ValueError, match="no projection marker"):
+        backends._check_pinecone_projection(PineconeLike(vectors=10), PROJECTION)
+
+
+def test_dimension_mismatch_refused():
+    with pytest.raises(ValueError, match="has dimension 8"):
+        backends._check_pinecone_projection(PineconeLike(dimension=8), PROJECTION)
@@ -0,0 +1,172 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, func, text, insert
+
+from backend.database import archive, bulk_delete
+from backend.database.models import User, Conversation, ChatHistory, AdminAction, ArchiveSegment
+
+OLD = datetime.utcnow() - timedelta(days=365)
+
+
+def add_user(db, name, **values):
+    user = User(email=f"{name}@example.com", username=name, **values)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def add_conversation(db, user, conversation_id, messages, timestamp=None):
+    """A conversation with messages whose question contains a searchable word"""
+    db.add(Conversation(id=conversation_id, user_id=user.id))
+    db.commit()
+    timestamp = timestamp or datetime.utcnow()
+    if messages:
+        db.execute(insert(ChatHistory), [
+            {
+                "user_id": user.id,
+                "conversation_id": conversation_id,
+                "question": f"needle {conversation_id} {i}",
+                "answer": "answer",
+                "timestamp": timestamp + timedelta(seconds=i),
+            }
+            for i in range(messages)
+        ])
+        db.commit()
+
+
+def count(db, model, *criteria):
+    return db.scalar(select(func.count()).select_from(model).where(*criteria))
+
+
+def fts_matches(db, term):
+    """Rowids the chat_history full-text index still returns for term"""
+    return db.scalars(
+        text("SELECT rowid FROM chat_history_fts WHERE chat_history_fts MATCH :term"), {"term": term}
+    ).all()
+
+
+def segment_files(user_id):
+    directory = os.path.join(archive.ARCHIVE_DIR, str(user_id))
+    return os.listdir(directory) if os.path.isdir(directory) else []
+
+
+@pytest.mark.parametrize("rows, chunk_size", [(0, 3), (3, 3), (4, 3), (7, 3)])
+def test_delete_in_chunks_boundaries(db, rows, chunk_size):
+    alice, bob = add_user(db, "alice"), add_user(db, "bob")
+    add_conversation(db, alice, "a1", rows)
+    add_conversation(db, bob, "b1", 2)
+
+    deleted = bulk_delete.delete_in_chunks(
+        db, ChatHistory, ChatHistory.user_id == alice.id, chunk_size=chunk_size
+    )
+
+    assert deleted == rows
+    assert count(db, ChatHistory, ChatHistory.user_id == alice.id) == 0
+    assert count(db, ChatHistory, ChatHistory.user_id == bob.id) == 2
+
+
+def test_delete_in_chunks_passes_each_chunk_to_before_delete(db):
+    alice = add_user(db, "alice")
+    add_conversation(db, alice, "a1", 7)
+    chunks = []
+
+    bulk_delete.delete_in_chunks(
+        db, ChatHistory, ChatHistory.user_id == alice.id, chunk_size=3,
+        before_delete=lambda session, ids: chunks.append(len(ids))
+    )
+
+    assert chunks == [3, 3, 1]
+
+
+def test_delete_conversation(db):
+    alice = add_user(db, "alice")
+    add_conversation(db, alice, "old", 5, timestamp=OLD)
+    add_conversation(db, alice, "keep", 2)
+    archive.run_archive(db, cutoff=datetime.utcnow() - timedelta(days=30))
+    db.execute(insert(ChatHistory).values(
+        user_id=alice.id, conversation_id="old", question="needle old new", answer="answer",
+        timestamp=datetime.utcnow()
+    ))
+    db.commit()
+    assert count(db, ArchiveSegment) == 1 and segment_files(alice.id)
+
+    assert bulk_delete.delete_conversation(db, alice.id, "old") == 6
+
+    assert db.get(Conversation, "old") is None
+    assert count(db, ChatHistory, ChatHistory.conversation_id == "old") == 0
+    assert count(db, ArchiveSegment) == 0
+    assert segment_files(alice.id) == []
+    assert fts_matches(db, "old") == []
+    assert len(fts_matches(db, "keep")) == 2
+
+
+def test_clear_history_keeps_conversations(db):
+    alice, bob = add_user(db, "alice"), add_user(db, "bob")
+    add_conversation(db, alice, "a1", 4, timestamp=OLD)
+    add_conversation(db, alice, "a2", 3)
+    add_conversation(db, bob, "b1", 2)
+    archive.run_archive(db, cutoff=datetime.utcnow() - timedelta(days=30))
+
+    assert bulk_delete.clear_history(db, alice.id) == 7
+
+    assert count(db, Conversation, Conversation.user_id == alice.id) == 2
+    assert count(db, ChatHistory, ChatHistory.user_id == alice.id) == 0
+    assert count(db, ArchiveSegment, ArchiveSegment.user_id == alice.id) == 0
+    assert segment_files(alice.id) == []
+    assert fts_matches(db, "a1") == [] and fts_matches(db, "a2") == []
+    assert len(fts_matches(db, "b1")) == 2
+
+
+def test_purge_user(db):
+    admin = add_user(db, "admin", is_admin=True)
+    alice = add_user(db, "alice")
+    blocked = add_user(db, "blocked", is_blocked=True, blocked_by=alice.id)
+    add_conversation(db, alice, "a1", 3, timestamp=OLD)
+    add_conversation(db, alice, "a2", 2)
+    add_conversation(db, blocked, "c1", 1)
+    archive.run_archive(db, cutoff=datetime.utcnow() - timedelta(days=30))
+    db.add(AdminAction(admin_id=admin.id, action_type="BLOCK_USER", target_user_id=alice.id))
+    db.commit()
+    alice_id, blocked_id = alice.id, blocked.id
+    db.expunge_all()
+
+    assert bulk_delete.purge_user(db, alice_id) == {"messages": 5, "conversations": 2}
+
+    assert db.get(User, alice_id) is None
+    assert count(db, Conversation, Conversation.user_id == alice_id) == 0
+    assert count(db, ChatHistory, ChatHistory.user_id == alice_id) == 0
+    assert count(db, ArchiveSegment, ArchiveSegment.user_id == alice_id) == 0
+    assert segment_files(alice_id) == []
+    assert fts_matches(db, "a1") == [] and fts_matches(db, "a2") == []
+    # Audit rows and block markers survive with the reference cleared
+    assert db.scalar(select(AdminAction.target_user_id)) is None
+    assert db.get(User, blocked_id).blocked_by is None
+    assert count(db, ChatHistory, ChatHistory.user_id == blocked_id) == 1
+
+
+def test_sqlite_has_no_cascade(db):
+    """Migration 0006 skips SQLite: a bare parent delete leaves the children"""
+    alice = add_user(db, "alice")
+    add_conversation(db, alice, "a1", 2)
+    alice_id = alice.id
+    db.expunge_all()
+
+    db.execute(text("DELETE FROM users WHERE id = :id"), {"id": alice_id})
+    db.commit()
+
+    assert count(db, Conversation, Conversation.user_id == alice_id) == 1
+    assert count(db, ChatHistory, ChatHistory.user_id == alice_id) == 2
+
+
+def test_purge_user_removes_children_without_cascade(db):
+    alice = add_user(db, "alice")
+    add_conversation(db, alice, "a1", 2)
+    alice_id = alice.id
+    db.expunge_all()
+
+    bulk_delete.purge_user(db, alice_id)
+
+    assert count(db, Conversation) == 0
+    assert count(db, ChatHistory) == 0
@@ -0,0 +1,62 @@
+from backend.vectorstore import chunk_store as chunk_store_module
+from backend.vectorstore.chunk_store import ChunkStore
+from backend.vectorstore.document_indexer import DocumentIndexer
+from backend.vectorstore.document_vectors import document_namespace
+from backend.vectorstore.local_index import LocalVectorIndex
+
+
+class StubEmbeddings:
+    def embed_documents(self, texts):
+        return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+
+def make_indexer(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunk_store_module, "_chunk_store", ChunkStore(str(tmp_path / "chunks")))
+    indexer = DocumentIndexer.__new__(DocumentIndexer)
+    indexer.index = LocalVectorIndex(directory=str(tmp_path / "index"), quantization="none")
+    indexer.embeddings = StubEmbeddings()
+    return indexer
+
+
+def chunks(count):
+    return [
+        {"text": f"chunk text {i}", "chunk_index": i, "total_chunks": count, "file_name": "a.txt"}
+        for i in range(count)
+    ]
+
+
+def all_ids(index, namespace):
+    return [vector_id for page in index.list(namespace=namespace) for vector_id in page]
+
+
+def test_delete_document_removes_chunks_vector_and_text(tmp_path, monkeypatch):
+    indexer = make_indexer(tmp_path, monkeypatch)
+    indexer.index_document_chunks(chunks(5), user_id=1, document_id="doc-a")
+    indexer.index_document_chunks(chunks(2), user_id=1, document_id="doc-b")
+
+    assert indexer.delete_document("doc-a", user_id=1) == 5
+
+    assert sorted(all_ids(indexer.index, "user_1")) == ["doc-b_chunk_0", "doc-b_chunk_1"]
+    assert all_ids(indexer.index, document_namespace("user_1")) == ["doc-b"]
+    store = chunk_store_module.get_chunk_store()
+    assert store.get("doc-a_chunk_0") is None
+    assert store.get("doc-b_chunk_0") == "chunk text 0"
+
+
+def test_delete_unknown_document(tmp_path, monkeypatch):
+    indexer = make_indexer(tmp_path, monkeypatch)
+    assert indexer.delete_document("missing", user_id=1) == 0
+
+
+def test_chunk_store_is_created_on_first_use(tmp_path, monkeypatch):
+    directory = tmp_path / "lazy"
+    monkeypatch.setattr(chunk_store_module, "_chunk_store", None)
+    monkeypatch.setattr(chunk_store_module, "ChunkStore", lambda: ChunkStore(str(directory)))
+    assert not directory.exists()
+
+    store = chunk_store_module.get_chunk_store()
+
+    assert directory.exists()
+    assert chunk_store_module.get_chunk_store() is store
+    assert chunk_store_module.chunk_store is store
+    assert chunk_store_module.os.path.isabs(chunk_store_module.CHUNK_STORE_DIR)
@@ -0,0 +1,65 @@
+import threading
+
+import numpy as np
+
+from backend.vectorstore import document_vectors
+from backend.vectorstore.local_index import LocalVectorIndex
+
+
+def build_index(directory):
+    rng = np.random.default_rng(0)
+    query = rng.normal(size=16)
+    chunks = [
+        {"id": f"d{i}_c{j}", "values": list(rng.normal(size=16)), "metadata": {"document_id": f"d{i}", "user_id": 1}}
+        for i in range(5)
+        for j in range(3)
+    ]
+    # Indexed before document vectors existed: no document_id, no centroid
+    legacy = {"id": "legacy", "values": list(query), "metadata": {"user_id": 1}}
+
+    index = LocalVectorIndex(directory=str(directory), quantization="none")
+    index.upsert(vectors=chunks + [legacy])
+    centroids = document_vectors.DocumentCentroids()
+    for chunk in chunks:
+        centroids.add(chunk["metadata"]["document_id"], chunk["values"], {"user_id": 1})
+    index.upsert(vectors=centroids.vectors(), namespace=document_vectors.document_namespace())
+    return index, list(query)
+
+
+def test_two_stage_includes_chunks_without_document_id(tmp_path):
+    index, query = build_index(tmp_path)
+
+    matches = document_vectors.query_two_stage(index, query, 4, filter={"user_id": 1}, top_documents=2)
+
+    ids = [match["id"] for match in matches]
+    assert ids[0] == "legacy"
+    assert len(ids) == 4
+
+
+def test_two_stage_legacy_search_can_be_disabled(tmp_path, monkeypatch):
+    monkeypatch.setattr(document_vectors, "TWO_STAGE_LEGACY_CHUNKS", False)
+    index, query = build_index(tmp_path)
+
+    matches = document_vectors.query_two_stage(index, query, 4, filter={"user_id": 1}, top_documents=2)
+
+    assert "legacy" not in [match["id"] for match in matches]
+
+
+class SlowIndex:
+    """Index whose chunk searches block until both are in flight"""
+
+    def __init__(self):
+        self.barrier = threading.Barrier(2, timeout=5)
+
+    def query(self, vector, top_k, namespace=None, filter=None, **kwargs):
+        if namespace == document_vectors.document_namespace():
+            return {"matches": [{"id": "d1", "score": 1.0}]}
+        self.barrier.wait()  # BrokenBarrierError if the searches run one after another
+        if "$exists" in filter["document_id"]:
+            return {"matches": [{"id": "legacy", "score": 0.9}]}
+        return {"matches": [{"id": "d1_c0", "score": 0.5}]}
+
+
+def test_chunk_searches_run_concurrently():
+    matches = document_vectors.query_two_stage(SlowIndex(), [1.0], 2, top_documents=1)
+    assert [match["id"] for match in matches] == ["legacy", "d1_c0"]
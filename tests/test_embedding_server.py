@@ -0,0 +1,136 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+import pytest
+from pydantic import BaseModel, Field, PrivateAttr
+
+from backend.vectorstore import backends
+from backend.vectorstore.embedding_server import OP_QUERY, RemoteEmbeddings, _Batcher, query_encoder, serve
+
+
+class CountingEmbeddings:
+    """Stand-in model that records how it was called"""
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(("documents", len(texts)))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        self.calls.append(("query", 1))
+        return [float(len(text)), 2.0]
+
+
+class BatchedQueries(CountingEmbeddings):
+    def embed_queries(self, texts):
+        self.calls.append(("queries", len(texts)))
+        return [[float(len(text)), 2.0] for text in texts]
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append((len(texts), kwargs))
+        prefix = len(kwargs.get("prompt", ""))
+        return np.asarray([[float(len(text) + prefix), 1.0] for text in texts])
+
+
+class HuggingFaceLike(BaseModel):
+    """Same public shape as langchain_huggingface.HuggingFaceEmbeddings"""
+
+    encode_kwargs: Dict[str, Any] = Field(default_factory=dict)
+    query_encode_kwargs: Dict[str, Any] = Field(default_factory=dict)
+    _client: Any = PrivateAttr(default_factory=FakeModel)
+
+    def _embed(self, texts: List[str], encode_kwargs: Dict[str, Any]) -> List[List[float]]:
+        return self._client.encode(texts, **encode_kwargs).tolist()
+
+    def embed_documents(self, texts):
+        return self._embed(texts, self.encode_kwargs)
+
+    def embed_query(self, text):
+        return self._embed([text], self.query_encode_kwargs or self.encode_kwargs)[0]
+
+
+def test_query_batch_is_one_model_call():
+    embeddings = BatchedQueries()
+    batcher = _Batcher(embeddings, max_batch=8, wait_seconds=0)
+
+    vectors = batcher._compute(OP_QUERY, ["a", "bb", "ccc"])
+
+    assert embeddings.calls == [("queries", 3)]
+    np.testing.assert_array_equal(vectors[:, 0], [1, 2, 3])
+
+
+@pytest.mark.parametrize("query_kwargs", [{}, {"prompt": "query: "}])
+def test_huggingface_queries_match_embed_query_in_one_call(query_kwargs):
+    embeddings = HuggingFaceLike(encode_kwargs={"batch_size": 8}, query_encode_kwargs=query_kwargs)
+    texts = ["a", "bb", "ccc"]
+    expected = [embeddings.embed_query(text) for text in texts]
+    embeddings._client.calls.clear()
+
+    assert query_encoder(embeddings)(texts) == expected
+    assert embeddings._client.calls == [(3, query_kwargs or {"batch_size": 8})]
+    # The original keeps its document settings
+    assert embeddings.encode_kwargs == {"batch_size": 8}
+
+
+def test_other_backends_fall_back_to_embed_query():
+    embeddings = CountingEmbeddings()
+    assert query_encoder(embeddings)(["a", "bb"]) == [[1.0, 2.0], [2.0, 2.0]]
+    assert embeddings.calls == [("query", 1), ("query", 1)]
+
+
+@pytest.fixture
+def embedding_service(tmp_path, monkeypatch):
+    """serve() on a temporary Unix socket, in its own event loop thread"""
+    model = BatchedQueries()
+    monkeypatch.setattr(backends, "create_base_embeddings", lambda backend=None: model)
+    socket_path = str(tmp_path / "embeddings.sock")
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(serve(socket_path, backend="fake"))
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+
+    deadline = time.monotonic() + 5
+    while not os.path.exists(socket_path):
+        assert time.monotonic() < deadline, "embedding service did not start"
+        time.sleep(0.01)
+
+    yield socket_path, model
+
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(timeout=5)
+    loop.close()
+
+
+def test_remote_embeddings_through_the_service(embedding_service):
+    socket_path, model = embedding_service
+    client = RemoteEmbeddings(socket_path=socket_path, timeout=5)
+
+    documents = client.embed_documents(["a", "bb", "ccc"])
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        queries = list(pool.map(client.embed_query, ["x" * n for n in range(1, 9)]))
+
+    assert np.allclose(documents, [[1, 1], [2, 1], [3, 1]])
+    assert np.allclose(queries, [[n, 2] for n in range(1, 9)])
+    assert ("documents", 3) in model.calls
+    # Concurrent queries go through the batched query path, never embed_query
+    assert all(kind in ("documents", "queries") for kind, _ in model.calls)
+    assert sum(count for kind, count in model.calls if kind == "queries") == 8
@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+from backend.vectorstore.local_index import ScalarQuantizer
+
+
+@pytest.mark.parametrize("rows", [0, 1, 7, 8, 9, 50])
+def test_scalar_quantizer_scores_in_blocks(rows):
+    rng = np.random.default_rng(rows)
+    vectors = rng.standard_normal((max(rows, 1), 16)).astype(np.float32)
+    quantizer = ScalarQuantizer(block=8)
+    quantizer.fit(vectors)
+    codes = quantizer.encode(vectors)[:rows]
+    query = rng.standard_normal(16).astype(np.float32)
+
+    expected = codes.astype(np.float32) @ (query * quantizer.scale)
+    np.testing.assert_allclose(quantizer.score(codes, query), expected, rtol=1e-5)
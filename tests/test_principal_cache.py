@@ -0,0 +1,27 @@
+from backend.auth import principal_cache as module
+from backend.auth.principal_cache import MemoryPrincipalCache, PrincipalCache
+
+
+def test_single_worker_keeps_memory_ttl():
+    cache = PrincipalCache(backend="auto", ttl=30, workers=1)
+    assert isinstance(cache.backend, MemoryPrincipalCache)
+    assert cache.backend.ttl == 30
+
+
+def test_multi_worker_memory_ttl_is_capped(monkeypatch):
+    monkeypatch.setattr(module, "REDIS_AVAILABLE", False)
+    cache = PrincipalCache(backend="auto", ttl=30, workers=4)
+    assert isinstance(cache.backend, MemoryPrincipalCache)
+    assert cache.backend.ttl == module.PRINCIPAL_CACHE_MULTI_WORKER_TTL
+
+
+def test_multi_worker_prefers_redis(monkeypatch):
+    created = []
+    monkeypatch.setattr(module, "REDIS_AVAILABLE", True)
+    monkeypatch.setattr(module, "RedisPrincipalCache", lambda ttl: created.append(ttl) or "redis")
+    cache = PrincipalCache(backend="auto", ttl=30, workers=4)
+    assert cache.backend == "redis" and created == [30]
+
+
+def test_zero_ttl_still_disables():
+    assert PrincipalCache(backend="memory", ttl=0, workers=4).enabled is False
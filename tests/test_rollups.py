@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert
+
+from backend.database import archive, bulk_delete
+from backend.database.models import User, Conversation, ChatHistory, UserAnalytics
+from backend.utils import rollups
+
+
+def seed(db):
+    now = datetime.utcnow()
+    for name in ("alice", "bob"):
+        user = User(email=f"{name}@example.com", username=name)
+        db.add(user)
+        db.commit()
+        for c in range(2):
+            conversation_id = f"{name}-{c}"
+            db.add(Conversation(id=conversation_id, user_id=user.id))
+            db.commit()
+            # Four messages a day over 25 days, half of them old enough to archive
+            db.execute(insert(ChatHistory), [
+                {
+                    "user_id": user.id, "conversation_id": conversation_id, "question": "q", "answer": "a",
+                    "timestamp": now - timedelta(hours=6 * (100 - i)),
+                }
+                for i in range(100)
+            ])
+            db.commit()
+    return now
+
+
+def totals(db):
+    days = dict(db.execute(select(UserAnalytics.date, UserAnalytics.total_chats)).all())
+    return rollups.read_counters(db)[rollups.TOTAL_CHATS], days
+
+
+def test_archival_keeps_totals_and_rebuild_counts_archived_messages(db):
+    now = seed(db)
+    rollups.refresh(db)
+    before = totals(db)
+    assert before[0] == 400
+
+    assert archive.run_archive(db, cutoff=now - timedelta(days=10))["messages"] > 0
+    assert totals(db) == before
+
+    rollups.rebuild(db)
+    assert totals(db) == before
+
+
+def test_deletes_match_rebuild(db):
+    now = seed(db)
+    rollups.refresh(db)
+    archive.run_archive(db, cutoff=now - timedelta(days=10))
+    alice, bob = db.scalars(select(User.id).order_by(User.id)).all()
+
+    bulk_delete.delete_conversation(db, alice, "alice-0")
+    # Not folded yet when it is deleted: must not be subtracted
+    db.execute(insert(ChatHistory).values(
+        user_id=bob, conversation_id="bob-0", question="q", answer="a", timestamp=now
+    ))
+    db.commit()
+    bulk_delete.purge_user(db, bob)
+    rollups.refresh(db)
+    incremental = totals(db)
+
+    rollups.rebuild(db)
+    assert incremental[0] == 100
+    assert totals(db) == incremental
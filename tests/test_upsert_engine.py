@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+from backend.benchmarks.fake_index import FakeIndex, FakeTransientError
+from backend.vectorstore.upsert_engine import UpsertEngine, UpsertError
+
+
+class FlakyIndex(FakeIndex):
+    """FakeIndex whose upserts fail on demand"""
+
+    def __init__(self, transient_failures=0, failing_ids=(), **kwargs):
+        super().__init__(upsert_latency=0.0, query_latency=0.0, latency_jitter=0.0, **kwargs)
+        self.transient_failures = transient_failures
+        self.failing_ids = set(failing_ids)
+        self.attempts = 0
+
+    def upsert(self, vectors, namespace=""):
+        with self._lock:
+            self.attempts += 1
+            transient = self.transient_failures > 0
+            self.transient_failures -= transient
+        if transient:
+            raise FakeTransientError(503)
+        if self.failing_ids & {vector["id"] for vector in vectors}:
+            raise ValueError("vector dimension mismatch")  # not retryable
+        return super().upsert(vectors, namespace)
+
+
+def vectors(count, start=0):
+    return [{"id": f"v{i}", "values": [float(i), 1.0]} for i in range(start, start + count)]
+
+
+def engine(index, **kwargs):
+    options = {"max_batch_vectors": 2, "backoff_base": 0.0, "backoff_max": 0.0}
+    options.update(kwargs)
+    return UpsertEngine(index, **options)
+
+
+def test_transient_errors_are_retried():
+    index = FlakyIndex(transient_failures=3)
+
+    with engine(index, max_in_flight=1, max_retries=5) as upserts:
+        upserts.add_many(vectors(2))
+    stats = upserts.stats
+
+    assert index.attempts == 4
+    assert stats["retries"] == 3
+    assert stats["vectors"] == 2 and stats["failed_batches"] == 0
+    assert index.vector_count() == 2
+
+
+def test_retries_stop_at_max_retries():
+    index = FlakyIndex(transient_failures=10)
+
+    with pytest.raises(UpsertError) as raised:
+        with engine(index, max_in_flight=1, max_retries=2) as upserts:
+            upserts.add_many(vectors(2))
+
+    assert index.attempts == 3  # first try + 2 retries
+    assert sorted(raised.value.failed_ids) == ["v0", "v1"]
+
+
+def test_failed_ids_cover_only_failed_batches():
+    index = FlakyIndex(failing_ids={"v3"})
+
+    with pytest.raises(UpsertError) as raised:
+        with engine(index, max_in_flight=2) as upserts:
+            upserts.add_many(vectors(6))
+
+    # Batches of two: only [v2, v3] failed, and it wasn't retried
+    assert sorted(raised.value.failed_ids) == ["v2", "v3"]
+    assert index.attempts == 3
+    assert index.vector_count() == 4
+    assert "1 of 3 upsert batches failed" in str(raised.value)
+
+
+def test_in_flight_batches_are_bounded():
+    release = threading.Event()
+
+    started = []
+
+    class SlowIndex(FakeIndex):
+        def upsert(self, vectors, namespace=""):
+            started.append(len(vectors))
+            release.wait(timeout=5)
+            return super().upsert(vectors, namespace)
+
+    index = SlowIndex(upsert_latency=0.0, latency_jitter=0.0)
+    upserts = engine(index, max_in_flight=2, max_batch_vectors=1)
+    producer = threading.Thread(target=upserts.add_many, args=(vectors(6),))
+    producer.start()
+
+    # Two batches in flight, and the producer blocked on the third slot
+    producer.join(timeout=0.3)
+    assert producer.is_alive()
+    assert len(started) == 2
+
+    release.set()
+    producer.join(timeout=5)
+    upserts.flush()
+    upserts.close()
+    assert index.max_concurrency == 2
+    assert index.vector_count() == 6
+    assert upserts.stats["blocked_seconds"] > 0
@@ -0,0 +1,49 @@
+import time
+
+from backend.utils import warmup as module
+from backend.utils.warmup import WarmUp
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_disabled_warmup_is_ready():
+    warmup = WarmUp([("model", lambda: None, lambda: False)], enabled=False)
+    assert warmup.ready
+    assert warmup.status()["model"]["state"] == "lazy"
+
+
+def test_lazily_loaded_component_counts_as_ready():
+    loaded = []
+    warmup = WarmUp([("model", lambda: None, lambda: bool(loaded))], enabled=True)
+    assert not warmup.ready
+
+    loaded.append(True)  # e.g. the first chat request created the model
+
+    assert warmup.ready
+    assert warmup.status()["model"]["state"] == "ready"
+
+
+def test_failed_component_is_retried_on_readiness_check(monkeypatch):
+    monkeypatch.setattr(module, "WARMUP_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(module, "WARMUP_BACKOFF_BASE", 0.0)
+    calls = []
+
+    def load():
+        calls.append(1)
+        if len(calls) <= 2:
+            raise RuntimeError("network not up yet")
+
+    warmup = WarmUp([("model", load, None)], enabled=True)
+    warmup.start()
+    assert wait_for(lambda: warmup.status()["model"]["state"] == "failed")
+    assert not warmup.ready  # kicks off another round
+
+    assert wait_for(lambda: warmup.ready)
+    assert len(calls) == 3
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from backend.database.models import User, Conversation, ChatHistory
+from backend.database.write_behind import WriteBehind, WRITE_BEHIND_MAX_ATTEMPTS
+from backend.utils.metrics import WRITE_BEHIND_DROPPED
+
+EARLIER = datetime.utcnow() - timedelta(days=1)
+
+
+def add_user(db, name):
+    user = User(email=f"{name}@example.com", username=name)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_flush_bumps_conversation_updated_at(db):
+    alice = add_user(db, "alice")
+    db.add(Conversation(id="c1", user_id=alice.id, created_at=EARLIER, updated_at=EARLIER))
+    db.commit()
+
+    buffer = WriteBehind(enabled=True)
+    now = datetime.utcnow()
+    buffer.add_chat(alice.id, "c1", "first", "answer", now - timedelta(seconds=1))
+    buffer.add_chat(alice.id, "c1", "second", "answer", now)
+    buffer.add_conversation("c2", alice.id, "new", now - timedelta(seconds=5))
+    buffer.add_chat(alice.id, "c2", "third", "answer", now - timedelta(seconds=2))
+    assert buffer.flush() == 4
+
+    db.expire_all()
+    updated = dict(db.execute(select(Conversation.id, Conversation.updated_at)).all())
+    assert updated == {"c1": now, "c2": now - timedelta(seconds=2)}
+    assert len(db.scalars(select(ChatHistory.id)).all()) == 3
+
+
+def test_bad_rows_dropped_alone(db):
+    alice = add_user(db, "alice")
+    db.add(Conversation(id="c1", user_id=alice.id))
+    db.commit()
+
+    buffer = WriteBehind(enabled=True)
+    now = datetime.utcnow()
+    for i in range(5):
+        # answer is NOT NULL: the third chat can never be inserted
+        buffer.add_chat(alice.id, "c1", f"q{i}", None if i == 2 else "answer", now + timedelta(seconds=i))
+    dropped = WRITE_BEHIND_DROPPED.labels(kind="chat").value
+
+    assert buffer.flush() == 4
+    db.expire_all()
+    assert db.scalars(select(ChatHistory.question).order_by(ChatHistory.id)).all() == ["q0", "q1", "q3", "q4"]
+    assert WRITE_BEHIND_DROPPED.labels(kind="chat").value == dropped + 1
+    assert not buffer.has_pending(alice.id)
+
+
+def test_failed_flush_requeued_then_dropped(db, monkeypatch):
+    alice = add_user(db, "alice")
+    buffer = WriteBehind(enabled=True)
+    buffer.add_conversation("c1", alice.id, "title", datetime.utcnow())
+
+    def locked(*args, **kwargs):
+        raise OperationalError("INSERT", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(buffer, "_write", locked)
+    dropped = WRITE_BEHIND_DROPPED.labels(kind="conversation").value
+    for _ in range(WRITE_BEHIND_MAX_ATTEMPTS - 1):
+        assert buffer.flush() == 0
+        assert buffer.pending_conversation("c1", alice.id)
+    assert buffer.flush() == 0
+    assert buffer.pending_conversation("c1", alice.id) is None
+    assert WRITE_BEHIND_DROPPED.labels(kind="conversation").value == dropped + 1